@@ -11,8 +11,8 @@ from enum import Enum
 import uuid
 import models
 
-from python.helpers import extract_tools, files, errors, history, tokens
-from python.helpers import dirty_json
+from python.helpers import extract_tools, files, errors, history, tokens, extension
+from python.helpers import dirty_json, state_monitor
 from python.helpers.print_style import PrintStyle
 
 from langchain_core.prompts import (
@@ -22,12 +22,14 @@ from langchain_core.messages import SystemMessage, BaseMessage
 
 import python.helpers.log as Log
 from python.helpers.dirty_json import DirtyJson
-from python.helpers.defer import DeferredTask
+from python.helpers.defer import DeferredTask, EventLoopPool
 from typing import Callable
 from python.helpers.localization import Localization
 from python.helpers.extension import call_extensions
 from python.helpers.errors import RepairableException
 
+DEFAULT_AGENT_EVENT_LOOPS = 4  # event loop threads for agent contexts, AGENT_EVENT_LOOPS in .env overrides
+
 
 class AgentContextType(Enum):
     USER = "user"
@@ -40,6 +42,7 @@ class AgentContext:
     _contexts: dict[str, "AgentContext"] = {}
     _counter: int = 0
     _notification_manager = None
+    _event_loops: EventLoopPool | None = None
 
     def __init__(
         self,
@@ -74,6 +77,16 @@ class AgentContext:
         if existing:
             AgentContext.remove(self.id)
         self._contexts[self.id] = self
+        state_monitor.mark_dirty()
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    @paused.setter
+    def paused(self, value: bool):
+        self._paused = value
+        state_monitor.mark_dirty()
 
     @staticmethod
     def get(id: str):
@@ -105,11 +118,23 @@ class AgentContext:
             cls._notification_manager = NotificationManager()
         return cls._notification_manager
 
+    @classmethod
+    def get_event_loops(cls) -> EventLoopPool:
+        # contexts are spread over event loop threads so a blocked chat does not stall the others
+        if cls._event_loops is None:
+            from python.helpers.dotenv import get_dotenv_value
+            size = int(get_dotenv_value("AGENT_EVENT_LOOPS", DEFAULT_AGENT_EVENT_LOOPS))
+            cls._event_loops = EventLoopPool(cls.__name__, size)
+        return cls._event_loops
+
     @staticmethod
     def remove(id: str):
         context = AgentContext._contexts.pop(id, None)
         if context and context.task:
             context.task.kill()
+        if context:
+            AgentContext.get_event_loops().release(id)
+        state_monitor.mark_dirty()
         return context
 
     def serialize(self):
@@ -198,7 +223,7 @@ class AgentContext:
     ):
         if not self.task:
             self.task = DeferredTask(
-                thread_name=self.__class__.__name__,
+                thread_name=self.get_event_loops().get_thread_name(self.id),
             )
         self.task.start_task(func, *args, **kwargs)
         return self.task
@@ -255,6 +280,9 @@ class LoopData:
         self.system = []
         self.user_message: history.Message | None = None
         self.history_output: list[history.OutputMessage] = []
+        # history_output entries are shared with the cached history output, extensions
+        # should replace entries they change, or set this after editing one in place
+        self.history_output_edited = False
         self.extras_temporary: OrderedDict[str, history.MessageContent] = OrderedDict()
         self.extras_persistent: OrderedDict[str, history.MessageContent] = OrderedDict()
         self.last_response = ""
@@ -283,6 +311,7 @@ class Agent:
     DATA_NAME_SUPERIOR = "_superior"
     DATA_NAME_SUBORDINATE = "_subordinate"
     DATA_NAME_CTX_WINDOW = "ctx_window"
+    DATA_NAME_CTX_WINDOW_PROMPT = "_ctx_window_prompt"
 
     def __init__(
         self, number: int, config: AgentConfig, context: AgentContext | None = None
@@ -302,6 +331,8 @@ class Agent:
         self.last_user_message: history.Message | None = None
         self.intervention: UserMessage | None = None
         self.data: dict[str, Any] = {}  # free data object all the tools can use
+        # (profile, extension point) -> reusable extension instances, see python/helpers/extension.py
+        self._extension_instances: dict[tuple[str, str], Any] = {}
 
         asyncio.run(self.call_extensions("agent_init"))
 
@@ -321,6 +352,7 @@ class Agent:
                     self.context.streaming_agent = self  # mark self as current streamer
                     self.loop_data.iteration += 1
                     self.loop_data.params_temporary = {}  # clear temporary params
+                    extension.refresh_pipelines()  # pick up edited extension files
 
                     # call message_loop_start extensions
                     await self.call_extensions(
@@ -363,13 +395,17 @@ class Agent:
                             if stream_data.get("chunk"):
                                 printer.stream(stream_data["chunk"])
                             # Use the potentially modified full text for downstream processing
-                            await self.handle_response_stream(stream_data["full"])
+                            await self.handle_response_stream(
+                                stream_data["full"], stream_data.get("chunk") or ""
+                            )
 
                         # call main LLM
                         agent_response, _reasoning = await self.call_chat_model(
                             messages=prompt,
                             response_callback=stream_callback,
                             reasoning_callback=reasoning_callback,
+                            # prompt size already counted while preparing it
+                            input_tokens=self.get_data(Agent.DATA_NAME_CTX_WINDOW)["tokens"],
                         )
 
                         # Notify extensions to finalize their stream filters
@@ -441,7 +477,10 @@ class Agent:
 
         # set system prompt and message history
         loop_data.system = await self.get_system_prompt(self.loop_data)
-        loop_data.history_output = self.history.output()
+        history_output = self.history.output()
+        # extensions get their own list, entries are shared with the cached history output
+        loop_data.history_output = list(history_output)
+        loop_data.history_output_edited = False
 
         # and allow extensions to edit them
         await self.call_extensions("message_loop_prompts_after", loop_data=loop_data)
@@ -450,7 +489,7 @@ class Agent:
         system_text = "\n\n".join(loop_data.system)
 
         # join extras
-        extras = history.Message(  # type: ignore[abstract]
+        extras_message = history.Message(  # type: ignore[abstract]
             False,
             content=self.read_prompt(
                 "agent.context.extras.md",
@@ -458,30 +497,45 @@ class Agent:
                     {**loop_data.extras_persistent, **loop_data.extras_temporary}
                 ),
             ),
-        ).output()
+        )
+        extras = extras_message.output()
         loop_data.extras_temporary.clear()
 
         # convert history + extras to LLM format
-        history_langchain: list[BaseMessage] = history.output_langchain(
-            loop_data.history_output + extras
+        history_unchanged = (
+            not loop_data.history_output_edited
+            and len(loop_data.history_output) == len(history_output)
+            and all(a is b for a, b in zip(loop_data.history_output, history_output))
         )
+        if history_unchanged:
+            # history not edited by extensions, reuse its cached messages
+            history_langchain: list[BaseMessage] = self.history.output_langchain(extras)
+        else:
+            history_langchain = history.output_langchain(
+                loop_data.history_output + extras
+            )
 
         # build full prompt from system prompt, message history and extrS
         full_prompt: list[BaseMessage] = [
             SystemMessage(content=system_text),
             *history_langchain,
         ]
-        full_text = ChatPromptTemplate.from_messages(full_prompt).format()
-
-        # store as last context window content
-        self.set_data(
-            Agent.DATA_NAME_CTX_WINDOW,
-            {
-                "text": full_text,
-                "tokens": tokens.approximate_tokens(full_text),
-            },
+
+        # context window size from the memoized counts of its parts, unchanged text is not tokenized again
+        ctx_tokens = (
+            sum(tokens.approximate_tokens(part) for part in loop_data.system)
+            + (
+                self.history.get_tokens()
+                if history_unchanged
+                else tokens.approximate_tokens(history.output_text(loop_data.history_output))
+            )
+            + extras_message.get_tokens()
         )
 
+        # store as last context window content, its text is rendered only when viewed
+        self.set_data(Agent.DATA_NAME_CTX_WINDOW_PROMPT, full_prompt)
+        self.set_data(Agent.DATA_NAME_CTX_WINDOW, {"tokens": ctx_tokens})
+
         return full_prompt
 
     def handle_critical_exception(self, exception: Exception):
@@ -552,6 +606,14 @@ class Agent:
     def set_data(self, field: str, value):
         self.data[field] = value
 
+    def get_ctx_window_text(self) -> str:
+        prompt = self.get_data(Agent.DATA_NAME_CTX_WINDOW_PROMPT)
+        if prompt:
+            return ChatPromptTemplate.from_messages(prompt).format()
+        # chats saved before the prompt was kept apart stored the rendered text
+        window = self.get_data(Agent.DATA_NAME_CTX_WINDOW)
+        return window.get("text", "") if isinstance(window, dict) else ""
+
     def hist_add_message(
         self, ai: bool, content: history.MessageContent, tokens: int = 0
     ):
@@ -683,6 +745,7 @@ class Agent:
         response_callback: Callable[[str, str], Awaitable[None]] | None = None,
         reasoning_callback: Callable[[str, str], Awaitable[None]] | None = None,
         background: bool = False,
+        input_tokens: int | None = None,
     ):
         response = ""
 
@@ -695,6 +758,8 @@ class Agent:
             reasoning_callback=reasoning_callback,
             response_callback=response_callback,
             rate_limiter_callback=self.rate_limiter_callback if not background else None,
+            prompt_cache_callback=self.prompt_cache_callback if not background else None,
+            input_tokens=input_tokens,
         )
 
         return response, reasoning
@@ -706,6 +771,12 @@ class Agent:
         self.context.log.set_progress(message, True)
         return False
 
+    async def prompt_cache_callback(self, message: str, read: int, write: int):
+        # show prompt cache usage on the response it belongs to, no need to spam the chat history
+        log_item = self.loop_data.params_temporary.get("log_item_generating")
+        if log_item:
+            log_item.update(cache_read_tokens=read, cache_write_tokens=write)
+
     async def handle_intervention(self, progress: str = ""):
         while self.context.paused:
             await asyncio.sleep(0.1)  # wait if paused
@@ -813,18 +884,29 @@ class Agent:
             text=stream,
         )
 
-    async def handle_response_stream(self, stream: str):
+    async def handle_response_stream(self, stream: str, chunk: str | None = None):
         await self.handle_intervention()
         try:
-            if len(stream) < 25:
-                return  # no reason to try
-            response = DirtyJson.parse_string(stream)
+            if chunk is None:
+                # no delta available, parse the whole stream
+                if len(stream) < 25:
+                    return  # no reason to try
+                response = DirtyJson.parse_string(stream)
+            else:
+                # stateful parser for this response, consumes only the new chunk
+                parser = self.loop_data.params_temporary.get("response_parser")
+                if parser is None:
+                    parser = DirtyJson()
+                    self.loop_data.params_temporary["response_parser"] = parser
+                response = parser.feed(chunk)
+                if len(stream) < 25:
+                    return  # no reason to try
             if isinstance(response, dict):
                 await self.call_extensions(
                     "response_stream",
                     loop_data=self.loop_data,
                     text=stream,
-                    parsed=response,
+                    parsed=dict(response),  # extensions may replace top level keys
                 )
 
         except Exception as e:
@@ -841,7 +923,7 @@ class Agent:
         # try agent tools first
         if self.config.profile:
             try:
-                classes = extract_tools.load_classes_from_file(
+                classes = extract_tools.load_classes_from_file_cached(
                     "agents/" + self.config.profile + "/tools/" + name + ".py", Tool  # type: ignore[arg-type]
                 )
             except Exception:
@@ -850,7 +932,7 @@ class Agent:
         # try default tools
         if not classes:
             try:
-                classes = extract_tools.load_classes_from_file(
+                classes = extract_tools.load_classes_from_file_cached(
                     "python/tools/" + name + ".py", Tool  # type: ignore[arg-type]
                 )
             except Exception as e:
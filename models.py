@@ -1,7 +1,14 @@
-from dataclasses import dataclass, field
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from email.utils import parsedate_to_datetime
 from enum import Enum
+import json
 import logging
 import os
+import random
+import threading
+import time
+import weakref
 from typing import (
     Any,
     Awaitable,
@@ -20,11 +27,13 @@ import openai
 from litellm.types.utils import ModelResponse
 
 from python.helpers import dotenv
-from python.helpers import settings, dirty_json
+from python.helpers import settings, dirty_json, files
 from python.helpers.dotenv import load_dotenv
 from python.helpers.providers import get_provider_config
-from python.helpers.rate_limiter import RateLimiter
-from python.helpers.tokens import approximate_tokens
+from python.helpers.rate_limiter import RateLimiter, SharedRateLimiter
+from python.helpers.key_pool import get_key_pool
+from python.helpers.tokens import approximate_tokens, approximate_message_tokens
+from python.helpers.print_style import PrintStyle
 from python.helpers import dirty_json, browser_use_monkeypatch
 
 from langchain_core.language_models.chat_models import SimpleChatModel
@@ -194,30 +203,58 @@ class ChatGenerationResult:
         
 
 rate_limiters: dict[str, RateLimiter] = {}
-api_keys_round_robin: dict[str, int] = {}
+_models: dict[str, Any] = {}  # model wrappers by config, see get_chat_model
+_models_lock = threading.Lock()
+LOCAL_EMBEDDING_CACHE_SIZE = 2  # loaded sentence-transformers models kept after no wrapper uses them
+_local_embedding_models: "OrderedDict[str, _LocalEmbeddingModel]" = OrderedDict()
+_local_embedding_lock = threading.Lock()
+_local_embedding_load_lock = threading.Lock()
+RATE_LIMITER_OUTPUT_BATCH = 2000  # chars of streamed output collected before counting its tokens for the rate limiter
 
 
-def get_api_key(service: str) -> str:
-    # get api key for the service
+@dataclass
+class PromptCacheStats:
+    hits: int = 0
+    misses: int = 0
+    read_tokens: int = 0
+    write_tokens: int = 0
+
+
+prompt_cache_stats: dict[str, PromptCacheStats] = {}
+
+
+def get_api_keys(service: str) -> list[str]:
+    # get api keys for the service, multiple keys are comma separated
     key = (
         dotenv.get_dotenv_value(f"API_KEY_{service.upper()}")
         or dotenv.get_dotenv_value(f"{service.upper()}_API_KEY")
         or dotenv.get_dotenv_value(f"{service.upper()}_API_TOKEN")
         or "None"
     )
-    # if the key contains a comma, use round-robin
-    if "," in key:
-        api_keys = [k.strip() for k in key.split(",") if k.strip()]
-        api_keys_round_robin[service] = api_keys_round_robin.get(service, -1) + 1
-        key = api_keys[api_keys_round_robin[service] % len(api_keys)]
-    return key
+    return [k.strip() for k in key.split(",") if k.strip()] or ["None"]
+
+
+def get_api_key(service: str) -> str:
+    # get api key for the service, with multiple keys the healthiest one
+    api_keys = get_api_keys(service)
+    if len(api_keys) == 1:
+        return api_keys[0]
+    return get_key_pool(service, api_keys).pick()
 
 
 def get_rate_limiter(
     provider: str, name: str, requests: int, input: int, output: int
 ) -> RateLimiter:
     key = f"{provider}\\{name}"
-    rate_limiters[key] = limiter = rate_limiters.get(key, RateLimiter(seconds=60))
+    limiter = rate_limiters.get(key)
+    if not limiter:
+        # a shared store makes all processes using it enforce the limits together
+        shared_db = dotenv.get_dotenv_value(dotenv.KEY_RATE_LIMIT_DB)
+        if shared_db:
+            limiter = SharedRateLimiter(files.get_abs_path(shared_db), key, seconds=60)
+        else:
+            limiter = RateLimiter(seconds=60)
+        rate_limiters[key] = limiter
     limiter.limits["requests"] = requests or 0
     limiter.limits["input"] = input or 0
     limiter.limits["output"] = output or 0
@@ -249,9 +286,39 @@ def _is_transient_litellm_error(exc: Exception) -> bool:
     return isinstance(exc, transient_types)
 
 
+def _is_throttling_error(exc: Exception) -> bool:
+    """Provider asks to slow down: 429 or overloaded, the key should rest and shrink its concurrency"""
+    status_code = getattr(exc, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code in (429, 529)
+    return isinstance(exc, getattr(openai, "RateLimitError", ()))
+
+
+def _get_retry_after(exc: Exception) -> float | None:
+    """Seconds from Retry-After headers of the failed response, if the provider sent them"""
+    try:
+        headers = getattr(exc, "litellm_response_headers", None) or getattr(
+            getattr(exc, "response", None), "headers", None
+        )
+        if not headers:
+            return None
+        headers = {str(k).lower(): v for k, v in dict(headers).items()}
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:  # HTTP date
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
 async def apply_rate_limiter(
     model_config: ModelConfig | None,
-    input_text: str,
+    input: str | list[Any] | int,
     rate_limiter_callback: (
         Callable[[str, str, int, int], Awaitable[bool]] | None
     ) = None,
@@ -265,15 +332,20 @@ async def apply_rate_limiter(
         model_config.limit_input,
         model_config.limit_output,
     )
-    limiter.add(input=approximate_tokens(input_text))
-    limiter.add(requests=1)
-    await limiter.wait(rate_limiter_callback)
+    # input is text, chat messages or an already known token count
+    if isinstance(input, int):
+        input_tokens = input
+    elif isinstance(input, str):
+        input_tokens = approximate_tokens(input)
+    else:
+        input_tokens = approximate_message_tokens(input)
+    await limiter.acquire(rate_limiter_callback, input=input_tokens, requests=1)
     return limiter
 
 
 def apply_rate_limiter_sync(
     model_config: ModelConfig | None,
-    input_text: str,
+    input: str | list[Any] | int,
     rate_limiter_callback: (
         Callable[[str, str, int, int], Awaitable[bool]] | None
     ) = None,
@@ -284,7 +356,7 @@ def apply_rate_limiter_sync(
 
     nest_asyncio.apply()
     return asyncio.run(
-        apply_rate_limiter(model_config, input_text, rate_limiter_callback)
+        apply_rate_limiter(model_config, input, rate_limiter_callback)
     )
 
 
@@ -374,11 +446,14 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, str(msgs))
+        apply_rate_limiter_sync(self.a0_model_conf, msgs)
 
         # Call the model
         resp = completion(
-            model=self.model_name, messages=msgs, stop=stop, **{**self.kwargs, **kwargs}
+            model=self.model_name,
+            messages=msgs,
+            stop=stop,
+            **_litellm_kwargs(self.kwargs, kwargs, _get_call_api_key(self.kwargs, kwargs)),
         )
 
         # Parse output
@@ -398,7 +473,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, str(msgs))
+        apply_rate_limiter_sync(self.a0_model_conf, msgs)
 
         result = ChatGenerationResult()
 
@@ -407,7 +482,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
             messages=msgs,
             stream=True,
             stop=stop,
-            **{**self.kwargs, **kwargs},
+            **_litellm_kwargs(self.kwargs, kwargs),
         ):
             # parse chunk
             parsed = _parse_chunk(chunk) # chunk parsing
@@ -429,7 +504,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        await apply_rate_limiter(self.a0_model_conf, str(msgs))
+        await apply_rate_limiter(self.a0_model_conf, msgs)
 
         result = ChatGenerationResult()
 
@@ -438,7 +513,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
             messages=msgs,
             stream=True,
             stop=stop,
-            **{**self.kwargs, **kwargs},
+            **_litellm_kwargs(self.kwargs, kwargs),
         )
         async for chunk in response:  # type: ignore
             # parse chunk
@@ -462,6 +537,8 @@ class LiteLLMChatWrapper(SimpleChatModel):
         rate_limiter_callback: (
             Callable[[str, str, int, int], Awaitable[bool]] | None
         ) = None,
+        prompt_cache_callback: Callable[[str, int, int], Awaitable[None]] | None = None,
+        input_tokens: int | None = None,
         **kwargs: Any,
     ) -> Tuple[str, str]:
 
@@ -478,15 +555,32 @@ class LiteLLMChatWrapper(SimpleChatModel):
         # convert to litellm format
         msgs_conv = self._convert_messages(messages)
 
-        # Apply rate limiting if configured
+        # Apply rate limiting if configured, the caller may already know the prompt size
         limiter = await apply_rate_limiter(
-            self.a0_model_conf, str(msgs_conv), rate_limiter_callback
+            self.a0_model_conf,
+            input_tokens if input_tokens is not None else msgs_conv,
+            rate_limiter_callback,
         )
 
         # Prepare call kwargs and retry config (strip A0-only params before calling LiteLLM)
         call_kwargs: dict[str, Any] = {**self.kwargs, **kwargs}
         max_retries: int = int(call_kwargs.pop("a0_retry_attempts", 2))
         retry_delay_s: float = float(call_kwargs.pop("a0_retry_delay_seconds", 1.5))
+        prompt_caching: bool = bool(call_kwargs.pop("a0_prompt_caching", False))
+
+        # mark the stable prompt prefix for providers that cache prompts
+        if prompt_caching:
+            msgs_conv = _apply_cache_breakpoints(msgs_conv)
+            call_kwargs.setdefault("stream_options", {"include_usage": True})
+
+        # with keys from the environment each attempt goes to the healthiest key
+        service = call_kwargs.get("a0_api_key_service") or (
+            self.a0_model_conf.provider if self.a0_model_conf else self.provider
+        )
+        api_keys = get_api_keys(service)
+        if call_kwargs.get("api_key") and call_kwargs["api_key"] not in api_keys:
+            service, api_keys = f"{service}\\{self.model_name}", [call_kwargs["api_key"]]
+        key_pool = get_key_pool(service, api_keys)
 
         # results
         result = ChatGenerationResult()
@@ -494,18 +588,26 @@ class LiteLLMChatWrapper(SimpleChatModel):
         attempt = 0
         while True:
             got_any_chunk = False
+            released = False
+            pending_output = ""
+            api_key = await key_pool.acquire()
+            if api_key not in ("None", "NA"):
+                call_kwargs["api_key"] = api_key
             try:
                 # call model
                 _completion = await acompletion(
                     model=self.model_name,
                     messages=msgs_conv,
                     stream=True,
-                    **call_kwargs,
+                    **_litellm_kwargs(call_kwargs),
                 )
 
                 # iterate over chunks
+                cache_usage = None
                 async for chunk in _completion:  # type: ignore
                     got_any_chunk = True
+                    # prompt cache usage comes with the last chunk
+                    cache_usage = _parse_cache_usage(chunk) or cache_usage
                     # parse chunk
                     parsed = _parse_chunk(chunk)
                     output = result.add_chunk(parsed)
@@ -519,9 +621,8 @@ class LiteLLMChatWrapper(SimpleChatModel):
                                 output["reasoning_delta"],
                                 approximate_tokens(output["reasoning_delta"]),
                             )
-                        # Add output tokens to rate limiter if configured
                         if limiter:
-                            limiter.add(output=approximate_tokens(output["reasoning_delta"]))
+                            pending_output += output["reasoning_delta"]
                     # collect response delta and call callbacks
                     if output["response_delta"]:
                         if response_callback:
@@ -531,21 +632,48 @@ class LiteLLMChatWrapper(SimpleChatModel):
                                 output["response_delta"],
                                 approximate_tokens(output["response_delta"]),
                             )
-                        # Add output tokens to rate limiter if configured
                         if limiter:
-                            limiter.add(output=approximate_tokens(output["response_delta"]))
+                            pending_output += output["response_delta"]
+
+                    # Add output tokens to rate limiter in batches, tokenizing every delta costs more than the limit check
+                    if limiter and len(pending_output) >= RATE_LIMITER_OUTPUT_BATCH:
+                        limiter.add(output=approximate_tokens(pending_output))
+                        pending_output = ""
 
                 # Successful completion of stream
+                released = True
+                key_pool.release(api_key)
+                if cache_usage:
+                    message = _log_cache_usage(self.model_name, *cache_usage)
+                    if prompt_cache_callback:
+                        await prompt_cache_callback(message, *cache_usage)
                 return result.response, result.reasoning
 
             except Exception as e:
                 import asyncio
-                
+
+                throttled = not got_any_chunk and _is_throttling_error(e)
+                released = True
+                key_pool.release(
+                    api_key,
+                    throttled=throttled,
+                    retry_after=_get_retry_after(e) if throttled else None,
+                    success=False,
+                )
+
                 # Retry only if no chunks received and error is transient
                 if got_any_chunk or not _is_transient_litellm_error(e) or attempt >= max_retries:
                     raise
                 attempt += 1
-                await asyncio.sleep(retry_delay_s)
+                # throttled keys rest in key_pool.acquire for their Retry-After,
+                # other errors back off with jitter so parallel callers don't retry in sync
+                if not throttled:
+                    await asyncio.sleep(retry_delay_s * 2 ** (attempt - 1) * (0.5 + random.random()))
+            finally:
+                if not released:  # cancelled mid call
+                    key_pool.release(api_key, success=False)
+                if limiter and pending_output:
+                    limiter.add(output=approximate_tokens(pending_output))
 
 
 class AsyncAIChatReplacement:
@@ -601,12 +729,14 @@ class BrowserCompatibleChatWrapper(ChatOpenRouter):
         **kwargs: Any,
     ):
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self._wrapper.a0_model_conf, str(messages))
+        apply_rate_limiter_sync(self._wrapper.a0_model_conf, messages)
 
         # Call the model
         try:
             model = kwargs.pop("model", None)
-            kwrgs = {**self._wrapper.kwargs, **kwargs}
+            kwrgs = _litellm_kwargs(
+                self._wrapper.kwargs, kwargs, _get_call_api_key(self._wrapper.kwargs, kwargs)
+            )
 
             # hack from browser-use to fix json schema for gemini (additionalProperties, $defs, $ref)
             if "response_format" in kwrgs and "json_schema" in kwrgs["response_format"] and model.startswith("gemini/"):
@@ -663,7 +793,11 @@ class LiteLLMEmbeddingWrapper(Embeddings):
         # Apply rate limiting if configured
         apply_rate_limiter_sync(self.a0_model_conf, " ".join(texts))
 
-        resp = embedding(model=self.model_name, input=texts, **self.kwargs)
+        resp = embedding(
+            model=self.model_name,
+            input=texts,
+            **_litellm_kwargs(self.kwargs, _get_call_api_key(self.kwargs)),
+        )
         return [
             item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
             for item in resp.data  # type: ignore
@@ -673,11 +807,54 @@ class LiteLLMEmbeddingWrapper(Embeddings):
         # Apply rate limiting if configured
         apply_rate_limiter_sync(self.a0_model_conf, text)
 
-        resp = embedding(model=self.model_name, input=[text], **self.kwargs)
+        resp = embedding(
+            model=self.model_name,
+            input=[text],
+            **_litellm_kwargs(self.kwargs, _get_call_api_key(self.kwargs)),
+        )
         item = resp.data[0]  # type: ignore
         return item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
 
 
+@dataclass
+class _LocalEmbeddingModel:
+    model: SentenceTransformer
+    lock: threading.Lock = field(default_factory=threading.Lock)  # encoding is not thread safe
+    refs: int = 0
+
+
+def _acquire_sentence_transformer(model: str, st_kwargs: dict) -> tuple[str, _LocalEmbeddingModel]:
+    # loaded models are shared by all wrappers with the same name and kwargs
+    key = json.dumps([model, st_kwargs], sort_keys=True, default=str)
+    with _local_embedding_load_lock:  # concurrent callers wait for one load instead of loading twice
+        with _local_embedding_lock:
+            entry = _local_embedding_models.get(key)
+            if entry:
+                entry.refs += 1
+                _local_embedding_models.move_to_end(key)
+                return key, entry
+        entry = _LocalEmbeddingModel(SentenceTransformer(model, **st_kwargs), refs=1)
+        with _local_embedding_lock:
+            _local_embedding_models[key] = entry
+            _evict_sentence_transformers()
+        return key, entry
+
+
+def _release_sentence_transformer(key: str):
+    with _local_embedding_lock:
+        entry = _local_embedding_models.get(key)
+        if entry:
+            entry.refs -= 1
+            _evict_sentence_transformers()
+
+
+def _evict_sentence_transformers():
+    # keep models in use and the most recently used unused ones
+    unused = [key for key, entry in _local_embedding_models.items() if entry.refs <= 0]
+    for key in unused[: max(0, len(unused) - LOCAL_EMBEDDING_CACHE_SIZE)]:
+        del _local_embedding_models[key]
+
+
 class LocalSentenceTransformerWrapper(Embeddings):
     """Local wrapper for sentence-transformers models to avoid HuggingFace API calls"""
 
@@ -706,7 +883,9 @@ class LocalSentenceTransformerWrapper(Embeddings):
         }
         st_kwargs = {k: v for k, v in (kwargs or {}).items() if k in st_allowed_keys}
 
-        self.model = SentenceTransformer(model, **st_kwargs)
+        key, self._shared = _acquire_sentence_transformer(model, st_kwargs)
+        weakref.finalize(self, _release_sentence_transformer, key)
+        self.model = self._shared.model
         self.model_name = model
         self.a0_model_conf = model_config
 
@@ -714,14 +893,16 @@ class LocalSentenceTransformerWrapper(Embeddings):
         # Apply rate limiting if configured
         apply_rate_limiter_sync(self.a0_model_conf, " ".join(texts))
 
-        embeddings = self.model.encode(texts, convert_to_tensor=False)  # type: ignore
+        with self._shared.lock:
+            embeddings = self.model.encode(texts, convert_to_tensor=False)  # type: ignore
         return embeddings.tolist() if hasattr(embeddings, "tolist") else embeddings  # type: ignore
 
     def embed_query(self, text: str) -> List[float]:
         # Apply rate limiting if configured
         apply_rate_limiter_sync(self.a0_model_conf, text)
 
-        embedding = self.model.encode([text], convert_to_tensor=False)  # type: ignore
+        with self._shared.lock:
+            embedding = self.model.encode([text], convert_to_tensor=False)  # type: ignore
         result = (
             embedding[0].tolist() if hasattr(embedding[0], "tolist") else embedding[0]
         )
@@ -735,8 +916,9 @@ def _get_litellm_chat(
     model_config: Optional[ModelConfig] = None,
     **kwargs: Any,
 ):
-    # use api key from kwargs or env
-    api_key = kwargs.pop("api_key", None) or get_api_key(provider_name)
+    # use api key from kwargs, keys from env are picked per call
+    api_key = kwargs.pop("api_key", None)
+    kwargs.setdefault("a0_api_key_service", provider_name)
 
     # Only pass API key if key is not a placeholder
     if api_key and api_key not in ("None", "NA"):
@@ -771,8 +953,9 @@ def _get_litellm_embedding(
             **kwargs,
         )
 
-    # use api key from kwargs or env
-    api_key = kwargs.pop("api_key", None) or get_api_key(provider_name)
+    # use api key from kwargs, keys from env are picked per call
+    api_key = kwargs.pop("api_key", None)
+    kwargs.setdefault("a0_api_key_service", provider_name)
 
     # Only pass API key if key is not a placeholder
     if api_key and api_key not in ("None", "NA"):
@@ -810,6 +993,74 @@ def _parse_chunk(chunk: Any) -> ChatChunk:
 
 
 
+def _litellm_kwargs(*sources: dict) -> dict:
+    # merge call kwargs without the A0-only parameters (a0_*), unified_call reads them before this
+    return {k: v for source in sources for k, v in source.items() if not k.startswith("a0_")}
+
+
+def _get_call_api_key(*sources: dict) -> dict:
+    # picks an env key for this call unless one was given, so cached wrappers still rotate between keys
+    if any(source.get("api_key") for source in sources):
+        return {}
+    service = next((s["a0_api_key_service"] for s in sources if s.get("a0_api_key_service")), None)
+    if not service:
+        return {}
+    key = get_api_key(service)
+    return {"api_key": key} if key and key not in ("None", "NA") else {}
+
+
+def _apply_cache_breakpoints(messages: list[dict]) -> list[dict]:
+    # cache the system prompt and the history up to the last message, which carries the tool result and volatile extras
+    points = {0} if messages and messages[0]["role"] == "system" else set()
+    if len(messages) > 2:
+        points.add(len(messages) - 2)
+    result = list(messages)
+    for i in points:
+        content = result[i]["content"]
+        if isinstance(content, str) and content:
+            content = [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+        elif isinstance(content, list) and content and isinstance(content[-1], dict):
+            content = content[:-1] + [{**content[-1], "cache_control": {"type": "ephemeral"}}]
+        else:
+            continue
+        result[i] = {**result[i], "content": content}
+    return result
+
+
+def _parse_cache_usage(chunk: Any) -> tuple[int, int] | None:
+    # returns (cache read tokens, cache write tokens) if the chunk reports prompt cache usage
+    def get(obj: Any, key: str) -> Any:
+        return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+    usage = get(chunk, "usage")
+    if not usage:
+        return None
+    read = get(usage, "cache_read_input_tokens")
+    if read is None:
+        details = get(usage, "prompt_tokens_details")
+        read = get(details, "cached_tokens") if details else None
+    write = get(usage, "cache_creation_input_tokens")
+    if read is None and write is None:
+        return None
+    return int(read or 0), int(write or 0)
+
+
+def _log_cache_usage(model_name: str, read: int, write: int) -> str:
+    stats = prompt_cache_stats.setdefault(model_name, PromptCacheStats())
+    if read:
+        stats.hits += 1
+    else:
+        stats.misses += 1
+    stats.read_tokens += read
+    stats.write_tokens += write
+    message = (
+        f"Prompt cache {'hit' if read else 'miss'} for {model_name}: {read} tokens read, {write} written "
+        f"({stats.hits} hits, {stats.misses} misses)"
+    )
+    PrintStyle(font_color="#808080", padding=False).print(message)
+    return message
+
+
 def _adjust_call_args(provider_name: str, model_name: str, kwargs: dict):
     # for openrouter add app reference
     if provider_name == "openrouter":
@@ -855,11 +1106,8 @@ def _merge_provider_defaults(
             for k, v in extra_kwargs.items():
                 kwargs.setdefault(k, v)
 
-    # Inject API key based on the *original* provider id if still missing
-    if "api_key" not in kwargs:
-        key = get_api_key(original_provider)
-        if key and key not in ("None", "NA"):
-            kwargs["api_key"] = key
+    # API keys from env are looked up by the *original* provider id on each call
+    kwargs.setdefault("a0_api_key_service", original_provider)
 
     # Merge LiteLLM global kwargs (timeouts, stream_timeout, etc.)
     try:
@@ -873,14 +1121,52 @@ def _merge_provider_defaults(
     return provider_name, kwargs
 
 
+def _get_cached_model(
+    model_type: str,
+    provider: str,
+    name: str,
+    model_config: Optional[ModelConfig],
+    kwargs: dict,
+    build: Callable[[], Any],
+):
+    # wrappers are reused while their config and kwargs are unchanged, api keys from env are picked per call,
+    # settings changes clear the cache
+    key = json.dumps(
+        [
+            model_type,
+            provider.lower(),
+            name,
+            asdict(model_config) if model_config else None,
+            kwargs,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    with _models_lock:
+        model = _models.get(key)
+    if model is None:
+        model = build()
+        with _models_lock:
+            model = _models.setdefault(key, model)
+    return model
+
+
+def clear_model_cache():
+    with _models_lock:
+        _models.clear()
+
+
 def get_chat_model(
     provider: str, name: str, model_config: Optional[ModelConfig] = None, **kwargs: Any
 ) -> LiteLLMChatWrapper:
-    orig = provider.lower()
-    provider_name, kwargs = _merge_provider_defaults("chat", orig, kwargs)
-    return _get_litellm_chat(
-        LiteLLMChatWrapper, name, provider_name, model_config, **kwargs
-    )
+    def build():
+        orig = provider.lower()
+        provider_name, merged_kwargs = _merge_provider_defaults("chat", orig, kwargs)
+        return _get_litellm_chat(
+            LiteLLMChatWrapper, name, provider_name, model_config, **merged_kwargs
+        )
+
+    return _get_cached_model("chat", provider, name, model_config, kwargs, build)
 
 
 def get_browser_model(
@@ -896,6 +1182,9 @@ def get_browser_model(
 def get_embedding_model(
     provider: str, name: str, model_config: Optional[ModelConfig] = None, **kwargs: Any
 ) -> LiteLLMEmbeddingWrapper | LocalSentenceTransformerWrapper:
-    orig = provider.lower()
-    provider_name, kwargs = _merge_provider_defaults("embedding", orig, kwargs)
-    return _get_litellm_embedding(name, provider_name, model_config, **kwargs)
+    def build():
+        orig = provider.lower()
+        provider_name, merged_kwargs = _merge_provider_defaults("embedding", orig, kwargs)
+        return _get_litellm_embedding(name, provider_name, model_config, **merged_kwargs)
+
+    return _get_cached_model("embedding", provider, name, model_config, kwargs, build)
@@ -12,7 +12,7 @@ class GetCtxWindow(ApiHandler):
         if not window or not isinstance(window, dict):
             return {"content": "", "tokens": 0}
 
-        text = window["text"]
+        text = agent.get_ctx_window_text()
         tokens = window["tokens"]
 
         return {"content": text, "tokens": tokens}
@@ -0,0 +1,15 @@
+from python.helpers.api import ApiHandler, Request, Response
+
+from agent import AgentContext
+
+
+class EventLoopsStatus(ApiHandler):
+
+    @classmethod
+    def get_methods(cls) -> list[str]:
+        return ["GET", "POST"]
+
+    async def process(self, input: dict, request: Request) -> dict | Response:
+        # contexts assigned to each agent event loop thread, running tasks and loop lag in seconds
+        loops = AgentContext.get_event_loops().get_load()
+        return {"success": True, "loops": loops}
@@ -0,0 +1,133 @@
+import json
+import time
+
+from python.helpers.api import ApiHandler, Request, Response
+
+from agent import AgentContext
+
+from python.helpers import state_monitor
+from python.helpers.localization import Localization
+from python.helpers.dotenv import get_dotenv_value
+
+COALESCE_DELAY = 0.05  # seconds to let a burst of updates settle before sending
+
+
+class PollStream(ApiHandler):
+    """
+    Server-sent events version of /poll.
+    Pushes only context list deltas, new log updates and notifications when the state changes.
+    """
+
+    @classmethod
+    def get_methods(cls) -> list[str]:
+        return ["GET"]
+
+    async def process(self, input: dict, request: Request) -> dict | Response:
+        ctxid = request.args.get("context", "")
+        log_from = int(request.args.get("log_from", 0) or 0)
+        notifications_from = int(request.args.get("notifications_from", 0) or 0)
+
+        # Get timezone from input (default to dotenv default or UTC if not provided)
+        timezone = request.args.get(
+            "timezone", get_dotenv_value("DEFAULT_USER_TIMEZONE", "UTC")
+        )
+        Localization.get().set_timezone(timezone)
+
+        # context instance - get or create
+        context = self.get_context(ctxid)
+
+        return Response(
+            self._stream(context, log_from, notifications_from),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    def _stream(self, context: AgentContext, log_from: int, notifications_from: int):
+        notification_manager = AgentContext.get_notification_manager()
+        log_guid = context.log.guid
+        notifications_guid = notification_manager.guid
+        sent_contexts: dict[str, dict] = {}
+        sent_tasks: dict[str, dict] = {}
+        sent_state = None
+        version = -1
+
+        while True:
+            version = state_monitor.wait_for_change(
+                version, state_monitor.REFRESH_INTERVAL
+            )
+            time.sleep(COALESCE_DELAY)
+            version = state_monitor.get_version()
+
+            # context may have been replaced under the same id
+            context = AgentContext.get(context.id) or context
+
+            # logs reset, send all from the start
+            if log_guid != context.log.guid:
+                log_guid = context.log.guid
+                log_from = 0
+            if notifications_guid != notification_manager.guid:
+                notifications_guid = notification_manager.guid
+                notifications_from = 0
+
+            log_version = len(context.log.updates)
+            logs = context.log.output(start=log_from)
+            notifications_version = len(notification_manager.updates)
+            notifications = notification_manager.output(start=notifications_from)
+
+            ctxs, tasks = state_monitor.get_context_lists()
+            contexts_updated, contexts_removed = _diff(sent_contexts, ctxs)
+            tasks_updated, tasks_removed = _diff(sent_tasks, tasks)
+
+            state = (
+                log_guid,
+                log_version,
+                context.log.progress,
+                context.log.progress_active,
+                context.paused,
+                notifications_guid,
+                notifications_version,
+            )
+            if (
+                state == sent_state
+                and not contexts_updated
+                and not contexts_removed
+                and not tasks_updated
+                and not tasks_removed
+            ):
+                yield ": keepalive\n\n"
+                continue
+
+            update = {
+                "context": context.id,
+                "contexts_updated": contexts_updated,
+                "contexts_removed": contexts_removed,
+                "tasks_updated": tasks_updated,
+                "tasks_removed": tasks_removed,
+                "logs": logs,
+                "log_from": log_from,
+                "log_guid": log_guid,
+                "log_version": log_version,
+                "log_progress": context.log.progress,
+                "log_progress_active": context.log.progress_active,
+                "paused": context.paused,
+                "notifications": notifications,
+                "notifications_guid": notifications_guid,
+                "notifications_version": notifications_version,
+            }
+            yield f"data: {json.dumps(update)}\n\n"
+
+            sent_state = state
+            log_from = log_version
+            notifications_from = notifications_version
+
+
+def _diff(sent: dict[str, dict], current: list[dict]) -> tuple[list[dict], list[str]]:
+    # returns changed items and removed ids, updates the sent dict in place
+    updated = [item for item in current if sent.get(item["id"]) != item]
+    current_ids = {item["id"] for item in current}
+    removed = [id for id in sent if id not in current_ids]
+    for id in removed:
+        del sent[id]
+    for item in updated:
+        sent[item["id"]] = item
+    return updated, removed
@@ -7,6 +7,9 @@ DATA_NAME_TASK = "_organize_history_task"
 
 class OrganizeHistory(Extension):
     async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
+        # past the soft limit, start summarizing the oldest topics in background so compression rarely has to wait
+        self.agent.history.prepare_summaries()
+
         # is there a running task? if yes, skip this round, the wait extension will double check the context size
         task = self.agent.get_data(DATA_NAME_TASK)
         if task and not task.done():
@@ -16,7 +16,7 @@ class MaskReasoningStreamChunk(Extension):
             # Initialize filter if not exists
             filter_key = "_reason_stream_filter"
             filter_instance = agent.get_data(filter_key)
-            if not filter_instance:
+            if not filter_instance or stream_data["chunk"] == stream_data["full"]:  # new stream
                 filter_instance = secrets_mgr.create_streaming_filter()
                 agent.set_data(filter_key, filter_instance)
 
@@ -26,8 +26,8 @@ class MaskReasoningStreamChunk(Extension):
             # Update the stream data with processed chunk
             stream_data["chunk"] = processed_chunk
 
-            # Also mask the full text for consistency
-            stream_data["full"] = secrets_mgr.mask_values(stream_data["full"])
+            # Masked full text is what the filter emitted so far, the whole stream is not scanned again
+            stream_data["full"] = filter_instance.output
 
             # Print the processed chunk (this is where printing should happen)
             if processed_chunk:
@@ -15,13 +15,16 @@ class MaskReasoningStreamEnd(Extension):
             if filter_instance:
                 tail = filter_instance.finalize()
 
+                # Clean up the filter
+                agent.set_data(filter_key, None)
+
                 # Print any remaining masked content
                 if tail:
                     from python.helpers.print_style import PrintStyle
                     PrintStyle().stream(tail)
 
-                # Clean up the filter
-                agent.set_data(filter_key, None)
+                    # The held back tail is the end of the reasoning, pass the complete text on
+                    await agent.handle_reasoning_stream(filter_instance.output)
         except Exception as e:
             # If masking fails, proceed without masking
             pass
@@ -41,10 +41,12 @@ class LogFromStream(Extension):
         # update log message
         log_item = loop_data.params_temporary["log_item_generating"]
 
-        # keep reasoning from previous logs in kvps
+        # keep reasoning and prompt cache usage from previous logs in kvps
         kvps = {}
-        if log_item.kvps is not None and "reasoning" in log_item.kvps:
-            kvps["reasoning"] = log_item.kvps["reasoning"]
+        if log_item.kvps is not None:
+            for key in ("reasoning", "cache_read_tokens", "cache_write_tokens"):
+                if key in log_item.kvps:
+                    kvps[key] = log_item.kvps[key]
         kvps.update(parsed)
 
         # update the log item
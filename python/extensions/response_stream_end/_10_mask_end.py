@@ -16,13 +16,16 @@ class MaskResponseStreamEnd(Extension):
             if filter_instance:
                 tail = filter_instance.finalize()
 
+                # Clean up the filter
+                agent.set_data(filter_key, None)
+
                 # Print any remaining masked content
                 if tail:
                     from python.helpers.print_style import PrintStyle
                     PrintStyle().stream(tail)
 
-                # Clean up the filter
-                agent.set_data(filter_key, None)
+                    # The held back tail is the end of the response, let the stream parser see it too
+                    await agent.handle_response_stream(filter_instance.output, tail)
         except Exception as e:
             # If masking fails, proceed without masking
             pass
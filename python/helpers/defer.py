@@ -1,11 +1,15 @@
 import asyncio
 from dataclasses import dataclass
 import threading
+import time
 from concurrent.futures import Future
 from typing import Any, Callable, Optional, Coroutine, TypeVar, Awaitable
 
 T = TypeVar("T")
 
+HEARTBEAT_INTERVAL = 1.0  # seconds between event loop lag measurements
+
+
 class EventLoopThread:
     _instances = {}
     _lock = threading.Lock()
@@ -35,8 +39,27 @@ class EventLoopThread:
         if not self.loop:
             raise RuntimeError("Event loop is not initialized")
         asyncio.set_event_loop(self.loop)
+        self.lag = 0.0
+        self.loop.call_soon(self._heartbeat, time.monotonic())
         self.loop.run_forever()
 
+    def _heartbeat(self, expected: float):
+        # how late the callback ran, shows how long the loop was blocked
+        now = time.monotonic()
+        self.lag = max(0.0, now - expected)
+        if self.loop:
+            self.loop.call_later(
+                HEARTBEAT_INTERVAL, self._heartbeat, now + HEARTBEAT_INTERVAL
+            )
+
+    def get_task_count(self) -> int:
+        if not self.loop or not self.loop.is_running():
+            return 0
+        try:
+            return len(asyncio.all_tasks(self.loop))
+        except RuntimeError:
+            return 0
+
     def terminate(self):
         if self.loop and self.loop.is_running():
             self.loop.stop()
@@ -50,6 +73,54 @@ class EventLoopThread:
         return asyncio.run_coroutine_threadsafe(coro, self.loop)
 
 
+class EventLoopPool:
+    """
+    Fixed set of event loop threads named "<name>-<index>".
+    Each key (e.g. context id) is assigned to the least loaded thread once and stays there.
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = max(1, size)
+        self._assigned: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_thread_name(self, key: str) -> str:
+        with self._lock:
+            index = self._assigned.get(key)
+            if index is None:
+                counts = [0] * self.size
+                for i in self._assigned.values():
+                    counts[i] += 1
+                index = counts.index(min(counts))
+                self._assigned[key] = index
+        return f"{self.name}-{index}"
+
+    def get_thread(self, key: str) -> EventLoopThread:
+        return EventLoopThread(self.get_thread_name(key))
+
+    def release(self, key: str):
+        with self._lock:
+            self._assigned.pop(key, None)
+
+    def get_load(self) -> list[dict[str, Any]]:
+        with self._lock:
+            assigned = dict(self._assigned)
+        load = []
+        for index in range(self.size):
+            thread_name = f"{self.name}-{index}"
+            thread = EventLoopThread._instances.get(thread_name)
+            load.append(
+                {
+                    "thread": thread_name,
+                    "keys": [key for key, i in assigned.items() if i == index],
+                    "tasks": thread.get_task_count() if thread else 0,
+                    "lag": round(getattr(thread, "lag", 0.0), 3),
+                }
+            )
+        return load
+
+
 @dataclass
 class ChildTask:
     task: "DeferredTask"
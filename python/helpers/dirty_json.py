@@ -1,4 +1,5 @@
 import json
+import re
 
 def try_parse(json_string: str):
     try:
@@ -25,6 +26,18 @@ class DirtyJson:
         self.current_char = None
         self.result = None
         self.stack = []
+        # incremental (feed) state
+        self._pending = ""
+        self._pos = 0
+        self._state = _START
+        self._frames: list[_Frame] = []
+        self._comment = ""
+        self._quote = ""
+        self._is_key = False
+        self._placed = False  # current value already placed in its parent as a partial
+        self._partial_key = None  # key of an unfinished key string shown in its object
+        self._value = ""
+        self._buf: list[str] = []
 
     @staticmethod
     def parse_string(json_string):
@@ -51,13 +64,387 @@ class DirtyJson:
         self._parse()
         return self.result
 
-    def feed(self, chunk):
-        self.json_string += chunk
-        if not self.current_char and self.json_string:
-            self.current_char = self.json_string[0]
-        self._parse()
+    def feed(self, chunk: str):
+        """
+        Incrementally parse the next chunk of a streamed document.
+        Only the new chunk is scanned, the state of the parser is kept between calls
+        and the partially built result is returned, including growing string values.
+        Partial results are the same as parse_string() of the text received so far,
+        once the document has started.
+        Do not mix with parse() on the same instance.
+        """
+        self._pending = self._pending[self._pos :] + chunk
+        self._pos = 0
+        handlers = {
+            _START: self._feed_start,
+            _VALUE: self._feed_value,
+            _ARRAY: self._feed_array,
+            _KEY: self._feed_key,
+            _COLON: self._feed_colon,
+            _AFTER_VALUE: self._feed_after_value,
+            _STRING: self._feed_string,
+            _MSTRING: self._feed_multiline_string,
+            _NUMBER: self._feed_number,
+            _UNQUOTED: self._feed_unquoted,
+            _UNQUOTED_KEY: self._feed_unquoted_key,
+        }
+        while self._state != _DONE and self._pos < len(self._pending):
+            if not handlers[self._state]():
+                break  # more data needed
+        self._flush_partial()
         return self.result
 
+    def _feed_start(self):
+        # same as get_start_pos, but on the stream
+        indices = [
+            i for i in (self._pending.find(c, self._pos) for c in "{[\"") if i != -1
+        ]
+        if not indices:
+            self._pos = len(self._pending)
+            return False
+        self._pos = min(indices)
+        self._state = _VALUE
+        return True
+
+    def _feed_skip_whitespace(self):
+        text, n = self._pending, len(self._pending)
+        if self._comment:
+            end = "\n" if self._comment == "line" else "*/"
+            idx = text.find(end, self._pos)
+            if idx == -1:
+                # keep the last char of a block comment, it can be the first half of */
+                self._pos = n if end == "\n" else max(self._pos, n - 1)
+                return False
+            self._pos = idx + len(end)
+            self._comment = ""
+        while self._pos < n:
+            char = text[self._pos]
+            if char.isspace():
+                self._pos += 1
+            elif char == "/":
+                if self._pos + 1 >= n:
+                    return False
+                if text[self._pos + 1] == "/":
+                    self._comment = "line"
+                elif text[self._pos + 1] == "*":
+                    self._comment = "block"
+                else:
+                    return True
+                self._pos += 2
+                return self._feed_skip_whitespace()
+            else:
+                return True
+        return False
+
+    def _feed_value(self):
+        if not self._feed_skip_whitespace():
+            return False
+        text, pos, n = self._pending, self._pos, len(self._pending)
+        char = text[pos]
+        if char == "{":
+            if pos + 1 >= n:
+                return False
+            double = text[pos + 1] == "{"  # Handle {{
+            self._pos += 2 if double else 1
+            self._feed_open({}, double)
+            self._state = _KEY
+        elif char == "[":
+            self._pos += 1
+            self._feed_open([], False)
+            self._state = _ARRAY
+        elif char in ['"', "'", "`"]:
+            if pos + 1 < n and text[pos + 1] != char:
+                multiline = False
+            elif pos + 2 < n:
+                multiline = text[pos + 1 : pos + 3] == char * 2
+            else:
+                return False
+            self._quote = char
+            self._is_key = False
+            self._value = ""
+            self._pos += 3 if multiline else 1
+            self._state = _MSTRING if multiline else _STRING
+            self._feed_place("")
+        elif char.isdigit() or char in ["-", "+"]:
+            self._value = ""
+            self._state = _NUMBER
+        elif char in [",", "}", "]"]:
+            self._feed_finish_value("")
+        else:
+            lower = text[pos : pos + 9].lower()
+            for literal, value in _LITERALS:
+                if lower.startswith(literal):
+                    self._pos += len(literal)
+                    self._feed_finish_value(value)
+                    return True
+                if pos + len(lower) == n and literal.startswith(lower):
+                    return False  # could still become a literal
+            self._value = ""
+            self._state = _UNQUOTED
+        return True
+
+    def _feed_array(self):
+        if not self._feed_skip_whitespace():
+            return False
+        if self._pending[self._pos] == "]":
+            self._pos += 1
+            self._feed_close()
+        else:
+            self._state = _VALUE
+        return True
+
+    def _feed_key(self):
+        if not self._feed_skip_whitespace():
+            return False
+        text, pos = self._pending, self._pos
+        char = text[pos]
+        if char == "}":
+            if self._frames[-1].double:  # Handle }}
+                if pos + 1 >= len(text):
+                    return False
+                self._pos += 2 if text[pos + 1] == "}" else 1
+            else:
+                self._pos += 1
+            self._feed_close()
+        elif char == "]":
+            self._pos += 1
+            self._feed_close()
+        elif char == ",":
+            self._pos += 1
+        elif char in ['"', "'"]:
+            self._quote = char
+            self._is_key = True
+            self._value = ""
+            self._pos += 1
+            self._state = _STRING
+        else:
+            self._value = ""
+            self._state = _UNQUOTED_KEY
+        return True
+
+    def _feed_colon(self):
+        if not self._feed_skip_whitespace():
+            return False
+        if self._pending[self._pos] == ":":
+            self._pos += 1
+        self._state = _VALUE
+        return True
+
+    def _feed_after_value(self):
+        if not self._feed_skip_whitespace():
+            return False
+        char = self._pending[self._pos]
+        if isinstance(self._frames[-1].container, dict):
+            if char == ",":
+                self._pos += 1
+            self._state = _KEY  # closing brace is handled by key state
+        elif char == ",":
+            self._pos += 1
+            self._state = _ARRAY
+        else:
+            if char == "]":
+                self._pos += 1
+            self._feed_close()
+        return True
+
+    def _feed_string(self):
+        text, n = self._pending, len(self._pending)
+        pattern = _STRING_STOPS[self._quote]
+        while True:
+            match = pattern.search(text, self._pos)
+            if not match:
+                self._buf.append(text[self._pos :])
+                self._pos = n
+                return False
+            stop = match.start()
+            self._buf.append(text[self._pos : stop])
+            self._pos = stop
+            if text[stop] == self._quote:
+                self._pos += 1
+                value = self._feed_take_buffer()
+                if self._is_key:
+                    self._feed_set_key(value)
+                else:
+                    self._feed_finish_value(value)
+                return True
+            # escape sequence
+            if stop + 1 >= n:
+                return False
+            escaped = text[stop + 1]
+            if escaped in _ESCAPES:
+                self._buf.append(_ESCAPES[escaped])
+                self._pos += 2
+            elif escaped == "u":
+                hex_chars = text[stop + 2 : stop + 6]
+                valid = len(hex_chars)
+                for i, c in enumerate(hex_chars):
+                    if not c.isalnum():
+                        valid = i
+                        break
+                if valid == len(hex_chars) < 4:
+                    return False  # wait for all 4 hex digits
+                hex_chars = hex_chars[:valid]
+                try:
+                    if valid < 4:
+                        raise ValueError()
+                    self._buf.append(chr(int(hex_chars, 16)))
+                except ValueError:
+                    self._buf.append("\\u" + hex_chars)
+                self._pos += 2 + valid
+            else:
+                self._pos += 2  # unknown escapes are dropped, same as parse()
+
+    def _feed_multiline_string(self):
+        text, n = self._pending, len(self._pending)
+        idx = text.find(self._quote * 3, self._pos)
+        if idx == -1:
+            # keep the last two chars, they can be the start of the closing quotes
+            end = max(self._pos, n - 2)
+            self._buf.append(text[self._pos : end])
+            self._pos = end
+            return False
+        self._buf.append(text[self._pos : idx])
+        self._pos = idx + 3
+        self._feed_finish_value(self._feed_take_buffer().strip())
+        return True
+
+    def _feed_number(self):
+        match = _NUMBER_CHARS.match(self._pending, self._pos)
+        end = match.end() if match else self._pos
+        self._buf.append(self._pending[self._pos : end])
+        self._pos = end
+        if end >= len(self._pending):
+            return False
+        self._feed_finish_value(_to_number(self._feed_take_buffer()))
+        return True
+
+    def _feed_unquoted(self):
+        match = _UNQUOTED_STOPS.search(self._pending, self._pos)
+        if not match:
+            self._buf.append(self._pending[self._pos :])
+            self._pos = len(self._pending)
+            return False
+        self._buf.append(self._pending[self._pos : match.start()])
+        self._pos = match.start()
+        if self._pending[self._pos] == ":":
+            self._pos += 1
+        self._feed_finish_value(self._feed_take_buffer().strip())
+        return True
+
+    def _feed_unquoted_key(self):
+        match = _UNQUOTED_KEY_STOPS.search(self._pending, self._pos)
+        if not match:
+            self._buf.append(self._pending[self._pos :])
+            self._pos = len(self._pending)
+            return False
+        self._buf.append(self._pending[self._pos : match.start()])
+        self._pos = match.start()
+        self._feed_set_key(self._feed_take_buffer())
+        return True
+
+    def _feed_take_buffer(self):
+        self._value += "".join(self._buf)
+        self._buf.clear()
+        value, self._value = self._value, ""
+        return value
+
+    def _feed_place(self, value):
+        if not self._frames:
+            self.result = value
+            return
+        frame = self._frames[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        elif self._placed:
+            frame.container[-1] = value
+        else:
+            frame.container.append(value)
+        self._placed = True
+
+    def _feed_unplace(self):
+        # remove a partial value that turned out to be nothing yet
+        if not self._placed:
+            return
+        if not self._frames:
+            self.result = None
+        elif isinstance(self._frames[-1].container, dict):
+            self._frames[-1].container[self._frames[-1].key] = None
+        else:
+            self._frames[-1].container.pop()
+        self._placed = False
+
+    def _feed_open(self, container, double: bool):
+        self._feed_place(container)
+        self._frames.append(_Frame(container, double))
+        self._placed = False
+
+    def _feed_close(self):
+        self._frames.pop()
+        self._placed = False
+        self._state = _AFTER_VALUE if self._frames else _DONE
+
+    def _feed_set_key(self, key: str):
+        frame = self._frames[-1]
+        self._feed_drop_partial_key()
+        frame.key = key
+        frame.container[key] = None  # End of input reached after key
+        self._state = _COLON
+
+    def _feed_drop_partial_key(self):
+        if self._partial_key is not None:
+            self._frames[-1].container.pop(self._partial_key, None)
+            self._partial_key = None
+
+    def _feed_finish_value(self, value):
+        self._feed_place(value)
+        self._placed = False
+        self._state = _AFTER_VALUE if self._frames else _DONE
+
+    def _flush_partial(self):
+        # expose the value currently being streamed in its parent container, as parse() would see it
+        tail = self._pending[self._pos :]  # text held back until the next chunk decides it
+        if self._state in (_STRING, _UNQUOTED_KEY):
+            self._value += "".join(self._buf)
+            self._buf.clear()
+            partial = self._value
+            if tail.startswith("\\u"):
+                partial += tail  # incomplete unicode escape is kept literally
+            if self._state == _STRING and not self._is_key:
+                self._feed_place(partial)
+            elif self._partial_key != partial:
+                self._feed_drop_partial_key()
+                if partial not in self._frames[-1].container:
+                    self._frames[-1].container[partial] = None
+                    self._partial_key = partial
+        elif self._state in (_MSTRING, _UNQUOTED):
+            self._value += "".join(self._buf)
+            self._buf.clear()
+            self._feed_place((self._value + tail).strip())
+        elif self._state == _VALUE:
+            # start of a value that the next chunk decides: quotes, {{, a literal or a comment
+            start = tail.lstrip()
+            if self._comment or not start:
+                self._feed_unplace()
+            elif start[0] in ['"', "'", "`"]:
+                self._feed_place("")
+            elif start[0] == "{":
+                self._feed_place({})
+            else:
+                self._feed_place(start.strip())  # unquoted until proven a literal
+        elif self._state == _KEY:
+            self._feed_drop_partial_key()
+            if not self._comment and tail.lstrip().startswith("/"):
+                if "/" not in self._frames[-1].container:  # unquoted key until proven a comment
+                    self._frames[-1].container["/"] = None
+                    self._partial_key = "/"
+        elif self._state == _NUMBER:
+            self._value += "".join(self._buf)
+            self._buf.clear()
+            try:
+                self._feed_place(_to_number(self._value))
+            except ValueError:
+                pass  # incomplete number like "1e"
+
     def _advance(self, count=1):
         self.index += count
         if self.index < len(self.json_string):
@@ -114,9 +501,10 @@ class DirtyJson:
     def _parse_value(self):
         self._skip_whitespace()
         if self.current_char == "{":
-            if self._peek(1) == "{":  # Handle {{
-                self._advance(2)
-            return self._parse_object()
+            double = self._peek(1) == "{"  # Handle {{
+            if double:
+                self._advance()
+            return self._parse_object(double)
         elif self.current_char == "[":
             return self._parse_array()
         elif self.current_char in ['"', "'", "`"]:
@@ -149,18 +537,20 @@ class DirtyJson:
             return True
         return False
 
-    def _parse_object(self):
+    def _parse_object(self, double: bool = False):
         obj = {}
         self._advance()  # Skip opening brace
         self.stack.append(obj)
-        self._parse_object_content()
+        self._parse_object_content(double)
+        if self.stack and self.stack[-1] is obj:
+            self.stack.pop()  # End of input reached inside the object
         return obj
 
-    def _parse_object_content(self):
+    def _parse_object_content(self, double: bool = False):
         while self.current_char is not None:
             self._skip_whitespace()
             if self.current_char == "}":
-                if self._peek(1) == "}":  # Handle }}
+                if double and self._peek(1) == "}":  # Handle }} of {{
                     self._advance(2)
                 else:
                     self._advance()
@@ -217,6 +607,8 @@ class DirtyJson:
         self._advance()  # Skip opening bracket
         self.stack.append(arr)
         self._parse_array_content()
+        if self.stack and self.stack[-1] is arr:
+            self.stack.pop()  # End of input reached inside the array
         return arr
 
     def _parse_array_content(self):
@@ -226,6 +618,8 @@ class DirtyJson:
                 self._advance()
                 self.stack.pop()
                 return
+            if self.current_char is None:
+                break  # End of input reached before the next value
             value = self._parse_value()
             self.stack[-1].append(value)
             self._skip_whitespace()
@@ -263,11 +657,13 @@ class DirtyJson:
                     # Try to collect exactly 4 hex digits
                     for _ in range(4):
                         if self.current_char is None or not self.current_char.isalnum():
-                            # If we can't get 4 hex digits, treat it as a literal '\u' followed by whatever we got
-                            return result + "\\u" + unicode_char
+                            break
                         unicode_char += self.current_char
                         self._advance()
                     try:
+                        if len(unicode_char) < 4:
+                            # If we can't get 4 hex digits, treat it as a literal '\u' followed by whatever we got
+                            raise ValueError()
                         result += chr(int(unicode_char, 16))
                     except ValueError:
                         # If invalid hex value, treat as literal
@@ -333,3 +729,41 @@ class DirtyJson:
         chars = ["{", "[", '"']
         indices = [input_str.find(char) for char in chars if input_str.find(char) != -1]
         return min(indices) if indices else 0
+
+
+# states of the incremental parser
+_START, _VALUE, _ARRAY, _KEY, _COLON, _AFTER_VALUE = range(6)
+_STRING, _MSTRING, _NUMBER, _UNQUOTED, _UNQUOTED_KEY, _DONE = range(6, 12)
+
+_LITERALS = [("true", True), ("false", False), ("null", None), ("undefined", None)]
+_ESCAPES = {
+    '"': '"',
+    "'": "'",
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+_STRING_STOPS = {q: re.compile("[" + re.escape(q) + r"\\]") for q in ['"', "'", "`"]}
+_NUMBER_CHARS = re.compile(r"[0-9+\-.eE]*")
+_UNQUOTED_STOPS = re.compile(r"[:,}\]]")
+_UNQUOTED_KEY_STOPS = re.compile(r"[\s:,}\]]")
+
+
+class _Frame:
+    __slots__ = ("container", "double", "key")
+
+    def __init__(self, container: dict | list, double: bool):
+        self.container = container
+        self.double = double
+        self.key = ""
+
+
+def _to_number(number_str: str):
+    try:
+        return int(number_str)
+    except ValueError:
+        return float(number_str)
@@ -3,8 +3,13 @@ import os
 import asyncio
 import aiohttp
 import json
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass
 
-from python.helpers.vector_db import VectorDB
+from python.helpers.vector_db import VectorDB, get_embeddings_key
 
 os.environ["USER_AGENT"] = "@mixedbread-ai/unstructured"  # noqa E402
 from langchain_unstructured import UnstructuredLoader  # noqa E402
@@ -25,43 +30,64 @@ from langchain.schema import SystemMessage, HumanMessage
 from python.helpers.print_style import PrintStyle
 from python.helpers import files, errors
 from agent import Agent
+import models
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 
 DEFAULT_SEARCH_THRESHOLD = 0.5
+DOCUMENT_INDEX_DIR = "tmp/document_index"  # persisted document indexes, per embedding model
+DOCUMENT_CACHE_SIZE = 50  # indexed documents kept loaded in memory
+
+
+@dataclass
+class IndexedDocument:
+    uri: str
+    version: str | None  # mtime, ETag or Last-Modified of the source
+    content_hash: str
+    vector_db: VectorDB
 
 
 class DocumentQueryStore:
     """
     FAISS Store for document query results.
-    Manages documents identified by URI for storage, retrieval, and searching.
+    Documents identified by URI are indexed once per version, kept in memory and on disk,
+    and shared by all agents using the same embedding model.
     """
 
     # Default chunking parameters
     DEFAULT_CHUNK_SIZE = 1000
     DEFAULT_CHUNK_OVERLAP = 100
 
-    # Cache for initialized stores
+    # Cache for initialized stores, one per embedding model
     _stores: dict[str, "DocumentQueryStore"] = {}
+    _stores_lock = threading.Lock()
 
     @staticmethod
     def get(agent: Agent):
-        """Create a DocumentQueryStore instance for the specified agent."""
+        """Get the DocumentQueryStore instance for the embedding model of the agent."""
         if not agent or not agent.config:
             raise ValueError("Agent and agent config must be provided")
 
-        # Initialize store
-        store = DocumentQueryStore(agent)
+        model = agent.config.embeddings_model
+        key = get_embeddings_key(model)
+        with DocumentQueryStore._stores_lock:
+            store = DocumentQueryStore._stores.get(key)
+            if not store:
+                store = DocumentQueryStore(model, f"{model.provider}/{model.name}")
+                DocumentQueryStore._stores[key] = store
         return store
 
     def __init__(
         self,
-        agent: Agent,
+        model_config: models.ModelConfig,
+        namespace: str = "default",
     ):
-        """Initialize a DocumentQueryStore instance."""
-        self.agent = agent
-        self.vector_db: VectorDB | None = None
+        """Initialize a DocumentQueryStore instance for an embedding model, namespace is the folder of its indexes on disk."""
+        self.model_config = model_config
+        self.namespace = namespace
+        self._documents: OrderedDict[str, IndexedDocument] = OrderedDict()
+        self._lock = threading.Lock()
 
     @staticmethod
     def normalize_uri(uri: str) -> str:
@@ -94,19 +120,60 @@ class DocumentQueryStore:
 
         return normalized
 
+    @staticmethod
+    def hash_content(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
     def init_vector_db(self):
-        return VectorDB(self.agent, cache=True)
+        return VectorDB(model_config=self.model_config, cache=True)
+
+    async def is_document_current(
+        self,
+        document_uri: str,
+        version: str | None = None,
+        content_hash: str | None = None,
+    ) -> bool:
+        """
+        Check if the document is indexed for the given source version or content hash.
+        Loads the index from disk when needed.
+
+        Args:
+            document_uri: The URI of the document
+            version: Version of the source (mtime, ETag), if known
+            content_hash: Hash of the parsed document text, if known
+
+        Returns:
+            True if the existing index can be used
+        """
+        document_uri = self.normalize_uri(document_uri)
+        doc = await self._get_indexed(document_uri)
+        if not doc:
+            return False
+        if version and doc.version == version:
+            return True
+        if content_hash and doc.content_hash == content_hash:
+            if version:
+                # source was touched but content is the same, skip parsing next time
+                doc.version = version
+                self._save_meta(doc)
+            return True
+        return False
 
     async def add_document(
-        self, text: str, document_uri: str, metadata: dict | None = None
+        self,
+        text: str,
+        document_uri: str,
+        metadata: dict | None = None,
+        version: str | None = None,
     ) -> tuple[bool, list[str]]:
         """
-        Add a document to the store with the given URI.
+        Add a document to the store with the given URI, replacing its previous version.
 
         Args:
             text: The document text content
             document_uri: The URI that uniquely identifies this document
             metadata: Optional metadata for the document
+            version: Version of the source (mtime, ETag) used to validate the index later
 
         Returns:
             True if successful, False otherwise
@@ -114,9 +181,6 @@ class DocumentQueryStore:
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
 
-        # Delete existing document if it exists to avoid duplicates
-        await self.delete_document(document_uri)
-
         # Initialize metadata
         doc_metadata = metadata or {}
         doc_metadata["document_uri"] = document_uri
@@ -141,11 +205,22 @@ class DocumentQueryStore:
             return False, []
 
         try:
-            # Initialize vector db if not already initialized
-            if not self.vector_db:
-                self.vector_db = self.init_vector_db()
+            # each document has its own index, replaced as a whole when the document changes
+            vector_db = self.init_vector_db()
+            embeddings = await vector_db.embeddings.aembed_documents(
+                [doc.page_content for doc in docs]
+            )
+            ids = await vector_db.insert_documents(docs, embeddings)
+
+            doc = IndexedDocument(
+                uri=document_uri,
+                version=version,
+                content_hash=self.hash_content(text),
+                vector_db=vector_db,
+            )
+            self._remember(doc)
+            self._save_document(doc, docs, embeddings)
 
-            ids = await self.vector_db.insert_documents(docs)
             PrintStyle.standard(
                 f"Added document '{document_uri}' with {len(docs)} chunks"
             )
@@ -166,10 +241,6 @@ class DocumentQueryStore:
             The complete document if found, None otherwise
         """
 
-        # DB not initialized, no documents inside
-        if not self.vector_db:
-            return None
-
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
 
@@ -201,18 +272,14 @@ class DocumentQueryStore:
             List of document chunks
         """
 
-        # DB not initialized, no documents inside
-        if not self.vector_db:
-            return []
-
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
 
-        # get docs from vector db
+        doc = await self._get_indexed(document_uri)
+        if not doc:
+            return []
 
-        chunks = await self.vector_db.search_by_metadata(
-            filter=f"document_uri == '{document_uri}'",
-        )
+        chunks = list(doc.vector_db.db.get_all_docs().values())
 
         PrintStyle.standard(f"Found {len(chunks)} chunks for document: {document_uri}")
         return chunks
@@ -228,15 +295,10 @@ class DocumentQueryStore:
             True if the document exists, False otherwise
         """
 
-        # DB not initialized, no documents inside
-        if not self.vector_db:
-            return False
-
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
 
-        chunks = await self._get_document_chunks(document_uri)
-        return len(chunks) > 0
+        return await self._get_indexed(document_uri) is not None
 
     async def delete_document(self, document_uri: str) -> bool:
         """
@@ -249,37 +311,28 @@ class DocumentQueryStore:
             True if deleted, False if not found
         """
 
-        # DB not initialized, no documents inside
-        if not self.vector_db:
-            return False
-
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
 
-        chunks = await self.vector_db.search_by_metadata(
-            filter=f"document_uri == '{document_uri}'",
-        )
-        if not chunks:
-            return False
+        with self._lock:
+            doc = self._documents.pop(document_uri, None)
 
-        # Collect IDs to delete
-        ids_to_delete = [chunk.metadata["id"] for chunk in chunks]
+        found = doc is not None
+        for ext in (".json", ".npy"):
+            path = self._get_index_path(document_uri, ext)
+            if os.path.exists(path):
+                os.remove(path)
+                found = True
 
-        # Delete from vector store
-        if ids_to_delete:
-            dels = await self.vector_db.delete_documents_by_ids(ids_to_delete)
-            PrintStyle.standard(
-                f"Deleted document '{document_uri}' with {len(dels)} chunks"
-            )
-            return True
-
-        return False
+        if found:
+            PrintStyle.standard(f"Deleted document '{document_uri}'")
+        return found
 
     async def search_documents(
         self, query: str, limit: int = 10, threshold: float = 0.5, filter: str = ""
     ) -> List[Document]:
         """
-        Search for documents similar to the query across the entire store.
+        Search for documents similar to the query across all loaded documents.
 
         Args:
             query: The search query string
@@ -290,19 +343,23 @@ class DocumentQueryStore:
             List of matching documents
         """
 
-        # DB not initialized, no documents inside
-        if not self.vector_db:
-            return []
-
         # Handle empty query
         if not query:
             return []
 
+        with self._lock:
+            docs = list(self._documents.values())
+
         # Perform search
         try:
-            results = await self.vector_db.search_by_similarity_threshold(
-                query=query, limit=limit, threshold=threshold, filter=filter
-            )
+            scored: list[tuple[Document, float]] = []
+            for doc in docs:
+                scored += await doc.vector_db.search_by_similarity_threshold_with_scores(
+                    query=query, limit=limit, threshold=threshold, filter=filter
+                )
+            # best matches across all documents
+            scored.sort(key=lambda item: item[1], reverse=True)
+            results = [item[0] for item in scored[:limit]]
 
             PrintStyle.standard(f"Search '{query}' returned {len(results)} results")
             return results
@@ -325,9 +382,23 @@ class DocumentQueryStore:
         Returns:
             List of matching document chunks
         """
-        return await self.search_documents(
-            query, limit, threshold, f"document_uri == '{document_uri}'"
-        )
+        # Handle empty query
+        if not query:
+            return []
+
+        doc = await self._get_indexed(self.normalize_uri(document_uri))
+        if not doc:
+            return []
+
+        try:
+            results = await doc.vector_db.search_by_similarity_threshold(
+                query=query, limit=limit, threshold=threshold
+            )
+            PrintStyle.standard(f"Search '{query}' returned {len(results)} results")
+            return results
+        except Exception as e:
+            PrintStyle.error(f"Error searching documents: {str(e)}")
+            return []
 
     async def list_documents(self) -> List[str]:
         """
@@ -336,20 +407,122 @@ class DocumentQueryStore:
         Returns:
             List of document URIs
         """
-        # DB not initialized, no documents inside
-        if not self.vector_db:
-            return []
-
-        # Extract unique URIs
-        uris = set()
-        for doc in self.vector_db.db.get_all_docs().values():
-            if isinstance(doc.metadata, dict):
-                uri = doc.metadata.get("document_uri")
-                if uri:
-                    uris.add(uri)
+        with self._lock:
+            uris = set(self._documents.keys())
+
+        # documents indexed on disk
+        index_dir = self._get_index_path("", "")
+        if os.path.isdir(index_dir):
+            for name in os.listdir(index_dir):
+                if name.endswith(".json"):
+                    meta = self._read_meta(os.path.join(index_dir, name))
+                    if meta:
+                        uris.add(meta["uri"])
 
         return sorted(list(uris))
 
+    async def _get_indexed(self, document_uri: str) -> IndexedDocument | None:
+        with self._lock:
+            doc = self._documents.get(document_uri)
+            if doc:
+                self._documents.move_to_end(document_uri)
+                return doc
+        return await self._load_document(document_uri)
+
+    def _remember(self, doc: IndexedDocument):
+        with self._lock:
+            self._documents[doc.uri] = doc
+            self._documents.move_to_end(doc.uri)
+            # least recently used documents are dropped from memory, they stay on disk
+            while len(self._documents) > DOCUMENT_CACHE_SIZE:
+                self._documents.popitem(last=False)
+
+    def _get_index_path(self, document_uri: str, ext: str) -> str:
+        name = (
+            hashlib.sha256(document_uri.encode("utf-8")).hexdigest() + ext
+            if document_uri
+            else ""
+        )
+        return files.get_abs_path(
+            DOCUMENT_INDEX_DIR, files.safe_file_name(self.namespace), name
+        )
+
+    def _read_meta(self, path: str) -> dict | None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _save_meta(self, doc: IndexedDocument, chunks: list[dict] | None = None):
+        path = self._get_index_path(doc.uri, ".json")
+        if chunks is None:
+            meta = self._read_meta(path)
+            if not meta:
+                return
+            chunks = meta["chunks"]
+        meta = {
+            "uri": doc.uri,
+            "version": doc.version,
+            "content_hash": doc.content_hash,
+            "chunks": chunks,
+        }
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def _save_document(
+        self, doc: IndexedDocument, docs: list[Document], embeddings: list[list[float]]
+    ):
+        try:
+            path = self._get_index_path(doc.uri, ".npy")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # vectors first, the metadata file marks a complete index
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, np.array(embeddings, dtype=np.float32))
+            os.replace(path + ".tmp", path)
+            chunks = [
+                {"text": chunk.page_content, "metadata": chunk.metadata}
+                for chunk in docs
+            ]
+            self._save_meta(doc, chunks)
+        except Exception as e:
+            PrintStyle.error(
+                f"Error saving document index '{doc.uri}': {errors.format_error(e)}"
+            )
+
+    async def _load_document(self, document_uri: str) -> IndexedDocument | None:
+        meta = self._read_meta(self._get_index_path(document_uri, ".json"))
+        if not meta:
+            return None
+        try:
+            embeddings = np.load(
+                self._get_index_path(document_uri, ".npy"), allow_pickle=False
+            )
+            chunks = meta["chunks"]
+            if len(embeddings) != len(chunks):
+                return None
+            docs = [
+                Document(page_content=chunk["text"], metadata=chunk["metadata"])
+                for chunk in chunks
+            ]
+            vector_db = self.init_vector_db()
+            await vector_db.insert_documents(docs, embeddings.tolist())
+        except Exception as e:
+            PrintStyle.error(
+                f"Error loading document index '{document_uri}': {errors.format_error(e)}"
+            )
+            return None
+
+        doc = IndexedDocument(
+            uri=document_uri,
+            version=meta.get("version"),
+            content_hash=meta.get("content_hash", ""),
+            vector_db=vector_db,
+        )
+        self._remember(doc)
+        return doc
+
 
 class DocumentQueryHelper:
 
@@ -492,7 +665,9 @@ class DocumentQueryHelper:
         # Use the store's normalization method
         document_uri_norm = self.store.normalize_uri(document_uri)
 
-        exists = await self.store.document_exists(document_uri_norm)
+        # skip parsing and embedding if the source did not change since indexing
+        version = await self.get_document_version(document_uri, scheme)
+        exists = await self.store.is_document_current(document_uri_norm, version)
         document_content = ""
         if not exists:
             if mimetype.startswith("image/"):
@@ -507,10 +682,16 @@ class DocumentQueryHelper:
                 document_content = self.handle_unstructured_document(
                     document_uri, scheme
                 )
-            if add_to_db:
+            if add_to_db and await self.store.is_document_current(
+                document_uri_norm,
+                version,
+                self.store.hash_content(document_content),
+            ):
+                self.progress_callback(f"Document unchanged, using existing index")
+            elif add_to_db:
                 self.progress_callback(f"Indexing document")
                 success, ids = await self.store.add_document(
-                    document_content, document_uri_norm
+                    document_content, document_uri_norm, version=version
                 )
                 if not success:
                     self.progress_callback(f"Failed to index document")
@@ -528,6 +709,33 @@ class DocumentQueryHelper:
                 )
         return document_content
 
+    async def get_document_version(self, document: str, scheme: str) -> str | None:
+        """Version of the document source, to validate its index without fetching the content."""
+        try:
+            if scheme == "file":
+                stat = os.stat(files.get_abs_path(document))
+                return f"mtime:{stat.st_mtime_ns}:{stat.st_size}"
+            if scheme in ["http", "https"]:
+                async with aiohttp.ClientSession() as session:
+                    async with session.head(
+                        document,
+                        timeout=aiohttp.ClientTimeout(total=2.0),
+                        allow_redirects=True,
+                    ) as response:
+                        if response.status > 399:
+                            return None
+                        etag = response.headers.get("etag")
+                        if etag:
+                            return f"etag:{etag}"
+                        modified = response.headers.get("last-modified")
+                        if modified:
+                            length = response.headers.get("content-length", "")
+                            return f"modified:{modified}:{length}"
+        except Exception:
+            pass
+        # unknown, the index is validated by content hash after parsing
+        return None
+
     def handle_image_document(self, document: str, scheme: str) -> str:
         return self.handle_unstructured_document(document, scheme)
 
@@ -9,6 +9,7 @@ KEY_AUTH_LOGIN = "AUTH_LOGIN"
 KEY_AUTH_PASSWORD = "AUTH_PASSWORD"
 KEY_RFC_PASSWORD = "RFC_PASSWORD"
 KEY_ROOT_PASSWORD = "ROOT_PASSWORD"
+KEY_RATE_LIMIT_DB = "A0_RATE_LIMIT_DB"
 
 def load_dotenv():
     _load_dotenv(get_dotenv_file_path(), override=True)
@@ -1,4 +1,6 @@
 from abc import abstractmethod
+import os
+import time
 from typing import Any
 from python.helpers import extract_tools, files 
 from typing import TYPE_CHECKING
@@ -7,6 +9,10 @@ if TYPE_CHECKING:
 
 class Extension:
 
+    # instances are created once per agent and reused for every call,
+    # set to False in extensions that keep per-call state on self
+    reusable: bool = True
+
     def __init__(self, agent: "Agent|None", **kwargs):
         self.agent: "Agent" = agent # type: ignore < here we ignore the type check as there are currently no extensions without an agent
         self.kwargs = kwargs
@@ -16,45 +22,115 @@ class Extension:
         pass
 
 
+# how often cached pipelines are checked against their folders, in seconds
+PIPELINE_RECHECK_INTERVAL = 2.0
+
+# (profile, extension point) -> extension classes in call order
+_pipelines: dict[tuple[str, str], tuple[type[Extension], ...]] = {}
+# (profile, extension point) -> (folders, folder signatures) the pipeline was compiled from
+_pipeline_signatures: dict[tuple[str, str], tuple[list[str], tuple]] = {}
+_last_recheck = 0.0
+
+
 async def call_extensions(extension_point: str, agent: "Agent|None" = None, **kwargs) -> Any:
+    profile = agent.config.profile if agent else ""
+    key = (profile, extension_point)
 
-    # get default extensions
-    defaults = await _get_extensions("python/extensions/" + extension_point)
-    classes = defaults
+    classes = _pipelines.get(key)
+    if classes is None:
+        classes = _compile_pipeline(key)
+    if not classes:
+        return
 
-    # get agent extensions
-    if agent and agent.config.profile:
-        agentics = await _get_extensions("agents/" + agent.config.profile + "/extensions/" + extension_point)
-        if agentics:
-            # merge them, agentics overwrite defaults
-            unique = {}
-            for cls in defaults + agentics:
-                unique[_get_file_from_module(cls.__module__)] = cls
+    if agent is None:
+        for cls in classes:
+            await cls(agent=agent).execute(**kwargs)
+        return
 
-            # sort by name
-            classes = sorted(unique.values(), key=lambda cls: _get_file_from_module(cls.__module__))
+    # instances live on the agent, so they are dropped together with it
+    # agent -> (profile, extension point) -> (classes, reusable instances, None where a fresh instance is needed)
+    cached_instances = agent._extension_instances.get(key)
+    if cached_instances is None or cached_instances[0] is not classes:
+        cached_instances = agent._extension_instances[key] = (
+            classes,
+            [cls(agent=agent) if cls.reusable else None for cls in classes],
+        )
 
     # call extensions
-    for cls in classes:
-        await cls(agent=agent).execute(**kwargs)
+    for cls, instance in zip(classes, cached_instances[1]):
+        await (instance or cls(agent=agent)).execute(**kwargs)
+
+
+def _get_folders(profile: str, extension_point: str) -> list[str]:
+    # default extensions first, agent extensions overwrite them
+    folders = [files.get_abs_path("python/extensions", extension_point)]
+    if profile:
+        folders.append(files.get_abs_path("agents", profile, "extensions", extension_point))
+    return folders
+
+
+def _get_folder_signature(folder: str) -> tuple:
+    try:
+        with os.scandir(folder) as entries:
+            return tuple(
+                sorted(
+                    (entry.name, entry.stat().st_mtime_ns)
+                    for entry in entries
+                    if entry.name.endswith(".py")
+                )
+            )
+    except OSError:
+        return ()
+
+
+def refresh_pipelines():
+    """Drop cached pipelines whose extension files were added, removed or edited.
+    Called once per message loop iteration, folders are checked at most every PIPELINE_RECHECK_INTERVAL."""
+    global _last_recheck
+    now = time.monotonic()
+    if now - _last_recheck < PIPELINE_RECHECK_INTERVAL:
+        return
+    _last_recheck = now
+
+    signatures: dict[str, tuple] = {}  # folders shared by many pipelines are scanned once
+    for key, (folders, signature) in list(_pipeline_signatures.items()):
+        for folder in folders:
+            if folder not in signatures:
+                signatures[folder] = _get_folder_signature(folder)
+        if tuple(signatures[folder] for folder in folders) != signature:
+            _pipelines.pop(key, None)
+            _pipeline_signatures.pop(key, None)
+
+
+def _compile_pipeline(key: tuple[str, str]) -> tuple[type[Extension], ...]:
+    folders = _get_folders(*key)
+    signature = tuple(_get_folder_signature(folder) for folder in folders)
+
+    # merge by file name, later folders overwrite earlier ones
+    unique: dict[str, type[Extension]] = {}
+    for folder in folders:
+        for cls in _get_extensions(folder):
+            unique[_get_file_from_module(cls.__module__)] = cls
+
+    # sort by name
+    classes = tuple(sorted(unique.values(), key=lambda cls: _get_file_from_module(cls.__module__)))
+    _pipelines[key] = classes
+    _pipeline_signatures[key] = (folders, signature)
+    return classes
 
 
 def _get_file_from_module(module_name: str) -> str:
     return module_name.split(".")[-1]
 
-_cache: dict[str, list[type[Extension]]] = {}
-async def _get_extensions(folder:str):
-    global _cache
-    folder = files.get_abs_path(folder)
-    if folder in _cache:
-        classes = _cache[folder]
-    else:
-        if not files.exists(folder):
-            return []
-        classes = extract_tools.load_classes_from_folder(
-            folder, "*", Extension
-        )
-        _cache[folder] = classes
 
+def _get_extensions(folder: str) -> list[type[Extension]]:
+    if not files.exists(folder):
+        return []
+    classes = []
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.endswith(".py"):
+            # modules are imported again only when their file changed
+            classes += extract_tools.load_classes_from_file_cached(
+                os.path.join(folder, file_name), Extension
+            )
     return classes
-
@@ -1,4 +1,4 @@
-import re, os, importlib, importlib.util, inspect
+import re, os, importlib, importlib.util, inspect, threading
 from types import ModuleType
 from typing import Any, Type, TypeVar
 from .dirty_json import DirtyJson
@@ -118,3 +118,37 @@ def load_classes_from_file(file: str, base_class: type[T], one_per_file: bool =
                 break
                 
     return classes
+
+
+# (path, base class, one per file) -> (mtime, classes, error message when the import failed)
+_classes_cache: dict[tuple, tuple[int, list, str | None]] = {}
+_classes_lock = threading.Lock()
+
+def load_classes_from_file_cached(file: str, base_class: type[T], one_per_file: bool = True) -> list[type[T]]:
+    """Same as load_classes_from_file, but the module is imported again only when the file changes on disk.
+    Missing files and import errors are cached too until the file appears or changes."""
+    abs_path = get_abs_path(file)
+    key = (abs_path, base_class, one_per_file)
+    try:
+        mtime = os.stat(abs_path).st_mtime_ns
+    except OSError:
+        mtime = -1
+
+    cached = _classes_cache.get(key)
+    if not cached or cached[0] != mtime:
+        with _classes_lock:
+            cached = _classes_cache.get(key)
+            if not cached or cached[0] != mtime:
+                classes = []
+                if mtime != -1:
+                    try:
+                        classes = load_classes_from_file(abs_path, base_class, one_per_file)
+                    except Exception as e:
+                        _classes_cache[key] = (mtime, [], f"{type(e).__name__}: {e}")
+                        raise  # the import that failed raises the original error
+                cached = _classes_cache[key] = (mtime, classes, None)
+
+    if cached[2]:
+        # a new exception each time, a cached one would collect tracebacks of every lookup
+        raise ImportError(f"Failed to load {abs_path}: {cached[2]}") from None
+    return cached[1]
@@ -14,9 +14,18 @@ import importlib
 import importlib.util
 import inspect
 import glob
+import copy
+import threading
+from collections import OrderedDict
+from typing import Callable
 
 
 class VariablesPlugin(ABC):
+
+    # variables are cached until a file or folder read while building them changes,
+    # set to False in plugins whose variables depend on anything else
+    cacheable: bool = True
+
     @abstractmethod
     def get_variables(self, file: str, backup_dirs: list[str] | None = None) -> dict[str, Any]:  # type: ignore
         pass
@@ -29,6 +38,12 @@ def load_plugin_variables(file: str, backup_dirs: list[str] | None = None) -> di
     if backup_dirs is None:
         backup_dirs = []
 
+    # cached under the files the plugin was found in and read, not rendered again while they are unchanged
+    key = ("plugin", file, tuple(backup_dirs))
+    return _cached_prompt(key, lambda: _load_plugin_variables(file, backup_dirs))
+
+
+def _load_plugin_variables(file: str, backup_dirs: list[str]) -> dict[str, Any]:
     try:
         # Create filename and directories list
         plugin_filename = basename(file, ".md") + ".py"
@@ -39,9 +54,10 @@ def load_plugin_variables(file: str, backup_dirs: list[str] | None = None) -> di
 
     if plugin_file and exists(plugin_file):
         
-        from python.helpers import extract_tools
-        classes = extract_tools.load_classes_from_file(plugin_file, VariablesPlugin, one_per_file=False)
+        classes = _load_plugin_classes(plugin_file)
         for cls in classes:
+            if not cls.cacheable:
+                _track_uncacheable()
             return cls().get_variables(file, backup_dirs) # type: ignore < abstract class here is ok, it is always a subclass
 
         # load python code and extract variables variables from it
@@ -72,6 +88,72 @@ def load_plugin_variables(file: str, backup_dirs: list[str] | None = None) -> di
 
 from python.helpers.strings import sanitize_string
 
+PROMPT_CACHE_SIZE = 512  # rendered prompt files kept in memory
+
+# rendered prompts: key -> (result, {dependency path: mtime})
+_prompt_cache: "OrderedDict[tuple, tuple[Any, dict[str, int]]]" = OrderedDict()
+_prompt_cache_lock = threading.Lock()
+_dependencies = threading.local()  # stack of dependency dicts of prompts being rendered
+
+
+def _get_mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _track_dependency(path: str):
+    # files and directories read while rendering a prompt, directory mtime changes when files are added or removed
+    stack = getattr(_dependencies, "stack", None)
+    if stack:
+        mtime = _get_mtime(path)
+        for deps in stack:
+            deps[path] = mtime
+
+
+def _track_uncacheable():
+    # a dependency that never matches, prompts including this one are rendered every time
+    for deps in getattr(_dependencies, "stack", None) or []:
+        deps[""] = -2
+
+
+def _freeze_variables(variables: dict[str, Any]) -> tuple:
+    return tuple(sorted((key, repr(value)) for key, value in variables.items()))
+
+
+def _cached_prompt(key: tuple, render: Callable[[], Any]) -> Any:
+    """Return rendered prompt from cache if none of the files it was built from changed on disk."""
+    stack: list[dict[str, int]] = _dependencies.__dict__.setdefault("stack", [])
+    with _prompt_cache_lock:
+        entry = _prompt_cache.get(key)
+        if entry:
+            _prompt_cache.move_to_end(key)
+    if entry and all(_get_mtime(path) == mtime for path, mtime in entry[1].items()):
+        result, deps = entry
+    else:
+        deps = {}
+        stack.append(deps)
+        try:
+            result = render()
+        finally:
+            stack.pop()
+        with _prompt_cache_lock:
+            _prompt_cache[key] = (result, deps)
+            _prompt_cache.move_to_end(key)
+            while len(_prompt_cache) > PROMPT_CACHE_SIZE:
+                _prompt_cache.popitem(last=False)
+    # prompts including this one depend on the same files
+    for outer in stack:
+        outer.update(deps)
+    return result if isinstance(result, str) else copy.deepcopy(result)
+
+
+def _load_plugin_classes(plugin_file: str) -> list[type[VariablesPlugin]]:
+    # plugin modules are imported again only when changed on disk
+    from python.helpers import extract_tools
+    return extract_tools.load_classes_from_file_cached(plugin_file, VariablesPlugin, one_per_file=False)
+
 
 def parse_file(_filename: str, _directories: list[str] | None = None, _encoding="utf-8", **kwargs):
     if _directories is None:
@@ -80,6 +162,17 @@ def parse_file(_filename: str, _directories: list[str] | None = None, _encoding=
     # Find the file in the directories
     absolute_path = find_file_in_dirs(_filename, _directories)
 
+    # plugin variables are loaded while rendering, their files become dependencies of this prompt
+    key = ("parse", absolute_path, tuple(_directories), _encoding, _freeze_variables(kwargs))
+    return _cached_prompt(key, lambda: _parse_file(absolute_path, _directories, _encoding, kwargs))
+
+
+def _parse_file(absolute_path: str, _directories: list[str], _encoding: str, kwargs: dict[str, Any]):
+    _track_dependency(absolute_path)
+
+    variables = load_plugin_variables(absolute_path, _directories) or {}  # type: ignore
+    variables.update(kwargs)
+
     # Read the file content
     with open(absolute_path, "r", encoding=_encoding) as f:
         # content = remove_code_fences(f.read())
@@ -87,8 +180,6 @@ def parse_file(_filename: str, _directories: list[str] | None = None, _encoding=
     
     is_json = is_full_json_template(content)
     content = remove_code_fences(content)
-    variables = load_plugin_variables(absolute_path, _directories) or {}  # type: ignore
-    variables.update(kwargs)
     if is_json:
         content = replace_placeholders_json(content, **variables)
         obj = json.loads(content)
@@ -117,14 +208,22 @@ def read_prompt_file(_file: str, _directories: list[str] | None = None, _encodin
     # Find the file in the directories
     absolute_path = find_file_in_dirs(_file, _directories)
 
+    # plugin variables are loaded while rendering, their files become dependencies of this prompt
+    key = ("read", absolute_path, tuple(_directories), _encoding, _freeze_variables(kwargs))
+    return _cached_prompt(key, lambda: _read_prompt_file(absolute_path, _file, _directories, _encoding, kwargs))
+
+
+def _read_prompt_file(absolute_path: str, _file: str, _directories: list[str], _encoding: str, kwargs: dict[str, Any]):
+    _track_dependency(absolute_path)
+
+    variables = load_plugin_variables(_file, _directories) or {}  # type: ignore
+    variables.update(kwargs)
+
     # Read the file content
     with open(absolute_path, "r", encoding=_encoding) as f:
         # content = remove_code_fences(f.read())
         content = f.read()
 
-    variables = load_plugin_variables(_file, _directories) or {}  # type: ignore
-    variables.update(kwargs)
-
     # Replace placeholders with values from kwargs
     content = replace_placeholders_text(content, **variables)
 
@@ -240,7 +339,9 @@ def find_file_in_dirs(_filename: str, _directories: list[str]):
     for directory in _directories:
         # Create full path
         full_path = get_abs_path(directory, _filename)
+        _track_dependency(os.path.dirname(full_path))
         if exists(full_path):
+            _track_dependency(full_path)
             return full_path
 
     # If the file is not found, raise FileNotFoundError
@@ -254,6 +355,7 @@ def get_unique_filenames_in_dirs(dir_paths: list[str], pattern: str = "*"):
     result = []
     for dir_path in dir_paths:
         full_dir = get_abs_path(dir_path)
+        _track_dependency(full_dir)
         for file_path in glob.glob(os.path.join(full_dir, pattern)):
             fname = os.path.basename(file_path)
             if fname not in seen and os.path.isfile(file_path):
@@ -293,6 +395,14 @@ def write_file(relative_path: str, content: str, encoding: str = "utf-8"):
         f.write(content)
 
 
+def append_file(relative_path: str, content: str, encoding: str = "utf-8"):
+    abs_path = get_abs_path(relative_path)
+    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+    content = sanitize_string(content, encoding)
+    with open(abs_path, "a", encoding=encoding) as f:
+        f.write(content)
+
+
 def write_file_bin(relative_path: str, content: bytes):
     abs_path = get_abs_path(relative_path)
     os.makedirs(os.path.dirname(abs_path), exist_ok=True)
@@ -399,6 +509,7 @@ def get_subdirectories(
     exclude: str | list[str] | None = None,
 ):
     abs_path = get_abs_path(relative_path)
+    _track_dependency(abs_path)
     if not os.path.exists(abs_path):
         return []
     if isinstance(include, str):
@@ -2,10 +2,14 @@ from abc import abstractmethod
 import asyncio
 from collections import OrderedDict
 from collections.abc import Mapping
+import hashlib
 import json
 import math
+import os
+import time
+import uuid
 from typing import Coroutine, Literal, TypedDict, cast, Union, Dict, List, Any
-from python.helpers import messages, tokens, settings, call_llm
+from python.helpers import messages, tokens, settings, call_llm, files
 from enum import Enum
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage
 
@@ -17,6 +21,11 @@ HISTORY_BULK_RATIO = 0.2
 TOPIC_COMPRESS_RATIO = 0.65
 LARGE_MESSAGE_TO_TOPIC_RATIO = 0.25
 RAW_MESSAGE_OUTPUT_TEXT_TRIM = 100
+SUMMARIZE_CONCURRENCY = 4  # utility model calls running at once during compression
+SUMMARY_CACHE_DIR = "tmp/summaries"  # persisted summaries, keyed by summarized content and utility model
+SUMMARY_CACHE_MAX_FILES = 2000  # least recently used summaries are removed above this count
+SUMMARY_CACHE_MAX_AGE = 30 * 24 * 60 * 60  # seconds, summaries not used for this long are removed
+COMPRESS_SOFT_RATIO = 0.8  # share of the history limit where the oldest topics start being summarized in background
 
 
 class RawMessage(TypedDict):
@@ -69,7 +78,11 @@ class Record:
         return globals()[cls].from_dict(data, history=history)
 
     def output_langchain(self):
-        return output_langchain(self.output())
+        return group_messages_abab(self.langchain_messages())
+
+    def langchain_messages(self) -> list[BaseMessage]:
+        # messages of this record before grouping, records with cached output override this
+        return [_output_message_langchain(m) for m in self.output()]
 
     def output_text(self, human_label="user", ai_label="ai"):
         return output_text(self.output(), ai_label, human_label)
@@ -80,6 +93,9 @@ class Message(Record):
         self.ai = ai
         self.content = content
         self.summary: str = ""
+        # rendered output, built once and dropped when the summary changes
+        self._output: list[OutputMessage] | None = None
+        self._langchain: list[BaseMessage] | None = None
         self.tokens: int = tokens or self.calculate_tokens()
 
     def get_tokens(self) -> int:
@@ -93,16 +109,22 @@ class Message(Record):
 
     def set_summary(self, summary: str):
         self.summary = summary
+        self._output = None
+        self._langchain = None
         self.tokens = self.calculate_tokens()
 
     async def compress(self):
         return False
 
     def output(self):
-        return [OutputMessage(ai=self.ai, content=self.summary or self.content)]
+        if self._output is None:
+            self._output = [OutputMessage(ai=self.ai, content=self.summary or self.content)]
+        return self._output
 
-    def output_langchain(self):
-        return output_langchain(self.output())
+    def langchain_messages(self) -> list[BaseMessage]:
+        if self._langchain is None:
+            self._langchain = [_output_message_langchain(m) for m in self.output()]
+        return self._langchain
 
     def output_text(self, human_label="user", ai_label="ai"):
         return output_text(self.output(), ai_label, human_label)
@@ -119,9 +141,9 @@ class Message(Record):
     @staticmethod
     def from_dict(data: dict, history: "History"):
         content = data.get("content", "Content lost")
-        msg = Message(ai=data["ai"], content=content)
-        msg.summary = data.get("summary", "")
-        msg.tokens = data.get("tokens", 0)
+        msg = Message(ai=data["ai"], content=content, tokens=data.get("tokens", 0))
+        if data.get("summary"):
+            msg.set_summary(data["summary"])
         return msg
 
 
@@ -130,31 +152,69 @@ class Topic(Record):
         self.history = history
         self.summary: str = ""
         self.messages: list[Message] = []
+        self._tokens: int | None = None  # running total, None when it needs a recount
+        self._summary_output: list[OutputMessage] | None = None
+        self._summary_langchain: list[BaseMessage] | None = None
+        self._summary_task: asyncio.Task[str] | None = None  # summary prepared ahead, not applied yet
 
     def get_tokens(self):
-        if self.summary:
-            return tokens.approximate_tokens(self.summary)
-        else:
-            return sum(msg.get_tokens() for msg in self.messages)
+        if self._tokens is None:
+            if self.summary:
+                self._tokens = tokens.approximate_tokens(self.summary)
+            else:
+                self._tokens = sum(msg.get_tokens() for msg in self.messages)
+        return self._tokens
+
+    def invalidate_cache(self):
+        self._tokens = None
+        self._summary_output = None
+        self._summary_langchain = None
 
     def add_message(
         self, ai: bool, content: MessageContent, tokens: int = 0
     ) -> Message:
         msg = Message(ai=ai, content=content, tokens=tokens)
         self.messages.append(msg)
+        if self._tokens is not None and not self.summary:
+            self._tokens += msg.get_tokens()
         return msg
 
     def output(self) -> list[OutputMessage]:
         if self.summary:
-            return [OutputMessage(ai=False, content=self.summary)]
+            if self._summary_output is None:
+                self._summary_output = [OutputMessage(ai=False, content=self.summary)]
+            return self._summary_output
         else:
             msgs = [m for r in self.messages for m in r.output()]
             return msgs
 
+    def langchain_messages(self) -> list[BaseMessage]:
+        if self.summary:
+            if self._summary_langchain is None:
+                self._summary_langchain = super().langchain_messages()
+            return self._summary_langchain
+        return [m for r in self.messages for m in r.langchain_messages()]
+
     async def summarize(self):
-        self.summary = await self.summarize_messages(self.messages)
+        self.set_summary(await self.start_summary())
         return self.summary
 
+    def start_summary(self) -> "asyncio.Task[str]":
+        # summarize in background without changing the topic, set_summary applies the result
+        task = self._summary_task
+        if task is None or (task.done() and (task.cancelled() or task.exception())):
+            task = self._summary_task = asyncio.create_task(
+                self.history.run_limited(self.summarize_messages(self.messages))
+            )
+            # failed speculative summaries are retried on the next start, do not report them as unhandled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    def set_summary(self, summary: str):
+        self.summary = summary
+        self._summary_task = None
+        self.invalidate_cache()
+
     async def compress_large_messages(self) -> bool:
         set = settings.get_settings()
         msg_max_size = (
@@ -191,6 +251,7 @@ class Topic(Record):
                 )
                 msg.set_summary(_json_dumps(trunc))
 
+            self.invalidate_cache()
             return True
         return False
 
@@ -211,19 +272,14 @@ class Topic(Record):
             )
             sum_msg = Message(False, sum_msg_content)
             self.messages[1 : cnt_to_sum + 1] = [sum_msg]
+            self.invalidate_cache()
             return True
         return False
 
     async def summarize_messages(self, messages: list[Message]):
         # FIXME: vision bytes are sent to utility LLM, send summary instead
         msg_txt = [m.output_text() for m in messages]
-        summary = await self.history.agent.call_utility_model(
-            system=self.history.agent.read_prompt("fw.topic_summary.sys.md"),
-            message=self.history.agent.read_prompt(
-                "fw.topic_summary.msg.md", content=msg_txt
-            ),
-        )
-        return summary
+        return await _summarize(self.history.agent, msg_txt)
 
     def to_dict(self):
         return {
@@ -247,32 +303,47 @@ class Bulk(Record):
         self.history = history
         self.summary: str = ""
         self.records: list[Record] = []
+        self._tokens: int | None = None  # running total, None when it needs a recount
+        self._summary_output: list[OutputMessage] | None = None
+        self._summary_langchain: list[BaseMessage] | None = None
 
     def get_tokens(self):
-        if self.summary:
-            return tokens.approximate_tokens(self.summary)
-        else:
-            return sum([r.get_tokens() for r in self.records])
+        if self._tokens is None:
+            if self.summary:
+                self._tokens = tokens.approximate_tokens(self.summary)
+            else:
+                self._tokens = sum([r.get_tokens() for r in self.records])
+        return self._tokens
+
+    def invalidate_cache(self):
+        self._tokens = None
+        self._summary_output = None
+        self._summary_langchain = None
 
     def output(
         self, human_label: str = "user", ai_label: str = "ai"
     ) -> list[OutputMessage]:
         if self.summary:
-            return [OutputMessage(ai=False, content=self.summary)]
+            if self._summary_output is None:
+                self._summary_output = [OutputMessage(ai=False, content=self.summary)]
+            return self._summary_output
         else:
             msgs = [m for r in self.records for m in r.output()]
             return msgs
 
+    def langchain_messages(self) -> list[BaseMessage]:
+        if self.summary:
+            if self._summary_langchain is None:
+                self._summary_langchain = super().langchain_messages()
+            return self._summary_langchain
+        return [m for r in self.records for m in r.langchain_messages()]
+
     async def compress(self):
         return False
 
     async def summarize(self):
-        self.summary = await self.history.agent.call_utility_model(
-            system=self.history.agent.read_prompt("fw.topic_summary.sys.md"),
-            message=self.history.agent.read_prompt(
-                "fw.topic_summary.msg.md", content=self.output_text()
-            ),
-        )
+        self.summary = await _summarize(self.history.agent, self.output_text())
+        self.invalidate_cache()
         return self.summary
 
     def to_dict(self):
@@ -296,10 +367,17 @@ class History(Record):
         from agent import Agent
 
         self.counter = 0
+        self.revision = 0  # incremented on every change other than appending messages
         self.bulks: list[Bulk] = []
         self.topics: list[Topic] = []
         self.current = Topic(history=self)
         self.agent: Agent = agent
+        # running totals and rendered output of past topics and bulks, None when they need a rebuild
+        self._topics_tokens: int | None = None
+        self._bulks_tokens: int | None = None
+        self._past_output: list[OutputMessage] | None = None
+        self._past_langchain: list[BaseMessage] | None = None
+        self._summarize_semaphore: asyncio.Semaphore | None = None
 
     def get_tokens(self) -> int:
         return (
@@ -313,11 +391,25 @@ class History(Record):
         total = self.get_tokens()
         return total > limit
 
+    def is_over_soft_limit(self):
+        limit = _get_ctx_size_for_history() * COMPRESS_SOFT_RATIO
+        return self.get_tokens() > limit
+
     def get_bulks_tokens(self) -> int:
-        return sum(record.get_tokens() for record in self.bulks)
+        if self._bulks_tokens is None:
+            self._bulks_tokens = sum(record.get_tokens() for record in self.bulks)
+        return self._bulks_tokens
 
     def get_topics_tokens(self) -> int:
-        return sum(record.get_tokens() for record in self.topics)
+        if self._topics_tokens is None:
+            self._topics_tokens = sum(record.get_tokens() for record in self.topics)
+        return self._topics_tokens
+
+    def invalidate_cache(self):
+        self._topics_tokens = None
+        self._bulks_tokens = None
+        self._past_output = None
+        self._past_langchain = None
 
     def get_current_topic_tokens(self) -> int:
         return self.current.get_tokens()
@@ -330,14 +422,31 @@ class History(Record):
 
     def new_topic(self):
         if self.current.messages:
+            if self._topics_tokens is not None:
+                self._topics_tokens += self.current.get_tokens()
+            if self._past_output is not None:
+                self._past_output += self.current.output()
+            if self._past_langchain is not None:
+                _append_messages_abab(self._past_langchain, self.current.langchain_messages())
             self.topics.append(self.current)
             self.current = Topic(history=self)
 
     def output(self) -> list[OutputMessage]:
-        result: list[OutputMessage] = []
-        result += [m for b in self.bulks for m in b.output()]
-        result += [m for t in self.topics for m in t.output()]
-        result += self.current.output()
+        if self._past_output is None:
+            self._past_output = [m for b in self.bulks for m in b.output()]
+            self._past_output += [m for t in self.topics for m in t.output()]
+        return self._past_output + self.current.output()
+
+    def output_langchain(self, extras: list[OutputMessage] | None = None):
+        # past topics and bulks are grouped once, only the current topic and extras are added per call
+        if self._past_langchain is None:
+            self._past_langchain = group_messages_abab(
+                [m for r in self.bulks + self.topics for m in r.langchain_messages()]
+            )
+        result = list(self._past_langchain)
+        _append_messages_abab(result, self.current.langchain_messages())
+        if extras:
+            _append_messages_abab(result, [_output_message_langchain(m) for m in extras])
         return result
 
     @staticmethod
@@ -346,6 +455,7 @@ class History(Record):
         history.bulks = [Bulk.from_dict(b, history=history) for b in data["bulks"]]
         history.topics = [Topic.from_dict(t, history=history) for t in data["topics"]]
         history.current = Topic.from_dict(data["current"], history=history)
+        history.invalidate_cache()
         return history
 
     def to_dict(self):
@@ -391,16 +501,22 @@ class History(Record):
 
             if compressed_part:
                 compressed = True
+                self.revision += 1
+                self.invalidate_cache()
                 continue
             else:
                 return compressed
 
     async def compress_topics(self) -> bool:
-        # summarize topics one by one
-        for topic in self.topics:
-            if not topic.summary:
-                await topic.summarize()
-                return True
+        # summarize all the oldest topics needed to get under the limit at once,
+        # reusing summaries already prepared in background
+        planned = self.plan_topic_summaries()
+        if planned:
+            summaries = await asyncio.gather(*[topic.start_summary() for topic in planned])
+            # swap them in together, the message loop never sees a partly compressed history
+            for topic, summary in zip(planned, summaries):
+                topic.set_summary(summary)
+            return True
 
         # move oldest topic to bulks and summarize
         for topic in self.topics:
@@ -415,6 +531,29 @@ class History(Record):
             return True
         return False
 
+    def prepare_summaries(self) -> int:
+        """Start summarizing the oldest topics in background once history passes the soft limit.
+        Summaries are applied by compress() when the hard limit is reached, returns the number of topics planned."""
+        if not self.is_over_soft_limit():
+            return 0
+        planned = self.plan_topic_summaries(COMPRESS_SOFT_RATIO)
+        for topic in planned:
+            topic.start_summary()
+        return len(planned)
+
+    def plan_topic_summaries(self, limit_ratio: float = 1.0) -> list[Topic]:
+        # oldest unsummarized topics whose tokens cover the excess over the topics ratio, none when within it
+        limit = _get_ctx_size_for_history() * limit_ratio
+        excess = self.get_topics_tokens() - limit * HISTORY_TOPIC_RATIO
+        planned = []
+        for topic in self.topics:
+            if excess <= 0:
+                break
+            if not topic.summary:
+                planned.append(topic)
+                excess -= topic.get_tokens()
+        return planned
+
     async def compress_bulks(self):
         # merge bulks if possible
         compressed = await self.merge_bulks_by(BULK_MERGE_COUNT)
@@ -431,7 +570,7 @@ class History(Record):
         # merge bulks in groups of count, even if there are fewer than count
         bulks = await asyncio.gather(
             *[
-                self.merge_bulks(self.bulks[i : i + count])
+                self.run_limited(self.merge_bulks(self.bulks[i : i + count]))
                 for i in range(0, len(self.bulks), count)
             ]
         )
@@ -444,6 +583,13 @@ class History(Record):
         await bulk.summarize()
         return bulk
 
+    async def run_limited(self, coro: Coroutine):
+        # utility model calls of compression and background summaries, at most SUMMARIZE_CONCURRENCY at a time
+        if self._summarize_semaphore is None:
+            self._summarize_semaphore = asyncio.Semaphore(SUMMARIZE_CONCURRENCY)
+        async with self._summarize_semaphore:
+            return await coro
+
 
 def deserialize_history(json_data: str, agent) -> History:
     history = History(agent=agent)
@@ -453,6 +599,70 @@ def deserialize_history(json_data: str, agent) -> History:
     return history
 
 
+async def _summarize(agent, content: Any) -> str:
+    # identical content summarized by the same utility model is served from the summary cache
+    system = agent.read_prompt("fw.topic_summary.sys.md")
+    message = agent.read_prompt("fw.topic_summary.msg.md", content=content)
+    model = agent.config.utility_model
+    key = hashlib.sha256(
+        "\0".join([model.provider, model.name, system, message]).encode("utf-8")
+    ).hexdigest()
+    path = files.get_abs_path(SUMMARY_CACHE_DIR, key + ".txt")
+
+    # file access runs in a worker thread to keep the event loop free
+    cached = await asyncio.to_thread(_read_cached_summary, path)
+    if cached is not None:
+        return cached
+
+    summary = await agent.call_utility_model(system=system, message=message)
+    if summary:
+        await asyncio.to_thread(_write_cached_summary, path, summary)
+    return summary
+
+
+def _read_cached_summary(path: str) -> str | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            summary = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)  # mtime is the last use for eviction
+    except OSError:
+        pass
+    return summary
+
+
+def _write_cached_summary(path: str, summary: str):
+    # write to a temporary file first so concurrent readers never see a partial summary
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(summary)
+    os.replace(tmp_path, path)
+    _evict_cached_summaries(os.path.dirname(path))
+
+
+def _evict_cached_summaries(folder: str):
+    # drop summaries unused for too long and the least recently used ones above the size limit
+    entries = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.name.endswith(".txt"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+    entries.sort(reverse=True)
+    cutoff = time.time() - SUMMARY_CACHE_MAX_AGE
+    for index, (mtime, path) in enumerate(entries):
+        if index >= SUMMARY_CACHE_MAX_FILES or mtime < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
 def _get_ctx_size_for_history() -> int:
     set = settings.get_settings()
     return int(set["chat_model_ctx_length"] * set["chat_model_ctx_history"])
@@ -507,29 +717,32 @@ def group_outputs_abab(outputs: list[OutputMessage]) -> list[OutputMessage]:
 
 def group_messages_abab(messages: list[BaseMessage]) -> list[BaseMessage]:
     result = []
+    _append_messages_abab(result, messages)
+    return result
+
+
+def _append_messages_abab(result: list[BaseMessage], messages: list[BaseMessage]):
     for msg in messages:
         if result and isinstance(result[-1], type(msg)):
             # create new instance of the same type with merged content
             result[-1] = type(result[-1])(content=_merge_outputs(result[-1].content, msg.content))  # type: ignore
         else:
             result.append(msg)
-    return result
 
 
 def output_langchain(messages: list[OutputMessage]):
-    result = []
-    for m in messages:
-        if m["ai"]:
-            # result.append(AIMessage(content=serialize_content(m["content"])))
-            result.append(AIMessage(_output_content_langchain(content=m["content"])))  # type: ignore
-        else:
-            # result.append(HumanMessage(content=serialize_content(m["content"])))
-            result.append(HumanMessage(_output_content_langchain(content=m["content"])))  # type: ignore
+    result = [_output_message_langchain(m) for m in messages]
     # ensure message type alternation
     result = group_messages_abab(result)
     return result
 
 
+def _output_message_langchain(message: OutputMessage) -> BaseMessage:
+    if message["ai"]:
+        return AIMessage(_output_content_langchain(content=message["content"]))  # type: ignore
+    return HumanMessage(_output_content_langchain(content=message["content"]))  # type: ignore
+
+
 def output_text(messages: list[OutputMessage], ai_label="ai", human_label="human"):
     return "\n".join(_stringify_output(o, ai_label, human_label) for o in messages)
 
@@ -0,0 +1,149 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+INITIAL_CONCURRENCY = 16  # concurrent calls allowed per key before any throttling is seen
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 256
+DECREASE_INTERVAL = 2.0  # seconds, 429s of one burst shrink the concurrency only once
+BACKOFF_BASE = 1.0  # seconds, throttled keys without Retry-After rest for base * 2^(throttles in a row)
+BACKOFF_MAX = 60.0
+RETRY_AFTER_JITTER = 0.1  # fraction added to waits so throttled callers don't retry in sync
+THROTTLE_RATE_DECAY = 0.9  # weight of history in the per-key throttle rate average
+
+
+@dataclass
+class KeyHealth:
+    limit: float = INITIAL_CONCURRENCY
+    in_flight: int = 0
+    blocked_until: float = 0.0
+    throttle_rate: float = 0.0
+    throttles_in_row: int = 0
+    last_decrease: float = 0.0
+    last_used: float = 0.0
+
+
+@dataclass
+class KeyPool:
+    """
+    Adaptive concurrency for the API keys of one provider.
+    Each key grows its allowed concurrency on success and halves it on throttling (AIMD),
+    honours Retry-After, and new calls go to the least loaded healthy key.
+    Safe to share between event loops in different threads.
+    """
+
+    keys: list[str]
+    health: dict[str, KeyHealth] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.set_keys(self.keys)
+
+    def set_keys(self, keys: list[str]):
+        with self._lock:
+            self.keys = list(keys) or [""]
+            for key in self.keys:
+                self.health.setdefault(key, KeyHealth())
+
+    def pick(self) -> str:
+        """Healthiest key right now, without reserving a call slot."""
+        with self._lock:
+            key, _ = self._pick(time.time(), reserve=False)
+            return key if key is not None else min(self.keys, key=lambda k: self.health[k].blocked_until)
+
+    async def acquire(self) -> str:
+        """Wait for a key with free concurrency that is not resting after throttling and reserve a call slot."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                key, delay = self._pick(time.time(), reserve=True)
+                if key is not None:
+                    return key
+                entry = (loop, loop.create_future())
+                self._waiters.append(entry)
+            try:
+                # woken by a released slot or when the first resting key becomes available
+                await asyncio.wait({entry[1]}, timeout=delay)
+            finally:
+                with self._lock:
+                    if entry in self._waiters:
+                        self._waiters.remove(entry)
+
+    def release(self, key: str, throttled: bool = False, retry_after: float | None = None, success: bool = True):
+        """Return the call slot and update the key health with the call outcome."""
+        now = time.time()
+        with self._lock:
+            health = self.health.get(key)
+            if not health:
+                return
+            health.in_flight = max(0, health.in_flight - 1)
+            health.throttle_rate = health.throttle_rate * THROTTLE_RATE_DECAY + (
+                (1 - THROTTLE_RATE_DECAY) if throttled else 0
+            )
+            if throttled:
+                health.throttles_in_row += 1
+                if now - health.last_decrease >= DECREASE_INTERVAL:
+                    health.limit = max(MIN_CONCURRENCY, health.limit / 2)
+                    health.last_decrease = now
+                if retry_after is None:
+                    retry_after = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (health.throttles_in_row - 1))
+                rest = retry_after * (1 + random.random() * RETRY_AFTER_JITTER)
+                health.blocked_until = max(health.blocked_until, now + rest)
+            elif success:
+                health.throttles_in_row = 0
+                health.limit = min(MAX_CONCURRENCY, health.limit + 1 / health.limit)
+            self._wake()
+
+    def _pick(self, now: float, reserve: bool) -> tuple[str | None, float | None]:
+        # returns the best available key, or None and how long until a resting key is available again
+        best, best_score, delay = None, None, None
+        for key in self.keys:
+            health = self.health[key]
+            if health.in_flight >= max(MIN_CONCURRENCY, int(health.limit)):
+                continue
+            if health.blocked_until > now:
+                wait = health.blocked_until - now
+                delay = wait if delay is None else min(delay, wait)
+                continue
+            score = (health.in_flight / health.limit, health.throttle_rate, health.last_used)
+            if best_score is None or score < best_score:
+                best, best_score = key, score
+        if best is not None:
+            health = self.health[best]
+            health.last_used = now
+            if reserve:
+                health.in_flight += 1
+        return best, delay
+
+    def _wake(self):
+        for loop, future in self._waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:  # loop closed
+                pass
+        self._waiters.clear()
+
+
+_pools: dict[str, KeyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_key_pool(service: str, keys: list[str]) -> KeyPool:
+    """Shared pool for the service, updated to the current list of keys."""
+    keys = keys or [""]
+    with _pools_lock:
+        pool = _pools.get(service)
+        if not pool:
+            _pools[service] = pool = KeyPool(keys)
+            return pool
+    if pool.keys != keys:
+        pool.set_keys(keys)
+    return pool
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
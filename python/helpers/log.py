@@ -6,6 +6,7 @@ T = TypeVar("T")
 import uuid
 from collections import OrderedDict  # Import OrderedDict
 from python.helpers.strings import truncate_text_by_ratio
+from python.helpers import state_monitor
 import copy
 from typing import TypeVar
 
@@ -283,6 +284,7 @@ class Log:
 
         self.updates += [item.no]
         self._update_progress_from_item(item)
+        state_monitor.mark_dirty()
 
     def set_progress(self, progress: str, no: int = 0, active: bool = True):
         progress = _mask_recursive(progress)
@@ -292,6 +294,7 @@ class Log:
             no = len(self.logs)
         self.progress_no = no
         self.progress_active = active
+        state_monitor.mark_dirty()
 
     def set_initial_progress(self):
         self.set_progress("Waiting for input", 0, False)
@@ -17,6 +17,7 @@ from typing import (
 )
 import threading
 import asyncio
+import time
 from contextlib import AsyncExitStack
 from shutil import which
 from datetime import timedelta
@@ -24,6 +25,7 @@ import json
 from python.helpers import errors
 from python.helpers import settings
 
+import anyio
 import httpx
 
 from mcp import ClientSession, StdioServerParameters
@@ -41,6 +43,22 @@ from pydantic import BaseModel, Field, Discriminator, Tag, PrivateAttr
 from python.helpers import dirty_json
 from python.helpers.print_style import PrintStyle
 from python.helpers.tool import Tool, Response
+from python.helpers.defer import EventLoopThread
+
+MCP_SESSION_THREAD = "MCPSessions"  # event loop thread owning all pooled sessions
+MCP_SESSION_POOL_SIZE = 4  # max concurrently open sessions per server
+MCP_SESSION_IDLE_TIMEOUT = 300  # seconds, idle sessions are closed after this
+MCP_SESSION_PING_AFTER = 30  # seconds, sessions idle longer than this are pinged before reuse
+MCP_SESSION_PING_TIMEOUT = 5  # seconds
+MCP_SESSION_STREAM_TIMEOUT = 60 * 60  # seconds, read timeout of pooled remote streams, must outlive idle sessions, calls use the tool timeout
+
+# errors meaning the connection is gone, idempotent requests are retried on a new session
+_CONNECTION_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    httpx.ConnectError,
+)
 
 
 def normalize_name(name: str) -> str:
@@ -279,6 +297,11 @@ class MCPServerRemote(BaseModel):
             # We already run in an event loop, dont believe Pylance
             return asyncio.run(self.__on_update())
 
+    def close_sessions(self):
+        """Close open sessions to the server"""
+        with self.__lock:
+            self.__client.close_sessions()  # type: ignore
+
     async def __on_update(self) -> "MCPServerRemote":
         await self.__client.update_tools()  # type: ignore
         return self
@@ -356,6 +379,11 @@ class MCPServerLocal(BaseModel):
             # We already run in an event loop, dont believe Pylance
             return asyncio.run(self.__on_update())
 
+    def close_sessions(self):
+        """Close open sessions to the server"""
+        with self.__lock:
+            self.__client.close_sessions()  # type: ignore
+
     async def __on_update(self) -> "MCPServerLocal":
         await self.__client.update_tools()  # type: ignore
         return self
@@ -465,6 +493,10 @@ class MCPConfig(BaseModel):
                 "servers": servers_data
             }  # Prepare data for re-initialization or update
 
+            # close sessions of the servers being replaced
+            for server in instance.servers:
+                server.close_sessions()
+
             # Option 1: Re-initialize the existing instance (if __init__ is idempotent for other fields)
             instance.__init__(servers_list=servers_data)
 
@@ -782,10 +814,197 @@ class MCPConfig(BaseModel):
 T = TypeVar("T")
 
 
+def _unwrap_exception(e: BaseException) -> BaseException:
+    excs = getattr(e, "exceptions", None)  # Python 3.11+ ExceptionGroup
+    if excs:
+        return _unwrap_exception(excs[0])
+    return e
+
+
+class MCPSession:
+    """
+    One open MCP session. Runs on the MCP session loop, the transport is entered
+    and exited by the same task as required by anyio.
+    """
+
+    def __init__(self, client: "MCPClientBase", read_timeout_seconds: float, generation: int):
+        self.client = client
+        self.read_timeout_seconds = read_timeout_seconds
+        self.generation = generation
+        self.session: ClientSession | None = None
+        self.closed = False
+        self.last_used = time.time()
+        self._ready: asyncio.Future[ClientSession] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._close = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def open(self) -> ClientSession:
+        return await asyncio.shield(self._ready)
+
+    def close(self):
+        self._close.set()
+
+    async def is_healthy(self) -> bool:
+        if self.closed or not self.session:
+            return False
+        if time.time() - self.last_used < MCP_SESSION_PING_AFTER:
+            return True
+        try:
+            await asyncio.wait_for(self.session.send_ping(), MCP_SESSION_PING_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def _run(self):
+        try:
+            async with AsyncExitStack() as stack:
+                stdio, write = await self.client._create_stdio_transport(stack)
+                session = await stack.enter_async_context(
+                    ClientSession(
+                        stdio,  # type: ignore
+                        write,  # type: ignore
+                        read_timeout_seconds=timedelta(
+                            seconds=self.read_timeout_seconds
+                        ),
+                    )
+                )
+                await session.initialize()
+                self.session = session
+                self._ready.set_result(session)
+                await self._close.wait()
+        except asyncio.CancelledError:
+            if not self._ready.done():
+                self._ready.cancel()
+            raise
+        except BaseException as e:
+            if not self._ready.done():
+                self._ready.set_exception(_unwrap_exception(e))
+            elif not self._close.is_set():
+                PrintStyle(font_color="orange").print(
+                    f"MCPSession ({self.client.server.name}): Session closed unexpectedly: {_unwrap_exception(e)}"
+                )
+        finally:
+            self.closed = True
+            self.session = None
+
+
+class MCPSessionPool:
+    """
+    Open sessions to one MCP server, shared by all agents.
+    All sessions live on a single event loop thread, callers from any loop are proxied to it.
+    """
+
+    def __init__(self, client: "MCPClientBase"):
+        self.client = client
+        self._idle: list[MCPSession] = []
+        self._in_use = 0
+        self._generation = 0
+        self._semaphore = asyncio.Semaphore(MCP_SESSION_POOL_SIZE)
+        self._reaper: asyncio.Task | None = None
+
+    async def run(
+        self,
+        coro_func: Callable[[ClientSession], Awaitable[T]],
+        read_timeout_seconds: float,
+        idempotent: bool = True,
+    ) -> T:
+        future = EventLoopThread(MCP_SESSION_THREAD).run_coroutine(
+            self._run(coro_func, read_timeout_seconds, idempotent)
+        )
+        return await asyncio.wrap_future(future)
+
+    def reset(self):
+        EventLoopThread(MCP_SESSION_THREAD).run_coroutine(self._reset())
+
+    async def _reset(self):
+        self._generation += 1
+        for pooled in self._idle:
+            pooled.close()
+        self._idle.clear()
+
+    async def _run(
+        self,
+        coro_func: Callable[[ClientSession], Awaitable[T]],
+        read_timeout_seconds: float,
+        idempotent: bool,
+    ) -> T:
+        async with self._semaphore:
+            retried = False
+            while True:
+                pooled = await self._acquire(read_timeout_seconds)
+                try:
+                    if pooled.closed or not pooled.session:
+                        # lost between the health check and now, nothing was sent yet
+                        if retried:
+                            raise anyio.ClosedResourceError()
+                        retried = True
+                        continue
+                    return await coro_func(pooled.session)
+                except Exception as e:
+                    # requests with side effects may have reached the server, never send them twice
+                    if retried or not idempotent or not (
+                        pooled.closed
+                        or isinstance(_unwrap_exception(e), _CONNECTION_ERRORS)
+                    ):
+                        raise
+                    # connection is gone, retry once on a new session
+                    PrintStyle(font_color="orange").print(
+                        f"MCPSessionPool ({self.client.server.name}): Session lost, reconnecting..."
+                    )
+                    pooled.close()
+                    retried = True
+                finally:
+                    self._release(pooled)
+
+    async def _acquire(self, read_timeout_seconds: float) -> MCPSession:
+        while self._idle:
+            pooled = self._idle.pop()
+            if await pooled.is_healthy():
+                self._in_use += 1
+                return pooled
+            pooled.close()
+
+        pooled = MCPSession(self.client, read_timeout_seconds, self._generation)
+        try:
+            await pooled.open()
+        except BaseException:
+            pooled.close()  # do not leave a session opening in the background
+            raise
+        self._in_use += 1
+        if not self._reaper:
+            self._reaper = asyncio.create_task(self._reap())
+        return pooled
+
+    def _release(self, pooled: MCPSession):
+        self._in_use -= 1
+        pooled.last_used = time.time()
+        if pooled.closed or pooled.generation != self._generation:
+            pooled.close()
+        else:
+            self._idle.append(pooled)
+
+    async def _reap(self):
+        try:
+            while self._idle or self._in_use:
+                await asyncio.sleep(MCP_SESSION_IDLE_TIMEOUT / 10)
+                now = time.time()
+                for pooled in list(self._idle):
+                    if (
+                        pooled.closed
+                        or now - pooled.last_used > MCP_SESSION_IDLE_TIMEOUT
+                    ):
+                        self._idle.remove(pooled)
+                        pooled.close()
+        finally:
+            self._reaper = None
+
+
 class MCPClientBase(ABC):
     # server: Union[MCPServerLocal, MCPServerRemote] # Defined in __init__
     # tools: List[dict[str, Any]] # Defined in __init__
-    # No self.session, self.exit_stack, self.stdio, self.write as persistent instance fields
+    # Sessions are kept in self.sessions pool, not as instance fields
 
     __lock: ClassVar[threading.Lock] = threading.Lock()
 
@@ -795,6 +1014,7 @@ class MCPClientBase(ABC):
         self.error: str = ""
         self.log: List[str] = []
         self.log_file: Optional[TextIO] = None
+        self.sessions = MCPSessionPool(self)
 
     # Protected method
     @abstractmethod
@@ -811,64 +1031,28 @@ class MCPClientBase(ABC):
         self,
         coro_func: Callable[[ClientSession], Awaitable[T]],
         read_timeout_seconds=60,
+        idempotent=True,
     ) -> T:
         """
-        Manages the lifecycle of an MCP session for a single operation.
-        Creates a temporary session, executes coro_func with it, and ensures cleanup.
+        Executes coro_func with a pooled MCP session of this server.
+        Sessions are kept open between operations and reconnected when broken,
+        operations that are not idempotent are only retried if they were never sent.
         """
         operation_name = coro_func.__name__  # For logging
-        # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Creating new session for operation '{operation_name}'...")
-        # Store the original exception outside the async block
-        original_exception = None
         try:
-            async with AsyncExitStack() as temp_stack:
-                try:
-
-                    stdio, write = await self._create_stdio_transport(temp_stack)
-                    # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name} - {operation_name}): Transport created. Initializing session...")
-                    session = await temp_stack.enter_async_context(
-                        ClientSession(
-                            stdio,  # type: ignore
-                            write,  # type: ignore
-                            read_timeout_seconds=timedelta(
-                                seconds=read_timeout_seconds
-                            ),
-                        )
-                    )
-                    await session.initialize()
-
-                    result = await coro_func(session)
-
-                    return result
-                except Exception as e:
-                    # Store the original exception and raise a dummy exception
-                    excs = getattr(e, "exceptions", None)  # Python 3.11+ ExceptionGroup
-                    if excs:
-                        original_exception = excs[0]
-                    else:
-                        original_exception = e
-                    # Create a dummy exception to break out of the async block
-                    raise RuntimeError("Dummy exception to break out of async block")
+            return await self.sessions.run(coro_func, read_timeout_seconds, idempotent)
         except Exception as e:
-            # Check if this is our dummy exception
-            if original_exception is not None:
-                e = original_exception
-            # We have the original exception stored
+            e = _unwrap_exception(e)
             PrintStyle(
                 background_color="#AA4455", font_color="white", padding=False
             ).print(
                 f"MCPClientBase ({self.server.name} - {operation_name}): Error during operation: {type(e).__name__}: {e}"
             )
             raise e  # Re-raise the original exception
-        # finally:
-        #     PrintStyle(font_color="cyan").print(
-        #         f"MCPClientBase ({self.server.name} - {operation_name}): Session and transport will be closed by AsyncExitStack."
-        #     )
-        # This line should ideally be unreachable if the try/except/finally logic within the 'async with' is exhaustive.
-        # Adding it to satisfy linters that might not fully trace the raise/return paths through async context managers.
-        raise RuntimeError(
-            f"MCPClientBase ({self.server.name} - {operation_name}): _execute_with_session exited 'async with' block unexpectedly."
-        )
+
+    def close_sessions(self):
+        """Close all pooled sessions, sessions in use are closed when released."""
+        self.sessions.reset()
 
     async def update_tools(self) -> "MCPClientBase":
         # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Starting 'update_tools' operation...")
@@ -948,13 +1132,15 @@ class MCPClientBase(ABC):
             response: CallToolResult = await current_session.call_tool(
                 tool_name,
                 input_data,
-                read_timeout_seconds=timedelta(seconds=set["mcp_client_tool_timeout"]),
+                read_timeout_seconds=timedelta(
+                    seconds=self.server.tool_timeout or set["mcp_client_tool_timeout"]
+                ),
             )
             # PrintStyle(font_color="green").print(f"MCPClientBase ({self.server.name}): Tool '{tool_name}' call successful via session.")
             return response
 
         try:
-            return await self._execute_with_session(call_tool_op)
+            return await self._execute_with_session(call_tool_op, idempotent=False)
         except Exception as e:
             # Error logged by _execute_with_session. Re-raise a specific error for the caller.
             PrintStyle(
@@ -1073,7 +1259,8 @@ class MCPClientRemote(MCPClientBase):
 
         # Use lower timeouts for faster failure detection
         init_timeout = min(server.init_timeout or set["mcp_client_init_timeout"], 5)
-        tool_timeout = min(server.tool_timeout or set["mcp_client_tool_timeout"], 10)
+        # pooled streams stay open between calls, the tool timeout is applied per call
+        stream_timeout = MCP_SESSION_STREAM_TIMEOUT
 
         client_factory = CustomHTTPClientFactory(verify=server.verify)
         # Check if this is a streaming HTTP type
@@ -1084,7 +1271,7 @@ class MCPClientRemote(MCPClientBase):
                     url=server.url,
                     headers=server.headers,
                     timeout=timedelta(seconds=init_timeout),
-                    sse_read_timeout=timedelta(seconds=tool_timeout),
+                    sse_read_timeout=timedelta(seconds=stream_timeout),
                     httpx_client_factory=client_factory,
                 )
             )
@@ -1102,7 +1289,7 @@ class MCPClientRemote(MCPClientBase):
                     url=server.url,
                     headers=server.headers,
                     timeout=init_timeout,
-                    sse_read_timeout=tool_timeout,
+                    sse_read_timeout=stream_timeout,
                     httpx_client_factory=client_factory,
                 )
             )
@@ -18,7 +18,7 @@ from langchain_community.vectorstores.utils import (
 )
 from langchain_core.embeddings import Embeddings
 
-import os, json
+import os, json, pickle, threading, atexit, time
 
 import numpy as np
 
@@ -37,6 +37,11 @@ from simpleeval import simple_eval
 # Raise the log level so WARNING messages aren't shown
 logging.getLogger("langchain_core.vectorstores.base").setLevel(logging.ERROR)
 
+SAVE_INTERVAL = 15  # seconds, changed memory DBs are snapshotted to disk at most this often
+PENDING_LOG_FILE = "pending.jsonl"
+PENDING_LOG_FLUSHING_SUFFIX = ".flushing"
+SNAPSHOT_POINTER_FILE = "index.current"  # name of the index.faiss/index.pkl pair currently in use
+
 
 class MyFaiss(FAISS):
     # override aget_by_ids
@@ -51,6 +56,197 @@ class MyFaiss(FAISS):
         return self.docstore._dict  # type: ignore
 
 
+class MemoryPersistence:
+    """
+    Write-behind persistence of a memory DB.
+    Every change is appended to a small log of pending operations right away,
+    the whole index is saved to disk in the background at most every SAVE_INTERVAL seconds.
+    On load, operations not yet included in the saved index are replayed.
+    """
+
+    _instances: dict[str, "MemoryPersistence"] = {}
+    _instances_lock = threading.Lock()
+
+    @staticmethod
+    def get(memory_subdir: str) -> "MemoryPersistence":
+        with MemoryPersistence._instances_lock:
+            if memory_subdir not in MemoryPersistence._instances:
+                MemoryPersistence._instances[memory_subdir] = MemoryPersistence(
+                    memory_subdir
+                )
+            return MemoryPersistence._instances[memory_subdir]
+
+    @staticmethod
+    def flush_all():
+        for persistence in list(MemoryPersistence._instances.values()):
+            persistence.flush()
+
+    def __init__(self, memory_subdir: str):
+        self.memory_subdir = memory_subdir
+        self.lock = threading.RLock()  # guards DB mutations and snapshots
+        self.save_lock = threading.Lock()  # one snapshot written at a time, in order
+        self.db: MyFaiss | None = None
+        self.dirty = False
+        self.timer: threading.Timer | None = None
+
+    def attach(self, db: MyFaiss):
+        with self.lock:
+            self.db = db
+
+    def log_operation(self, op: str, docs: list[Document] = [], ids: list[str] = []):
+        record: dict[str, Any] = {"op": op}
+        if docs:
+            record["docs"] = [
+                {"page_content": doc.page_content, "metadata": doc.metadata}
+                for doc in docs
+            ]
+        if ids:
+            record["ids"] = ids
+        with self.lock:
+            with open(self._log_path(), "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self.dirty = True
+            if not self.timer:
+                self.timer = threading.Timer(SAVE_INTERVAL, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        with self.save_lock:
+            with self.lock:
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+                if not self.dirty or not self.db:
+                    return
+                # serialize in memory, write to disk outside of the lock
+                index, store = self.serialize(self.db)
+                flushing = self._rotate_log()
+                self.dirty = False
+
+            try:
+                self._write_snapshot(index, store)
+                if flushing and os.path.exists(flushing):
+                    os.remove(flushing)
+            except Exception as e:
+                PrintStyle.error(f"Failed to save memory DB '{self.memory_subdir}': {e}")
+                with self.lock:
+                    self.dirty = True  # pending log is kept, retry on next change or exit
+
+    def save(self, db: MyFaiss):
+        """Write a snapshot of the DB right away."""
+        with self.save_lock:
+            with self.lock:
+                index, store = self.serialize(db)
+            self._write_snapshot(index, store)
+
+    @staticmethod
+    def serialize(db: MyFaiss) -> tuple[bytes, bytes]:
+        # same content as FAISS.save_local writes
+        index = faiss.serialize_index(db.index).tobytes()
+        store = pickle.dumps((db.docstore, db.index_to_docstore_id))
+        return index, store
+
+    def get_snapshot_name(self) -> str | None:
+        """Index name of the saved pair for FAISS.load_local, None if nothing is saved yet."""
+        db_dir = Memory._abs_db_dir(self.memory_subdir)
+        pointer = os.path.join(db_dir, SNAPSHOT_POINTER_FILE)
+        if os.path.exists(pointer):
+            with open(pointer, "r", encoding="utf-8") as f:
+                name = f.read().strip()
+            if name and os.path.exists(os.path.join(db_dir, name + ".faiss")):
+                return name
+        if os.path.exists(os.path.join(db_dir, "index.faiss")):
+            return "index"  # saved before snapshots were versioned
+        return None
+
+    def _write_snapshot(self, index: bytes, store: bytes):
+        # the pair is written under a new name, switching the pointer file publishes both files at once
+        db_dir = Memory._abs_db_dir(self.memory_subdir)
+        os.makedirs(db_dir, exist_ok=True)
+        name = f"index.{time.time_ns()}"
+        for ext, content in ((".faiss", index), (".pkl", store)):
+            _write_file_synced(os.path.join(db_dir, name + ext), content)
+        _write_file_synced(os.path.join(db_dir, SNAPSHOT_POINTER_FILE), name.encode("utf-8"))
+
+        # drop older pairs
+        for file in os.listdir(db_dir):
+            if (
+                file.startswith("index.")
+                and file.endswith((".faiss", ".pkl"))
+                and file.rsplit(".", 1)[0] != name
+            ):
+                os.remove(os.path.join(db_dir, file))
+
+    def replay(self, db: MyFaiss) -> bool:
+        """Apply logged operations missing in the loaded DB, returns True if anything was applied"""
+        changed = False
+        for file in (self._log_path() + PENDING_LOG_FLUSHING_SUFFIX, self._log_path()):
+            if not os.path.exists(file):
+                continue
+            with open(file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # incomplete last line after a crash
+                    docs = [
+                        Document(d["page_content"], metadata=d["metadata"])
+                        for d in record.get("docs", [])
+                    ]
+                    # operations are idempotent, already saved ones are skipped
+                    ids = record.get("ids", []) or [d.metadata["id"] for d in docs]
+                    if record["op"] in ["delete", "update"]:
+                        existing = [doc.metadata["id"] for doc in db.get_by_ids(ids)]
+                        if existing:
+                            db.delete(ids=existing)
+                            changed = True
+                    if docs:
+                        new_docs = [doc for doc in docs if not db.get_by_ids([doc.metadata["id"]])]
+                        if new_docs:
+                            db.add_documents(
+                                documents=new_docs,
+                                ids=[doc.metadata["id"] for doc in new_docs],
+                            )
+                            changed = True
+        return changed
+
+    def clear_log(self):
+        with self.lock:
+            for file in (self._log_path() + PENDING_LOG_FLUSHING_SUFFIX, self._log_path()):
+                if os.path.exists(file):
+                    os.remove(file)
+
+    def _rotate_log(self) -> str:
+        # new operations go to a fresh log while the snapshot is being written
+        log = self._log_path()
+        flushing = log + PENDING_LOG_FLUSHING_SUFFIX
+        if os.path.exists(log):
+            if os.path.exists(flushing):  # previous save failed, keep both
+                with open(log, "r", encoding="utf-8") as src, open(
+                    flushing, "a", encoding="utf-8"
+                ) as dst:
+                    dst.write(src.read())
+                os.remove(log)
+            else:
+                os.replace(log, flushing)
+        return flushing
+
+    def _log_path(self) -> str:
+        return os.path.join(Memory._abs_db_dir(self.memory_subdir), PENDING_LOG_FILE)
+
+
+atexit.register(MemoryPersistence.flush_all)
+
+
+def _write_file_synced(path: str, content: bytes):
+    with open(path + ".tmp", "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
 class Memory:
 
     class Area(Enum):
@@ -130,6 +326,10 @@ class Memory:
 
         PrintStyle.standard("Initializing VectorDB...")
 
+        # save pending changes of a previously loaded instance before reading from disk
+        persistence = MemoryPersistence.get(memory_subdir)
+        persistence.flush()
+
         if log_item:
             log_item.stream(progress="\nInitializing VectorDB")
 
@@ -168,10 +368,12 @@ class Memory:
         created = False
 
         # if db folder exists and is not empty:
-        if os.path.exists(db_dir) and files.exists(db_dir, "index.faiss"):
+        snapshot = persistence.get_snapshot_name()
+        if snapshot:
             db = MyFaiss.load_local(
                 folder_path=db_dir,
                 embeddings=embedder,
+                index_name=snapshot,
                 allow_dangerous_deserialization=True,
                 distance_strategy=DistanceStrategy.COSINE,
                 # normalize_L2=True,
@@ -232,6 +434,12 @@ class Memory:
 
             created = True
 
+        # apply changes that were logged but not saved before exit
+        if persistence.replay(db):
+            Memory._save_db_file(db, memory_subdir)
+        persistence.clear_log()
+        persistence.attach(db)
+
         return db, created
 
     def __init__(
@@ -356,15 +564,13 @@ class Memory:
                 # fnd = self.db.get(where={"id": {"$in": document_ids}})
                 # if fnd["ids"]: self.db.delete(ids=fnd["ids"])
                 # tot += len(fnd["ids"])
-                await self.db.adelete(ids=document_ids)
+                self._delete_documents(document_ids)
                 tot += len(document_ids)
 
             # If fewer than K document IDs, break the loop
             if len(document_ids) < k:
                 break
 
-        if tot:
-            self._save_db()  # persist
         return removed
 
     async def delete_documents_by_ids(self, ids: list[str]):
@@ -374,10 +580,7 @@ class Memory:
         )  # existing docs to remove (prevents error)
         if rem_docs:
             rem_ids = [doc.metadata["id"] for doc in rem_docs]  # ids to remove
-            await self.db.adelete(ids=rem_ids)
-
-        if rem_docs:
-            self._save_db()  # persist
+            self._delete_documents(rem_ids)
         return rem_docs
 
     async def insert_text(self, text, metadata: dict = {}):
@@ -396,19 +599,36 @@ class Memory:
                 if not doc.metadata.get("area", ""):
                     doc.metadata["area"] = Memory.Area.MAIN.value
 
-            await self.db.aadd_documents(documents=docs, ids=ids)
-            self._save_db()  # persist
+            await self._add_documents(docs, ids)
         return ids
 
     async def update_documents(self, docs: list[Document]):
         ids = [doc.metadata["id"] for doc in docs]
-        await self.db.adelete(ids=ids)  # delete originals
-        ins = await self.db.aadd_documents(documents=docs, ids=ids)  # add updated
-        self._save_db()  # persist
-        return ins
+        return await self._add_documents(docs, ids, replace=True)
+
+    async def _add_documents(
+        self, docs: list[Document], ids: list[str], replace: bool = False
+    ):
+        # embed outside of the lock, then apply the change and log it for persistence
+        texts = [doc.page_content for doc in docs]
+        embeddings = await self.db.embedding_function.aembed_documents(texts)  # type: ignore
+        persistence = MemoryPersistence.get(self.memory_subdir)
+        with persistence.lock:
+            if replace:
+                self.db.delete(ids=ids)  # delete originals
+            added = self.db.add_embeddings(
+                zip(texts, embeddings),
+                metadatas=[doc.metadata for doc in docs],
+                ids=ids,
+            )
+            persistence.log_operation("update" if replace else "insert", docs=docs)
+        return added
 
-    def _save_db(self):
-        Memory._save_db_file(self.db, self.memory_subdir)
+    def _delete_documents(self, ids: list[str]):
+        persistence = MemoryPersistence.get(self.memory_subdir)
+        with persistence.lock:
+            self.db.delete(ids=ids)
+            persistence.log_operation("delete", ids=ids)
 
     def _generate_doc_id(self):
         while True:
@@ -418,8 +638,7 @@ class Memory:
 
     @staticmethod
     def _save_db_file(db: MyFaiss, memory_subdir: str):
-        abs_dir = Memory._abs_db_dir(memory_subdir)
-        db.save_local(folder_path=abs_dir)
+        MemoryPersistence.get(memory_subdir).save(db)
 
     @staticmethod
     def _get_comparator(condition: str):
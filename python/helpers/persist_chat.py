@@ -1,7 +1,11 @@
 from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
+import os
+import threading
 import uuid
+import weakref
 from agent import Agent, AgentConfig, AgentContext, AgentContextType
 from python.helpers import files, history
 import json
@@ -12,6 +16,39 @@ from python.helpers.log import Log, LogItem
 CHATS_FOLDER = "tmp/chats"
 LOG_SIZE = 1000
 CHAT_FILE_NAME = "chat.json"
+JOURNAL_FILE_NAME = "chat.journal"
+JOURNAL_COMPACTING_SUFFIX = ".compacting"
+JOURNAL_COMPACT_MIN_SIZE = 1024 * 1024  # journal is folded into chat.json when bigger than this and the snapshot
+
+
+@dataclass
+class _AgentJournalState:
+    agent: weakref.ref  # weak references stay unique, unlike id() of collected objects
+    history: weakref.ref
+    history_revision: int
+    topics: int
+    messages: int
+    data: str
+
+
+class _JournalState:
+    """What has already been persisted for a context, so that only changes are appended."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.seq = 0
+        self.generation = 0
+        self.log_guid = ""
+        self.log_updates = 0
+        self.agents: list[_AgentJournalState] = []
+        self.journal_size = 0
+        self.snapshot_size = 0
+        self.compacting = False
+        self.deleted = False
+
+
+_journals: dict[str, _JournalState] = {}
+_journals_lock = threading.Lock()
 
 
 def get_chat_folder_path(ctxid: str):
@@ -30,16 +67,41 @@ def get_chat_msg_files_folder(ctxid: str):
     return files.get_abs_path(get_chat_folder_path(ctxid), "messages")
 
 def save_tmp_chat(context: AgentContext):
-    """Save context to the chats folder"""
+    """Save context to the chats folder, appending only the changes to the chat journal"""
     # Skip saving BACKGROUND contexts as they should be ephemeral
     if context.type == AgentContextType.BACKGROUND:
         return
 
-    path = _get_chat_file_path(context.id)
-    files.make_dirs(path)
-    data = _serialize_context(context)
-    js = _safe_json_serialize(data, ensure_ascii=False)
-    files.write_file(path, js)
+    state = _get_journal_state(context.id)
+    with state.lock:
+        if state.deleted:
+            return  # chat removed meanwhile
+
+        # first save in this process or log was reset, write full snapshot
+        if not state.seq or state.log_guid != context.log.guid:
+            _write_snapshot(context, state)
+            return
+
+        entry, agent_states = _build_journal_entry(context, state)
+        state.seq += 1
+        entry["seq"] = state.seq
+        line = _safe_json_serialize(entry, ensure_ascii=False) + "\n"
+        files.append_file(_get_journal_file_path(context.id), line)
+
+        state.journal_size += len(line)
+        state.log_updates = len(context.log.updates)
+        state.agents = agent_states
+
+        if not state.compacting and state.journal_size > max(
+            JOURNAL_COMPACT_MIN_SIZE, state.snapshot_size
+        ):
+            state.compacting = True
+            threading.Thread(
+                target=_compact_journal,
+                args=(context.id, state),
+                name="ChatJournalCompaction",
+                daemon=True,
+            ).start()
 
 
 def save_tmp_chats():
@@ -55,19 +117,14 @@ def load_tmp_chats():
     """Load all contexts from the chats folder"""
     _convert_v080_chats()
     folders = files.list_files(CHATS_FOLDER, "*")
-    json_files = []
-    for folder_name in folders:
-        json_files.append(_get_chat_file_path(folder_name))
-
     ctxids = []
-    for file in json_files:
+    for folder_name in folders:
         try:
-            js = files.read_file(file)
-            data = json.loads(js)
+            data = _read_chat_data(folder_name)
             ctx = _deserialize_context(data)
             ctxids.append(ctx.id)
         except Exception as e:
-            print(f"Error loading chat {file}: {e}")
+            print(f"Error loading chat {_get_chat_file_path(folder_name)}: {e}")
     return ctxids
 
 
@@ -75,6 +132,248 @@ def _get_chat_file_path(ctxid: str):
     return files.get_abs_path(CHATS_FOLDER, ctxid, CHAT_FILE_NAME)
 
 
+def _get_journal_file_path(ctxid: str):
+    return files.get_abs_path(CHATS_FOLDER, ctxid, JOURNAL_FILE_NAME)
+
+
+def _get_journal_state(ctxid: str) -> _JournalState:
+    with _journals_lock:
+        state = _journals.get(ctxid)
+        if not state:
+            state = _journals[ctxid] = _JournalState()
+        return state
+
+
+def _write_snapshot(context: AgentContext, state: _JournalState):
+    data = _serialize_context(context)
+    state.seq += 1
+    state.generation += 1  # invalidates compaction in progress
+    data["journal_seq"] = state.seq
+    js = _safe_json_serialize(data, ensure_ascii=False)
+
+    path = _get_chat_file_path(context.id)
+    files.make_dirs(path)
+    files.write_file(path, js)
+    journal = _get_journal_file_path(context.id)
+    for file in (journal, journal + JOURNAL_COMPACTING_SUFFIX):
+        if os.path.exists(file):
+            os.remove(file)
+
+    state.log_guid = context.log.guid
+    state.log_updates = len(context.log.updates)
+    state.agents = [
+        _get_agent_journal_state(
+            agent, _safe_json_serialize(ag["data"], ensure_ascii=False)
+        )
+        for agent, ag in zip(_get_agents(context), data["agents"])
+    ]
+    state.journal_size = 0
+    state.snapshot_size = len(js)
+
+
+def _get_agents(context: AgentContext) -> list[Agent]:
+    agents = []
+    agent = context.agent0
+    while agent:
+        agents.append(agent)
+        agent = agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
+    return agents
+
+
+def _get_agent_journal_state(agent: Agent, data: str):
+    return _AgentJournalState(
+        agent=weakref.ref(agent),
+        history=weakref.ref(agent.history),
+        history_revision=agent.history.revision,
+        topics=len(agent.history.topics),
+        messages=len(agent.history.current.messages),
+        data=data,
+    )
+
+
+def _build_journal_entry(context: AgentContext, state: _JournalState):
+    agents = []
+    agent_states = []
+    for index, agent in enumerate(_get_agents(context)):
+        data = _safe_json_serialize(
+            {k: v for k, v in agent.data.items() if not k.startswith("_")},
+            ensure_ascii=False,
+        )
+        hist = agent.history
+        prev = state.agents[index] if index < len(state.agents) else None
+        record: dict[str, Any] = {"index": index, "number": agent.number}
+
+        if (
+            not prev
+            or prev.agent() is not agent
+            or prev.history() is not hist
+            or prev.history_revision != hist.revision
+        ):
+            # new agent or compressed history, store it whole
+            record["data"] = data
+            record["history"] = hist.serialize()
+        else:
+            if prev.data != data:
+                record["data"] = data
+            # messages appended to the current topic, every further list starts a new topic
+            topics = []
+            start = prev.messages
+            for topic in hist.topics[prev.topics :] + [hist.current]:
+                topics.append([m.to_dict() for m in topic.messages[start:]])
+                start = 0
+            if len(topics) > 1 or topics[0]:
+                record["topics"] = topics
+
+        if len(record) > 2:
+            agents.append(record)
+        agent_states.append(_get_agent_journal_state(agent, data))
+
+    log = context.log
+    changed = sorted(set(log.updates[state.log_updates :]))
+    entry = {
+        "name": context.name,
+        "last_message": (
+            context.last_message.isoformat()
+            if context.last_message
+            else datetime.fromtimestamp(0).isoformat()
+        ),
+        "streaming_agent": (
+            context.streaming_agent.number if context.streaming_agent else 0
+        ),
+        "agent_count": len(agent_states),
+        "agents": agents,
+        "log": {
+            "logs": [log.logs[no].output() for no in changed],
+            "progress": log.progress,
+            "progress_no": log.progress_no,
+        },
+    }
+    return entry, agent_states
+
+
+def _compact_journal(ctxid: str, state: _JournalState):
+    """Fold the chat journal into chat.json, runs in a background thread"""
+    try:
+        journal = _get_journal_file_path(ctxid)
+        compacting = journal + JOURNAL_COMPACTING_SUFFIX
+        with state.lock:
+            if state.deleted:
+                return
+            generation = state.generation
+            # new entries go to a fresh journal while the old one is folded
+            if not os.path.exists(compacting) and os.path.exists(journal):
+                os.replace(journal, compacting)
+                state.journal_size = 0
+
+        data = _read_chat_data(ctxid, include_journal=False)
+        js = _safe_json_serialize(data, ensure_ascii=False)
+
+        with state.lock:
+            if state.deleted or state.generation != generation:
+                return  # chat removed or full snapshot written meanwhile
+            path = _get_chat_file_path(ctxid)
+            files.write_file(path + ".tmp", js)
+            os.replace(path + ".tmp", path)
+            os.remove(compacting)
+            state.snapshot_size = len(js)
+    except Exception as e:
+        print(f"Error compacting chat journal {ctxid}: {e}")
+    finally:
+        state.compacting = False
+
+
+def _read_chat_data(ctxid: str, include_journal: bool = True) -> dict[str, Any]:
+    """Read chat.json and replay the journal entries not yet folded into it"""
+    data = json.loads(files.read_file(_get_chat_file_path(ctxid)))
+    journal = _get_journal_file_path(ctxid)
+    journals = [journal + JOURNAL_COMPACTING_SUFFIX]
+    if include_journal:
+        journals.append(journal)
+
+    entries = []
+    seq = data.get("journal_seq", 0)
+    for file in journals:
+        if not os.path.exists(file):
+            continue
+        with open(file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # incomplete last line after a crash
+                if entry.get("seq", 0) > seq:
+                    entries.append(entry)
+                    seq = entry["seq"]
+
+    if entries:
+        _replay_journal(data, entries)
+        data["journal_seq"] = seq
+    return data
+
+
+def _replay_journal(data: dict[str, Any], entries: list[dict[str, Any]]):
+    agents: list[dict[str, Any]] = data.setdefault("agents", [])
+    histories: dict[int, dict[str, Any]] = {}  # parsed histories, dumped once at the end
+    log = data.setdefault("log", {})
+    logs: list[dict[str, Any]] = log.setdefault("logs", [])
+    log_index = {item["no"]: i for i, item in enumerate(logs)}
+
+    for entry in entries:
+        for key in ("name", "last_message", "streaming_agent"):
+            if key in entry:
+                data[key] = entry[key]
+
+        del agents[entry.get("agent_count", len(agents)) :]
+        for index in [i for i in histories if i >= len(agents)]:
+            del histories[index]
+
+        for record in entry.get("agents", []):
+            index = record["index"]
+            while len(agents) <= index:
+                agents.append({"number": len(agents), "data": {}, "history": ""})
+            agent = agents[index]
+            agent["number"] = record["number"]
+            if "data" in record:
+                agent["data"] = json.loads(record["data"])
+            if "history" in record:
+                agent["history"] = record["history"]
+                histories.pop(index, None)
+            if "topics" in record:
+                if index not in histories:
+                    histories[index] = (
+                        json.loads(agent["history"])
+                        if agent["history"]
+                        else history.History(None).to_dict()
+                    )
+                _replay_history(histories[index], record["topics"])
+
+        entry_log = entry.get("log", {})
+        for item in entry_log.get("logs", []):
+            no = item["no"]
+            if no in log_index:
+                logs[log_index[no]] = item
+            elif not logs or no > logs[-1]["no"]:
+                log_index[no] = len(logs)
+                logs.append(item)
+        for key in ("progress", "progress_no"):
+            if key in entry_log:
+                log[key] = entry_log[key]
+
+    for index, hist in histories.items():
+        agents[index]["history"] = json.dumps(hist, ensure_ascii=False)
+    log["logs"] = logs[-LOG_SIZE:]
+
+
+def _replay_history(hist: dict[str, Any], topics: list[list[dict[str, Any]]]):
+    for i, messages in enumerate(topics):
+        current = hist["current"]
+        if i and current["messages"]:  # same as History.new_topic()
+            hist["topics"].append(current)
+            current = hist["current"] = {"_cls": "Topic", "summary": "", "messages": []}
+        current["messages"].extend(messages)
+        hist["counter"] = hist.get("counter", 0) + len(messages)
+
+
 def _convert_v080_chats():
     json_files = files.list_files(CHATS_FOLDER, "*.json")
     for file in json_files:
@@ -105,6 +404,11 @@ def export_json_chat(context: AgentContext):
 
 def remove_chat(ctxid):
     """Remove a chat or task context"""
+    with _journals_lock:
+        state = _journals.pop(ctxid, None)
+    if state:
+        with state.lock:  # waits for a save in progress, compaction checks the flag before writing
+            state.deleted = True
     path = get_chat_folder_path(ctxid)
     files.delete_dir(path)
 
@@ -117,11 +421,7 @@ def remove_msg_files(ctxid):
 
 def _serialize_context(context: AgentContext):
     # serialize agents
-    agents = []
-    agent = context.agent0
-    while agent:
-        agents.append(_serialize_agent(agent))
-        agent = agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
+    agents = [_serialize_agent(agent) for agent in _get_agents(context)]
 
     return {
         "id": context.id,
@@ -1,57 +1,295 @@
 import asyncio
+import os
+import sqlite3
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
 from typing import Callable, Awaitable
 
+BUCKETS_PER_TIMEFRAME = 600  # adds within the same fixed slot of timeframe/buckets are merged, bounds memory for streamed output tokens
+SHARED_FLUSH_INTERVAL = 1.0  # seconds, streamed adds are batched locally at most this long before a timer writes them to the shared store
+SHARED_DB_TIMEOUT = 30  # seconds to wait for another process holding the shared store lock
+
 
 class RateLimiter:
+    """
+    Sliding window limiter with running totals per key.
+    Waiters are served in arrival order and sleep exactly until enough of the window expires.
+    Safe to share between event loops in different threads.
+    """
+
     def __init__(self, seconds: int = 60, **limits: int):
         self.timeframe = seconds
         self.limits = {key: value if isinstance(value, (int, float)) else 0 for key, value in (limits or {}).items()}
-        self.values = {key: [] for key in self.limits.keys()}
-        self._lock = asyncio.Lock()
+        # key -> buckets of [end of their time slot, value], oldest first
+        self.values: dict[str, deque[list[float]]] = {key: deque() for key in self.limits.keys()}
+        self.totals: dict[str, float] = {key: 0 for key in self.limits.keys()}
+        self._resolution = seconds / BUCKETS_PER_TIMEFRAME
+        self._lock = threading.Lock()
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
 
     def add(self, **kwargs: int):
-        now = time.time()
-        for key, value in kwargs.items():
-            if not key in self.values:
-                self.values[key] = []
-            self.values[key].append((now, value))
+        with self._lock:
+            self._add(time.time(), kwargs)
 
     async def cleanup(self):
-        async with self._lock:
-            now = time.time()
-            cutoff = now - self.timeframe
-            for key in self.values:
-                self.values[key] = [(t, v) for t, v in self.values[key] if t > cutoff]
+        with self._lock:
+            self._expire(time.time())
 
     async def get_total(self, key: str) -> int:
-        async with self._lock:
-            if not key in self.values:
-                return 0
-            return sum(value for _, value in self.values[key])
+        with self._lock:
+            self._expire(time.time())
+            return int(self.totals.get(key, 0))
 
     async def wait(
         self,
         callback: Callable[[str, str, int, int], Awaitable[bool]] | None = None,
     ):
-        while True:
-            await self.cleanup()
-            should_wait = False
-
-            for key, limit in self.limits.items():
-                if limit <= 0:  # Skip if no limit set
-                    continue
-
-                total = await self.get_total(key)
-                if total > limit:
-                    if callback:
-                        msg = f"Rate limit exceeded for {key} ({total}/{limit}), waiting..."
-                        should_wait = not await callback(msg, key, total, limit)
-                    else:
-                        should_wait = True
+        """Wait until all totals are within their limits."""
+        await self.acquire(callback)
+
+    async def acquire(
+        self,
+        callback: Callable[[str, str, int, int], Awaitable[bool]] | None = None,
+        **amounts: int,
+    ):
+        """Wait in line until the amounts fit within the limits, then add them.
+        The callback is called before each wait, returning True skips the wait."""
+        loop = asyncio.get_running_loop()
+        entry = (loop, loop.create_future())
+        with self._lock:
+            self._waiters.append(entry)
+            if self._waiters[0] is entry:
+                entry[1].set_result(None)
+
+        try:
+            await entry[1]  # our turn
+            while True:
+                blocked = await self._check(amounts)
+                if not blocked:
+                    return
+
+                key, total, limit, delay = blocked
+                if callback:
+                    msg = f"Rate limit exceeded for {key} ({total}/{limit}), waiting..."
+                    if await callback(msg, key, total, limit):
+                        self.add(**amounts)
+                        return
+                await asyncio.sleep(delay)
+        finally:
+            self._leave(entry)
+
+    async def _check(self, amounts: dict[str, int]) -> tuple[str, int, int, float] | None:
+        return self._try_acquire(amounts)
+
+    def _try_acquire(self, amounts: dict[str, int]) -> tuple[str, int, int, float] | None:
+        # adds the amounts if they fit, otherwise returns the exceeded key and the time to wait
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            blocked = self._get_wait(amounts, now)
+            if not blocked:
+                self._add(now, amounts)
+            return blocked
+
+    def _add(self, now: float, amounts: dict[str, int]):
+        for key, value in amounts.items():
+            if not value:
+                continue
+            buckets = self.values.setdefault(key, deque())
+            # buckets are fixed slots stamped with their end, so they expire no earlier than any add in them
+            bucket_time = (int(now // self._resolution) + 1) * self._resolution
+            if buckets and buckets[-1][0] == bucket_time:
+                buckets[-1][1] += value
+            else:
+                buckets.append([bucket_time, value])
+            self.totals[key] = self.totals.get(key, 0) + value
+
+    def _expire(self, now: float):
+        cutoff = now - self.timeframe
+        for key, buckets in self.values.items():
+            while buckets and buckets[0][0] <= cutoff:
+                self.totals[key] -= buckets.popleft()[1]
+            if not buckets:
+                self.totals[key] = 0  # drop float drift
+
+    def _get_wait(self, amounts: dict[str, int], now: float) -> tuple[str, int, int, float] | None:
+        # returns the first exceeded key and how long until all keys have room, None if the amounts fit now
+        blocked = None
+        for key, limit in self.limits.items():
+            if limit <= 0:  # Skip if no limit set
+                continue
+            total = self.totals.get(key, 0)
+            needed = total + amounts.get(key, 0) - limit
+            if needed <= 0 or not total:  # a single request over the limit still goes through on an empty window
+                continue
+
+            delay = self._get_expiry(key, needed) - now
+            if not blocked:
+                blocked = (key, int(total + amounts.get(key, 0)), int(limit), delay)
+            elif delay > blocked[3]:
+                blocked = (*blocked[:3], delay)
+        return blocked
+
+    def _get_expiry(self, key: str, needed: float) -> float:
+        # time when enough of the oldest buckets expire
+        freed, expiry = 0, 0.0
+        for bucket_time, value in self.values[key]:
+            freed += value
+            expiry = bucket_time + self.timeframe
+            if freed >= needed:
+                break
+        return expiry
+
+    def _leave(self, entry: tuple[asyncio.AbstractEventLoop, asyncio.Future]):
+        # remove the waiter and hand the turn to the next one, possibly on another event loop
+        with self._lock:
+            was_first = bool(self._waiters) and self._waiters[0] is entry
+            self._waiters.remove(entry)
+            while was_first and self._waiters:
+                loop, future = self._waiters[0]
+                try:
+                    loop.call_soon_threadsafe(_resolve, future)
                     break
+                except RuntimeError:  # loop closed, skip the abandoned waiter
+                    self._waiters.popleft()
+
 
-            if not should_wait:
+class SharedRateLimiter(RateLimiter):
+    """
+    Rate limiter keeping its window in a SQLite file, processes using the same file share the limits.
+    Waiters within a process are still served in order, processes compete when capacity frees up.
+    Store access runs in worker threads so a locked file never blocks the event loop.
+    """
+
+    def __init__(self, db_path: str, name: str, seconds: int = 60, **limits: int):
+        super().__init__(seconds, **limits)
+        self.db_path = db_path
+        self.name = name
+        self._pending: dict[str, float] = {}
+        self._flush_timer: threading.Timer | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+
+    def add(self, **kwargs: int):
+        # batched locally, a timer writes them to the store
+        with self._lock:
+            for key, value in kwargs.items():
+                if value:
+                    self._pending[key] = self._pending.get(key, 0) + value
+            if self._pending and not self._flush_timer:
+                self._flush_timer = threading.Timer(SHARED_FLUSH_INTERVAL, self._flush_pending)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    async def cleanup(self):
+        await asyncio.to_thread(self._refresh_sync)
+
+    async def get_total(self, key: str) -> int:
+        await asyncio.to_thread(self._refresh_sync)
+        return int(self.totals.get(key, 0))
+
+    async def _check(self, amounts: dict[str, int]) -> tuple[str, int, int, float] | None:
+        return await asyncio.to_thread(self._try_acquire, amounts)
+
+    def _try_acquire(self, amounts: dict[str, int]) -> tuple[str, int, int, float] | None:
+        with self._transaction() as conn:
+            now = time.time()
+            self._refresh(conn, now)
+            blocked = self._get_wait(amounts, now)
+            if not blocked:
+                self._insert(conn, now, amounts)
+            return blocked
+
+    def _get_expiry(self, key: str, needed: float) -> float:
+        freed, expiry = 0, 0.0
+        rows = self._connect().execute(
+            "SELECT time, value FROM usage WHERE limiter = ? AND key = ? ORDER BY time",
+            (self.name, key),
+        )
+        for bucket_time, value in rows:
+            freed += value
+            expiry = bucket_time + self.timeframe
+            if freed >= needed:
                 break
+        return expiry
+
+    def _refresh_sync(self):
+        with self._transaction() as conn:
+            self._refresh(conn, time.time())
+
+    def _refresh(self, conn: sqlite3.Connection, now: float):
+        # write pending adds, drop expired usage and load totals of all processes
+        self._flush(conn, now)
+        conn.execute(
+            "DELETE FROM usage WHERE limiter = ? AND time <= ?",
+            (self.name, now - self.timeframe),
+        )
+        self.totals = dict(
+            conn.execute(
+                "SELECT key, SUM(value) FROM usage WHERE limiter = ? GROUP BY key",
+                (self.name,),
+            ).fetchall()
+        )
+
+    def _flush_pending(self):
+        # timer thread
+        with self._lock:
+            self._flush_timer = None
+        try:
+            with self._transaction() as conn:
+                self._flush(conn, time.time())
+        except sqlite3.Error as e:
+            from python.helpers.print_style import PrintStyle
+
+            PrintStyle.error(f"Failed to write rate limiter usage: {e}")
+
+    def _flush(self, conn: sqlite3.Connection, now: float):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        try:
+            self._insert(conn, now, pending)
+        except BaseException:
+            self.add(**pending)  # keep for the next flush
+            raise
+
+    def _insert(self, conn: sqlite3.Connection, now: float, amounts: dict[str, float]):
+        conn.executemany(
+            "INSERT INTO usage (limiter, key, time, value) VALUES (?, ?, ?, ?)",
+            [(self.name, key, now, value) for key, value in amounts.items() if value],
+        )
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the file write lock, serializing check-and-add across processes
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._conn:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=SHARED_DB_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage (limiter TEXT NOT NULL, key TEXT NOT NULL, time REAL NOT NULL, value REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS usage_window ON usage (limiter, key, time)")
+            self._conn = conn
+        return self._conn
+
 
-            await asyncio.sleep(1)
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
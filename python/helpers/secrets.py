@@ -4,7 +4,7 @@ import time
 import os
 from io import StringIO
 from dataclasses import dataclass
-from typing import Dict, Optional, List, Literal, Set, Callable
+from typing import Dict, Optional, List, Literal, Callable
 from dotenv.parser import parse_stream
 from python.helpers.errors import RepairableException
 from python.helpers import files
@@ -30,6 +30,89 @@ class EnvLine:
     )
 
 
+class SecretsMatcher:
+    """Secret values compiled once for fast masking.
+
+    - A regex built from the trie of all values replaces them in one pass, longest match first.
+    - An Aho-Corasick automaton finds the longest end of a text that may begin a secret.
+    """
+
+    def __init__(self, value_to_key: Dict[str, str]):
+        self.value_to_key = {v: k for v, k in value_to_key.items() if v}
+        self.max_len: int = max((len(v) for v in self.value_to_key), default=0)
+
+        trie: dict = {}
+        for value in self.value_to_key:
+            node = trie
+            for ch in value:
+                node = node.setdefault(ch, {})
+            node[""] = {}  # end of value
+        self.pattern = re.compile(_trie_regex(trie)) if trie else None
+
+        # automaton states: transitions, failure links and depth (length of matched prefix)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._depth: List[int] = [0]
+        for value in self.value_to_key:
+            state = 0
+            for ch in value:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._depth.append(self._depth[state] + 1)
+                state = nxt
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                queue.append(nxt)
+
+    def mask(self, text: str, placeholder: str = "§§secret({key})") -> str:
+        """Replace all secret values in text with placeholders."""
+        if not text or not self.pattern:
+            return text
+        return self.pattern.sub(
+            lambda m: alias_for_key(self.value_to_key[m.group(0)], placeholder), text
+        )
+
+    def partial_suffix(self, text: str) -> int:
+        """Return length of the longest suffix of text that is a prefix of any secret."""
+        if not self.max_len:
+            return 0
+        goto, fail = self._goto, self._fail
+        state = 0
+        for ch in text[-self.max_len :]:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+        return self._depth[state]
+
+
+def _trie_regex(node: dict) -> str:
+    # single-child chains are joined into literals to keep nesting shallow
+    alternatives = []
+    for ch, child in sorted(node.items()):
+        if not ch:
+            continue
+        literal = ch
+        while len(child) == 1 and "" not in child:
+            (next_ch, child), = child.items()
+            literal += next_ch
+        alternatives.append(re.escape(literal) + _trie_regex(child))
+    if not alternatives:
+        return ""
+    body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+    if "" in node:
+        body = "(?:" + body + ")?"
+    return body
+
+
 class StreamingSecretsFilter:
     """Stateful streaming filter that masks secrets on the fly.
 
@@ -39,44 +122,32 @@ class StreamingSecretsFilter:
     - On finalize(), any unresolved partial is masked with '***'.
     """
 
-    def __init__(self, key_to_value: Dict[str, str], min_trigger: int = 3):
+    def __init__(
+        self,
+        key_to_value: Dict[str, str],
+        min_trigger: int = 3,
+        matcher: Optional[SecretsMatcher] = None,
+    ):
         self.min_trigger = max(1, int(min_trigger))
-        # Map value -> key for placeholder construction
-        self.value_to_key: Dict[str, str] = {
-            v: k for k, v in key_to_value.items() if isinstance(v, str) and v
-        }
-        # Only keep non-empty values
-        self.secret_values: List[str] = [v for v in self.value_to_key.keys() if v]
-        # Precompute all prefixes for quick suffix matching
-        self.prefixes: Set[str] = set()
-        for v in self.secret_values:
-            for i in range(self.min_trigger, len(v) + 1):
-                self.prefixes.add(v[:i])
-        self.max_len: int = max((len(v) for v in self.secret_values), default=0)
+        # Shared compiled matcher, or one built from the given secrets
+        self.matcher = matcher or SecretsMatcher(
+            {v: k for k, v in key_to_value.items() if isinstance(v, str) and v}
+        )
 
         # Internal buffer of pending text that is not safe to flush yet
         self.pending: str = ""
+        # All text emitted so far, the masked counterpart of the full stream without rescanning it
+        self.output: str = ""
 
     def _replace_full_values(self, text: str) -> str:
         """Replace all full secret values with placeholders in the given text."""
-        # Sort by length desc to avoid partial overlaps
-        for val in sorted(self.secret_values, key=len, reverse=True):
-            if not val:
-                continue
-            key = self.value_to_key.get(val, "")
-            if key:
-                text = text.replace(val, alias_for_key(key))
-        return text
+        return self.matcher.mask(text)
 
     def _longest_suffix_prefix(self, text: str) -> int:
         """Return length of longest suffix of text that is a known secret prefix.
         Returns 0 if none found (or only shorter than min_trigger)."""
-        max_check = min(len(text), self.max_len)
-        for length in range(max_check, self.min_trigger - 1, -1):
-            suffix = text[-length:]
-            if suffix in self.prefixes:
-                return length
-        return 0
+        length = self.matcher.partial_suffix(text)
+        return length if length >= self.min_trigger else 0
 
     def process_chunk(self, chunk: str) -> str:
         if not chunk:
@@ -98,6 +169,7 @@ class StreamingSecretsFilter:
             emit = self.pending
             self.pending = ""
 
+        self.output += emit
         return emit
 
     def finalize(self) -> str:
@@ -114,6 +186,7 @@ class StreamingSecretsFilter:
         else:
             result = self.pending
         self.pending = ""
+        self.output += result
         return result
 
 
@@ -125,6 +198,8 @@ class SecretsManager:
     _instance: Optional["SecretsManager"] = None
     _secrets_cache: Optional[Dict[str, str]] = None
     _last_raw_text: Optional[str] = None
+    _matchers: Dict[int, SecretsMatcher] = {}
+    _matchers_source: Optional[Dict[str, str]] = None
 
     @classmethod
     def get_instance(cls) -> "SecretsManager":
@@ -235,7 +310,26 @@ class SecretsManager:
 
     def create_streaming_filter(self) -> "StreamingSecretsFilter":
         """Create a streaming-aware secrets filter snapshotting current secret values."""
-        return StreamingSecretsFilter(self.load_secrets())
+        return StreamingSecretsFilter(self.load_secrets(), matcher=self.get_matcher())
+
+    def get_matcher(self, min_length: int = 0) -> SecretsMatcher:
+        """Get matcher for secret values of at least min_length, compiled once per secrets change."""
+        secrets = self.load_secrets()
+        with self._lock:
+            if self._matchers_source is not secrets:
+                self._matchers = {}
+                self._matchers_source = secrets
+            matcher = self._matchers.get(min_length)
+            if matcher is None:
+                matcher = SecretsMatcher(
+                    {
+                        value: key
+                        for key, value in secrets.items()
+                        if value and len(value.strip()) >= min_length
+                    }
+                )
+                self._matchers[min_length] = matcher
+            return matcher
 
     def replace_placeholders(self, text: str) -> str:
         """Replace secret placeholders with actual values"""
@@ -281,17 +375,7 @@ class SecretsManager:
         if not text:
             return text
 
-        secrets = self.load_secrets()
-        result = text
-
-        # Sort by length (longest first) to avoid partial replacements
-        for key, value in sorted(
-            secrets.items(), key=lambda x: len(x[1]), reverse=True
-        ):
-            if value and len(value.strip()) >= min_length:
-                result = result.replace(value, alias_for_key(key, placeholder))
-
-        return result
+        return self.get_matcher(min_length).mask(text, placeholder)
 
     def get_masked_secrets(self) -> str:
         """Get content with values masked for frontend display (preserves comments and unrecognized lines)"""
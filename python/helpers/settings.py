@@ -1512,6 +1512,9 @@ def _apply_settings(previous: Settings | None):
         from agent import AgentContext
         from initialize import initialize_agent
 
+        # model wrappers are rebuilt with the new provider settings and api keys
+        models.clear_model_cache()
+
         config = initialize_agent()
         for ctx in AgentContext._contexts.values():
             ctx.config = config  # reinitialize context config with new settings
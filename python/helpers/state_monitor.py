@@ -0,0 +1,131 @@
+import threading
+import time
+from typing import Any
+
+REFRESH_INTERVAL = 5  # seconds, context lists are rebuilt at least this often to catch unsignalled changes
+
+_version = 0
+_condition = threading.Condition()
+
+_lists_lock = threading.Lock()
+_lists_cache: dict[str, Any] = {}
+
+
+def mark_dirty():
+    """Signal that state visible in the web UI has changed (logs, contexts, notifications)."""
+    global _version
+    with _condition:
+        _version += 1
+        _condition.notify_all()
+
+
+def get_version() -> int:
+    return _version
+
+
+def wait_for_change(version: int, timeout: float) -> int:
+    """Block until the state version differs from the given one or timeout passes, returns current version."""
+    with _condition:
+        _condition.wait_for(lambda: _version != version, timeout=timeout)
+        return _version
+
+
+def get_context_lists() -> tuple[list[dict], list[dict]]:
+    """Serialized chats and tasks for the UI, shared by all pollers and streams for the same state version."""
+    from python.helpers.localization import Localization
+
+    version = _version
+    timezone = Localization.get().timezone
+    with _lists_lock:
+        cache = _lists_cache
+        if (
+            cache.get("version") == version
+            and cache.get("timezone") == timezone
+            and time.time() - cache.get("time", 0) < REFRESH_INTERVAL
+        ):
+            return cache["contexts"], cache["tasks"]
+
+        contexts, tasks = _build_context_lists()
+        cache.update(
+            version=version,
+            timezone=timezone,
+            time=time.time(),
+            contexts=contexts,
+            tasks=tasks,
+        )
+        return contexts, tasks
+
+
+def _build_context_lists() -> tuple[list[dict], list[dict]]:
+    from agent import AgentContext, AgentContextType
+    from python.helpers.task_scheduler import TaskScheduler
+
+    # Get a task scheduler instance
+    scheduler = TaskScheduler.get()
+
+    # loop AgentContext._contexts and divide into contexts and tasks
+
+    ctxs = []
+    tasks = []
+    processed_contexts = set()  # Track processed context IDs
+
+    all_ctxs = list(AgentContext._contexts.values())
+    # First, identify all tasks
+    for ctx in all_ctxs:
+        # Skip if already processed
+        if ctx.id in processed_contexts:
+            continue
+
+        # Skip BACKGROUND contexts as they should be invisible to users
+        if ctx.type == AgentContextType.BACKGROUND:
+            processed_contexts.add(ctx.id)
+            continue
+
+        # Create the base context data that will be returned
+        context_data = ctx.serialize()
+
+        context_task = scheduler.get_task_by_uuid(ctx.id)
+        # Determine if this is a task-dedicated context by checking if a task with this UUID exists
+        is_task_context = (
+            context_task is not None and context_task.context_id == ctx.id
+        )
+
+        if not is_task_context:
+            ctxs.append(context_data)
+        else:
+            # If this is a task, get task details from the scheduler
+            task_details = scheduler.serialize_task(ctx.id)
+            if task_details:
+                # Add task details to context_data with the same field names
+                # as used in scheduler endpoints to maintain UI compatibility
+                context_data.update({
+                    "task_name": task_details.get("name"),  # name is for context, task_name for the task name
+                    "uuid": task_details.get("uuid"),
+                    "state": task_details.get("state"),
+                    "type": task_details.get("type"),
+                    "system_prompt": task_details.get("system_prompt"),
+                    "prompt": task_details.get("prompt"),
+                    "last_run": task_details.get("last_run"),
+                    "last_result": task_details.get("last_result"),
+                    "attachments": task_details.get("attachments", []),
+                    "context_id": task_details.get("context_id"),
+                })
+
+                # Add type-specific fields
+                if task_details.get("type") == "scheduled":
+                    context_data["schedule"] = task_details.get("schedule")
+                elif task_details.get("type") == "planned":
+                    context_data["plan"] = task_details.get("plan")
+                else:
+                    context_data["token"] = task_details.get("token")
+
+            tasks.append(context_data)
+
+        # Mark as processed
+        processed_contexts.add(ctx.id)
+
+    # Sort tasks and chats by their creation date, descending
+    ctxs.sort(key=lambda x: x["created_at"], reverse=True)
+    tasks.sort(key=lambda x: x["created_at"], reverse=True)
+
+    return ctxs, tasks
@@ -1,20 +1,50 @@
-from typing import Literal
+from collections import OrderedDict
+import threading
+from typing import Any, Literal
 import tiktoken
 
 APPROX_BUFFER = 1.1
 TRIM_BUFFER = 0.8
+COUNT_CACHE_SIZE = 2048  # token counts of longer texts kept in memory
+COUNT_CACHE_MIN_CHARS = 256  # shorter texts are cheaper to count than to look up
+BINARY_PART_TOKENS = 1000  # estimate for an image or file part, base64 payloads are never tokenized
+
+_encodings: dict[str, tiktoken.Encoding] = {}
+# (encoding, length, hash) -> token count, the text itself is not kept alive
+_counts: "OrderedDict[tuple[str, int, int], int]" = OrderedDict()
+_counts_lock = threading.Lock()
+
+
+def get_encoding(encoding_name="cl100k_base") -> tiktoken.Encoding:
+    encoding = _encodings.get(encoding_name)
+    if encoding is None:
+        encoding = _encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+    return encoding
 
 
 def count_tokens(text: str, encoding_name="cl100k_base") -> int:
     if not text:
         return 0
 
-    # Get the encoding
-    encoding = tiktoken.get_encoding(encoding_name)
+    # short texts are counted directly
+    if len(text) < COUNT_CACHE_MIN_CHARS:
+        return len(get_encoding(encoding_name).encode(text))
+
+    # unchanged longer texts (system prompt parts, history messages) are counted only once
+    key = (encoding_name, len(text), hash(text))
+    with _counts_lock:
+        token_count = _counts.get(key)
+        if token_count is not None:
+            _counts.move_to_end(key)
+            return token_count
 
     # Encode the text and count the tokens
-    tokens = encoding.encode(text)
-    token_count = len(tokens)
+    token_count = len(get_encoding(encoding_name).encode(text))
+
+    with _counts_lock:
+        _counts[key] = token_count
+        if len(_counts) > COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
 
     return token_count
 
@@ -25,6 +55,32 @@ def approximate_tokens(
     return int(count_tokens(text) * APPROX_BUFFER)
 
 
+def approximate_message_tokens(messages: list[Any]) -> int:
+    """Approximate tokens of chat messages in LangChain or LiteLLM format.
+    Each content part is counted on its own so unchanged messages hit the count cache."""
+    total = 0
+    for message in messages:
+        if isinstance(message, dict):
+            total += _approximate_content_tokens({k: v for k, v in message.items() if k != "role"})
+        else:
+            total += _approximate_content_tokens(getattr(message, "content", ""))
+    return total
+
+
+def _approximate_content_tokens(content: Any) -> int:
+    if isinstance(content, str):
+        if content.startswith("data:") and ";base64," in content[:100]:
+            return BINARY_PART_TOKENS
+        return approximate_tokens(content)
+    if isinstance(content, dict):
+        return sum(_approximate_content_tokens(v) for k, v in content.items() if k != "type")
+    if isinstance(content, (list, tuple)):
+        return sum(_approximate_content_tokens(v) for v in content)
+    if hasattr(content, "__dict__"):  # content part objects
+        return _approximate_content_tokens(vars(content))
+    return 0
+
+
 def trim_to_tokens(
     text: str,
     max_tokens: int,
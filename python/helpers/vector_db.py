@@ -1,3 +1,6 @@
+from dataclasses import asdict
+import hashlib
+import json
 from typing import Any, List, Sequence
 import uuid
 from langchain_community.vectorstores import FAISS
@@ -16,6 +19,8 @@ from langchain_community.vectorstores.utils import (
 from langchain.embeddings import CacheBackedEmbeddings
 
 from agent import Agent
+import models
+from models import ModelConfig
 
 
 class MyFaiss(FAISS):
@@ -31,36 +36,53 @@ class MyFaiss(FAISS):
         return self.docstore._dict  # type: ignore
 
 
+def get_embeddings_key(model_config: ModelConfig) -> str:
+    """Identity of an embedding model config, everything that can change the produced embeddings."""
+    return json.dumps(asdict(model_config), sort_keys=True, default=str)
+
+
 class VectorDB:
 
     _cached_embeddings: dict[str, CacheBackedEmbeddings] = {}
+    _dimensions: dict[str, int] = {}
 
     @staticmethod
-    def _get_embeddings(agent: Agent, cache: bool = True):
-        model = agent.get_embedding_model()
+    def _get_embeddings(model_config: ModelConfig, cache: bool = True):
+        model = models.get_embedding_model(
+            model_config.provider,
+            model_config.name,
+            model_config=model_config,
+            **model_config.build_kwargs(),
+        )
         if not cache:
             return model  # return raw embeddings if cache is False
-        namespace = getattr(
-            model,
-            "model_name",
-            "default",
-        )
-        if namespace not in VectorDB._cached_embeddings:
+        key = get_embeddings_key(model_config)
+        if key not in VectorDB._cached_embeddings:
             store = InMemoryByteStore()
-            VectorDB._cached_embeddings[namespace] = (
+            VectorDB._cached_embeddings[key] = (
                 CacheBackedEmbeddings.from_bytes_store(
                     model,
                     store,
-                    namespace=namespace,
+                    namespace=hashlib.sha256(key.encode("utf-8")).hexdigest(),
                 )
             )
-        return VectorDB._cached_embeddings[namespace]
+        return VectorDB._cached_embeddings[key]
 
-    def __init__(self, agent: Agent, cache: bool = True):
-        self.agent = agent
+    def __init__(
+        self,
+        agent: Agent | None = None,
+        cache: bool = True,
+        model_config: ModelConfig | None = None,
+    ):
+        # the agent is only used for its embedding model config and not kept
+        if model_config is None:
+            if not agent:
+                raise ValueError("Agent or embedding model config must be provided")
+            model_config = agent.config.embeddings_model
+        self.model_config = model_config
         self.cache = cache  # store cache preference
-        self.embeddings = self._get_embeddings(agent, cache=cache)
-        self.index = faiss.IndexFlatIP(len(self.embeddings.embed_query("example")))
+        self.embeddings = self._get_embeddings(model_config, cache=cache)
+        self.index = faiss.IndexFlatIP(self._get_dimensions())
 
         self.db = MyFaiss(
             embedding_function=self.embeddings,
@@ -72,6 +94,13 @@ class VectorDB:
             relevance_score_fn=cosine_normalizer,
         )
 
+    def _get_dimensions(self) -> int:
+        # probe the embedding size once per model config, not for every new db
+        key = get_embeddings_key(self.model_config)
+        if key not in VectorDB._dimensions:
+            VectorDB._dimensions[key] = len(self.embeddings.embed_query("example"))
+        return VectorDB._dimensions[key]
+
     async def search_by_similarity_threshold(
         self, query: str, limit: int, threshold: float, filter: str = ""
     ):
@@ -85,6 +114,19 @@ class VectorDB:
             filter=comparator,
         )
 
+    async def search_by_similarity_threshold_with_scores(
+        self, query: str, limit: int, threshold: float, filter: str = ""
+    ) -> list[tuple[Document, float]]:
+        """Same as search_by_similarity_threshold, with the relevance score (0-1) of each document."""
+        comparator = get_comparator(filter) if filter else None
+
+        return await self.db.asimilarity_search_with_relevance_scores(
+            query,
+            k=limit,
+            score_threshold=threshold,
+            filter=comparator,
+        )
+
     async def search_by_metadata(self, filter: str, limit: int = 0) -> list[Document]:
         comparator = get_comparator(filter)
         all_docs = self.db.get_all_docs()
@@ -97,14 +139,26 @@ class VectorDB:
                     break
         return result
 
-    async def insert_documents(self, docs: list[Document]):
+    async def insert_documents(
+        self, docs: list[Document], embeddings: list[list[float]] | None = None
+    ):
         ids = [str(uuid.uuid4()) for _ in range(len(docs))]
 
         if ids:
             for doc, id in zip(docs, ids):
                 doc.metadata["id"] = id  # add ids to documents metadata
 
-            self.db.add_documents(documents=docs, ids=ids)
+            if embeddings is not None:
+                # already embedded, e.g. loaded from disk
+                self.db.add_embeddings(
+                    text_embeddings=list(
+                        zip([doc.page_content for doc in docs], embeddings)
+                    ),
+                    metadatas=[doc.metadata for doc in docs],
+                    ids=ids,
+                )
+            else:
+                self.db.add_documents(documents=docs, ids=ids)
         return ids
 
     async def delete_documents_by_ids(self, ids: list[str]):
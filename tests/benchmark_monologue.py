@@ -0,0 +1,385 @@
+"""
+Offline benchmark of the agent message loop.
+
+Drives Agent.monologue end-to-end against a deterministic fake LiteLLM provider
+that streams canned responses, so hot path regressions show up without network access.
+Intermediate responses call a no-op benchmark_step tool registered by the benchmark,
+so every step goes through the normal tool execution and grows the history by one tool result.
+
+Reports per-iteration latency, time spent in each extension point,
+chunks per second through the stream callbacks and peak memory.
+
+Usage:
+    python tests/benchmark_monologue.py --runs 5 --iterations 4 --chunk-size 8 --chunk-delay 0
+    python tests/benchmark_monologue.py --json > bench.json
+"""
+
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Any, AsyncIterator
+
+import litellm
+from litellm import CustomLLM
+from litellm.types.utils import GenericStreamingChunk
+
+import initialize
+from agent import Agent, AgentContext, AgentContextType, UserMessage
+from python.helpers import extension, persist_chat
+from python.helpers.tool import Response, Tool
+
+PROVIDER = "a0bench"
+CHAT_MODEL = "chat"
+UTILITY_MODEL = "utility"
+BENCHMARK_TOOL = "benchmark_step"  # no-op tool called by intermediate steps
+
+# extensions that need an embedding model and the memory database, skipped unless --with-memory
+MEMORY_EXTENSIONS = [
+    "_10_memory_init",
+    "_50_recall_memories",
+    "_91_recall_wait",
+    "_50_memorize_fragments",
+    "_51_memorize_solutions",
+]
+
+
+class FakeLLM(CustomLLM):
+    """LiteLLM custom provider streaming canned agent responses at a configurable rate."""
+
+    def __init__(
+        self,
+        iterations: int,
+        chunk_size: int,
+        chunk_delay: float,
+        first_chunk_delay: float,
+        response_chars: int,
+        reasoning_chars: int,
+    ):
+        super().__init__()
+        self.iterations = iterations
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.first_chunk_delay = first_chunk_delay
+        self.response_chars = response_chars
+        self.reasoning_chars = reasoning_chars
+        self.step = 0
+        self.delay_total = 0.0
+        # simulated prompt cache, hashes of message prefixes that ended at a cache marker
+        self.cached_prefixes: set[int] = set()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def reset(self):
+        self.step = 0
+
+    def next_response(self, model: str) -> str:
+        # utility model calls (chat rename, history summaries) get a short fixed answer
+        if model.endswith(UTILITY_MODEL):
+            return "Benchmark summary of the conversation so far."
+
+        self.step += 1
+        filler = ("lorem ipsum dolor sit amet " * (self.response_chars // 27 + 1))[
+            : self.response_chars
+        ]
+        if self.step < self.iterations:
+            response = {
+                "thoughts": [f"Benchmark step {self.step} of {self.iterations}", filler],
+                "headline": f"Running benchmark step {self.step}",
+                "tool_name": BENCHMARK_TOOL,
+                "tool_args": {"step": self.step},
+            }
+        else:
+            response = {
+                "thoughts": ["Benchmark finished", filler],
+                "headline": "Responding",
+                "tool_name": "response",
+                "tool_args": {"text": f"Benchmark done after {self.step} steps. {filler}"},
+            }
+        text = json.dumps(response, indent=2)
+        if self.reasoning_chars:
+            text = "<think>" + ("reasoning " * (self.reasoning_chars // 10 + 1))[
+                : self.reasoning_chars
+            ] + "</think>" + text
+        return text
+
+    def record_cache_markers(self, messages: list[dict]):
+        # a request hits the cache when its prompt starts with a prefix marked in an earlier request
+        marked = [i for i, m in enumerate(messages) if _has_cache_marker(m)]
+        if not marked:
+            return
+        prefixes = []
+        prefix = ""
+        for message in messages[: marked[-1] + 1]:
+            prefix += json.dumps(message, sort_keys=True, default=str)
+            prefixes.append(hash(prefix))
+        if any(p in self.cached_prefixes for p in prefixes):
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+        self.cached_prefixes.update(prefixes[i] for i in marked)
+
+    async def astreaming(self, *args, **kwargs) -> AsyncIterator[GenericStreamingChunk]:  # type: ignore[override]
+        self.record_cache_markers(kwargs.get("messages") or [])
+        text = self.next_response(str(kwargs.get("model", "")))
+        if self.first_chunk_delay:
+            await self._sleep(self.first_chunk_delay)
+        for i in range(0, len(text), self.chunk_size):
+            if i and self.chunk_delay:
+                await self._sleep(self.chunk_delay)
+            last = i + self.chunk_size >= len(text)
+            yield {
+                "text": text[i : i + self.chunk_size],
+                "is_finished": last,
+                "finish_reason": "stop" if last else "",
+                "index": 0,
+                "tool_use": None,
+                "usage": None,
+            }
+
+    async def _sleep(self, seconds: float):
+        # time spent simulating the provider, subtracted when reporting agent overhead
+        start = time.perf_counter()
+        await asyncio.sleep(seconds)
+        self.delay_total += time.perf_counter() - start
+
+
+def _has_cache_marker(message: dict) -> bool:
+    content = message.get("content")
+    return isinstance(content, list) and any(
+        isinstance(block, dict) and "cache_control" in block for block in content
+    )
+
+
+class BenchmarkStep(Tool):
+    """No-op tool called by the intermediate canned responses."""
+
+    async def execute(self, step: int = 0, **kwargs) -> Response:
+        return Response(message=f"Benchmark step {step} done.", break_loop=False)
+
+
+class Recorder:
+    """Collects timings from the patched agent methods."""
+
+    def __init__(self):
+        self.points: dict[str, list[float]] = {}
+        self.iterations: list[float] = []
+        self.chat_time = 0.0
+        self.chunks = 0
+        self._iteration_start = 0.0
+
+    def install(self, skip: list[str]):
+        recorder = self
+        call_extensions = Agent.call_extensions
+        call_chat_model = Agent.call_chat_model
+        get_tool = Agent.get_tool
+        get_extensions = extension._get_extensions
+
+        async def timed_call_extensions(self: Agent, extension_point: str, **kwargs) -> Any:
+            start = time.perf_counter()
+            if extension_point == "message_loop_start":
+                recorder._iteration_start = start
+            try:
+                return await call_extensions(self, extension_point, **kwargs)
+            finally:
+                end = time.perf_counter()
+                recorder.points.setdefault(extension_point, []).append(end - start)
+                if extension_point in ("response_stream_chunk", "reasoning_stream_chunk"):
+                    recorder.chunks += 1
+                if extension_point == "message_loop_end" and self.number == 0:
+                    recorder.iterations.append(end - recorder._iteration_start)
+
+        async def timed_call_chat_model(self: Agent, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await call_chat_model(self, *args, **kwargs)
+            finally:
+                recorder.chat_time += time.perf_counter() - start
+
+        def get_benchmark_tool(self: Agent, name: str, method, args: dict, message: str, loop_data, **kwargs):
+            if name == BENCHMARK_TOOL:
+                return BenchmarkStep(agent=self, name=name, method=method, args=args, message=message, loop_data=loop_data, **kwargs)
+            return get_tool(self, name, method, args, message, loop_data, **kwargs)
+
+        def filtered_get_extensions(folder: str):
+            classes = get_extensions(folder)
+            return [cls for cls in classes if cls.__module__.split(".")[-1] not in skip]
+
+        Agent.call_extensions = timed_call_extensions  # type: ignore[method-assign]
+        Agent.call_chat_model = timed_call_chat_model  # type: ignore[method-assign]
+        Agent.get_tool = get_benchmark_tool  # type: ignore[method-assign]
+        extension._get_extensions = filtered_get_extensions  # type: ignore[assignment]
+
+
+def build_config(with_memory: bool, prompt_caching: bool):
+    config = initialize.initialize_agent()
+    chat = dataclasses.replace(
+        config.chat_model,
+        provider=PROVIDER,
+        name=CHAT_MODEL,
+        api_base="",
+        limit_requests=0,
+        limit_input=0,
+        limit_output=0,
+        kwargs={"a0_prompt_caching": True} if prompt_caching else {},
+    )
+    utility = dataclasses.replace(
+        chat, name=UTILITY_MODEL, ctx_length=config.utility_model.ctx_length, kwargs={}
+    )
+    config = dataclasses.replace(config, chat_model=chat, utility_model=utility, mcp_servers="")
+    if with_memory:
+        # keep benchmark memories away from the user's memory
+        config.memory_subdir = "benchmark"
+    return config
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run(args) -> dict:
+    provider = FakeLLM(
+        iterations=args.iterations,
+        chunk_size=args.chunk_size,
+        chunk_delay=args.chunk_delay,
+        first_chunk_delay=args.first_chunk_delay,
+        response_chars=args.response_chars,
+        reasoning_chars=args.reasoning_chars,
+    )
+    litellm.custom_provider_map = [{"provider": PROVIDER, "custom_handler": provider}]
+
+    recorder = Recorder()
+    recorder.install(skip=[] if args.with_memory else MEMORY_EXTENSIONS)
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    context = None
+    runs: list[float] = []
+    try:
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            context = AgentContext(config=build_config(args.with_memory, args.prompt_caching), type=AgentContextType.USER)
+            for i in range(args.runs):
+                provider.reset()
+                start = time.perf_counter()
+                context.communicate(
+                    UserMessage(message=f"Benchmark run {i + 1}", attachments=[])
+                ).result_sync()
+                runs.append(time.perf_counter() - start)
+    finally:
+        if context:
+            AgentContext.remove(context.id)
+            persist_chat.remove_chat(context.id)
+
+    traced_peak = None
+    if args.trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    total = sum(runs)
+    iterations = recorder.iterations
+    return {
+        "runs": len(runs),
+        "iterations": len(iterations),
+        "total_s": total,
+        "run_mean_s": statistics.mean(runs) if runs else 0.0,
+        "iteration_mean_ms": statistics.mean(iterations) * 1000 if iterations else 0.0,
+        "iteration_p50_ms": percentile(iterations, 50) * 1000,
+        "iteration_p95_ms": percentile(iterations, 95) * 1000,
+        "iteration_max_ms": max(iterations, default=0.0) * 1000,
+        "overhead_per_iteration_ms": (
+            (sum(iterations) - provider.delay_total) / len(iterations) * 1000
+            if iterations
+            else 0.0
+        ),
+        "chunks": recorder.chunks,
+        "chunks_per_s": recorder.chunks / recorder.chat_time if recorder.chat_time else 0.0,
+        "prompt_cache_hits": provider.cache_hits,
+        "prompt_cache_misses": provider.cache_misses,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_traced_mb": traced_peak,
+        "extension_points": {
+            point: {
+                "calls": len(times),
+                "total_ms": sum(times) * 1000,
+                "mean_us": statistics.mean(times) * 1_000_000,
+            }
+            for point, times in sorted(
+                recorder.points.items(), key=lambda item: sum(item[1]), reverse=True
+            )
+        },
+    }
+
+
+def print_report(result: dict):
+    print(f"runs: {result['runs']}, iterations: {result['iterations']}, total: {result['total_s']:.3f} s")
+    print(
+        "iteration latency: "
+        f"mean {result['iteration_mean_ms']:.2f} ms, "
+        f"p50 {result['iteration_p50_ms']:.2f} ms, "
+        f"p95 {result['iteration_p95_ms']:.2f} ms, "
+        f"max {result['iteration_max_ms']:.2f} ms"
+    )
+    print(f"agent overhead per iteration: {result['overhead_per_iteration_ms']:.2f} ms")
+    print(f"stream chunks: {result['chunks']}, {result['chunks_per_s']:.0f} chunks/s")
+    if result["prompt_cache_hits"] or result["prompt_cache_misses"]:
+        print(f"prompt cache: {result['prompt_cache_hits']} hits, {result['prompt_cache_misses']} misses")
+    if result["peak_rss_mb"] is not None:
+        print(f"peak RSS: {result['peak_rss_mb']:.1f} MB")
+    if result["peak_traced_mb"] is not None:
+        print(f"peak traced Python memory: {result['peak_traced_mb']:.1f} MB")
+    print()
+    print(f"{'extension point':<32}{'calls':>8}{'total ms':>12}{'mean us':>12}")
+    for point, stats in result["extension_points"].items():
+        print(f"{point:<32}{stats['calls']:>8}{stats['total_ms']:>12.2f}{stats['mean_us']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="monologues to run in the same context")
+    parser.add_argument("--iterations", type=int, default=5, help="message loop iterations per monologue")
+    parser.add_argument("--chunk-size", type=int, default=4, help="characters per streamed chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between chunks")
+    parser.add_argument("--first-chunk-delay", type=float, default=0.0, help="seconds before the first chunk")
+    parser.add_argument("--response-chars", type=int, default=400, help="filler characters per response")
+    parser.add_argument("--reasoning-chars", type=int, default=0, help="reasoning characters per response")
+    parser.add_argument("--prompt-caching", action="store_true", help="mark prompt cache breakpoints, the fake provider reports hits and misses")
+    parser.add_argument("--with-memory", action="store_true", help="keep memory extensions (needs the embedding model)")
+    parser.add_argument("--trace-memory", action="store_true", help="track peak Python allocations with tracemalloc")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the agent output")
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import json
+import random
+
+from python.helpers.dirty_json import DirtyJson
+
+DOCUMENTS = [
+    '{"thoughts": ["a", "b\\n"], "tool_name": "response", "tool_args": {"text": "hi \\"x\\" \\u00e9", "n": 12, "f": -1.5e3, "t": true, "z": null}}',
+    'Sure, here it is: {"a": [1, 2, 3], "b": {"c": false}} done',
+    '{a: unquoted, b: 1}',
+    '{"s": """multi\nline"""}',
+    '[1, "two", true, null, [3], {}]',
+    '{{"x": {"y": 1}}}',
+    '{"a": 1, // comment\n "b": /* block */ 2}',
+    '{"a": [true, false, null, undefined, tru]}',
+    "{'a': 'single', \"b\": `back`}",
+    '[{"a": {"b": 1}}, 4, {"c": [[]]}]',
+    '{"esc": "tab\\t slash\\/ partial \\u12"}',
+]
+
+
+def snapshot(value) -> str:
+    # feed() keeps building the same objects, compare copies taken at each step
+    return json.dumps(value, sort_keys=True)
+
+
+def assert_feed_matches_parse(document: str, rnd: random.Random):
+    parser = DirtyJson()
+    pos = 0
+    while pos < len(document):
+        chunk = document[pos : pos + rnd.randint(1, 6)]
+        pos += len(chunk)
+        result = snapshot(parser.feed(chunk))
+        prefix = document[:pos]
+        if not any(c in prefix for c in "{[\""):
+            continue  # parse() reads text before the document as an unquoted string, feed() skips it
+        try:
+            expected = snapshot(DirtyJson.parse_string(prefix))
+        except ValueError:
+            continue  # parse() fails on incomplete numbers like "1e", feed() keeps the last value
+        assert result == expected, f"prefix {prefix!r}"
+
+
+def test_feed_matches_parse_for_every_prefix():
+    rnd = random.Random(0)
+    for document in DOCUMENTS:
+        for _ in range(10):
+            assert_feed_matches_parse(document, rnd)
+
+
+def test_feed_matches_parse_for_random_documents():
+    rnd = random.Random(1)
+    words = ["", "a b", "é", 'x"y', "line\nbreak", "back\\slash", "quote'", "☃"]
+
+    def value(depth=0):
+        r = rnd.random()
+        if depth > 3 or r < 0.35:
+            return rnd.choice([rnd.choice(words), rnd.randint(-50, 5000), rnd.random() * 100, True, False, None])
+        if r < 0.7:
+            return {f"k{i}": value(depth + 1) for i in range(rnd.randint(0, 4))}
+        return [value(depth + 1) for _ in range(rnd.randint(0, 4))]
+
+    for _ in range(50):
+        data = {"thoughts": [value()], "tool_name": "x", "tool_args": value()}
+        document = json.dumps(data, ensure_ascii=rnd.random() < 0.3, indent=rnd.choice([None, 2]))
+        assert DirtyJson.parse_string(document) == data
+        assert_feed_matches_parse(document, rnd)
+
+
+def test_partial_literal_is_shown_as_text():
+    parser = DirtyJson()
+    assert parser.feed('{"a": tru') == {"a": "tru"}
+    assert parser.feed("e}") == {"a": True}
+
+
+def test_nested_objects_closing_together():
+    assert DirtyJson.parse_string('[{"a": {"b": 1}}, 4]') == [{"a": {"b": 1}}, 4]
+    assert DirtyJson.parse_string('{{"a": {"b": 1}}}') == {"a": {"b": 1}}
@@ -0,0 +1,96 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+from python.helpers.memory import Memory, MemoryPersistence, MyFaiss
+
+EMBEDDINGS = FakeEmbeddings(size=8)
+
+
+def new_db() -> MyFaiss:
+    return MyFaiss(
+        embedding_function=EMBEDDINGS,
+        index=faiss.IndexFlatIP(8),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.COSINE,
+    )
+
+
+def load_db(persistence: MemoryPersistence) -> MyFaiss:
+    return MyFaiss.load_local(
+        folder_path=Memory._abs_db_dir(persistence.memory_subdir),
+        embeddings=EMBEDDINGS,
+        index_name=persistence.get_snapshot_name(),  # type: ignore[arg-type]
+        allow_dangerous_deserialization=True,
+        distance_strategy=DistanceStrategy.COSINE,
+    )  # type: ignore
+
+
+def setup(tmp_path, monkeypatch) -> MemoryPersistence:
+    monkeypatch.setattr(Memory, "_abs_db_dir", staticmethod(lambda subdir: str(tmp_path / subdir)))
+    os.makedirs(tmp_path / "test")
+    return MemoryPersistence("test")
+
+
+def insert(persistence: MemoryPersistence, db: MyFaiss, id: str, text: str):
+    doc = Document(text, metadata={"id": id})
+    db.add_documents([doc], ids=[id])
+    persistence.log_operation("insert", docs=[doc])
+
+
+def test_replay_skips_saved_inserts(tmp_path, monkeypatch):
+    persistence = setup(tmp_path, monkeypatch)
+    db = new_db()
+    persistence.attach(db)
+    insert(persistence, db, "a", "first")
+
+    # crash after the snapshot was written, before the pending log was removed
+    persistence.save(db)
+    persistence.timer.cancel()  # type: ignore[union-attr]
+
+    loaded = load_db(persistence)
+    assert not persistence.replay(loaded)
+    assert list(loaded.get_all_docs().keys()) == ["a"]
+
+
+def test_replay_applies_unsaved_operations(tmp_path, monkeypatch):
+    persistence = setup(tmp_path, monkeypatch)
+    db = new_db()
+    persistence.attach(db)
+    insert(persistence, db, "a", "first")
+    insert(persistence, db, "b", "second")
+    persistence.flush()
+
+    # changes after the last snapshot are only in the log
+    insert(persistence, db, "c", "third")
+    db.delete(ids=["a"])
+    persistence.log_operation("delete", ids=["a"])
+    persistence.timer.cancel()  # type: ignore[union-attr]
+
+    loaded = load_db(persistence)
+    assert persistence.replay(loaded)
+    assert sorted(loaded.get_all_docs().keys()) == ["b", "c"]
+
+
+def test_snapshot_pair_is_switched_at_once(tmp_path, monkeypatch):
+    persistence = setup(tmp_path, monkeypatch)
+    db = new_db()
+    persistence.attach(db)
+    insert(persistence, db, "a", "first")
+    persistence.flush()
+    first = persistence.get_snapshot_name()
+
+    insert(persistence, db, "b", "second")
+    persistence.flush()
+    second = persistence.get_snapshot_name()
+
+    assert first != second
+    saved = sorted(f for f in os.listdir(tmp_path / "test") if f.endswith((".faiss", ".pkl")))
+    assert saved == [f"{second}.faiss", f"{second}.pkl"]
+    assert sorted(load_db(persistence).get_all_docs().keys()) == ["a", "b"]
@@ -0,0 +1,162 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import json
+
+from python.helpers import persist_chat
+
+
+def message(content: str, ai: bool = False) -> dict:
+    return {"_cls": "Message", "ai": ai, "content": content, "summary": "", "tokens": 1}
+
+
+def history(*topics: list[dict]) -> str:
+    *done, current = topics or ([],)
+    return json.dumps(
+        {
+            "_cls": "History",
+            "counter": sum(len(t) for t in topics),
+            "bulks": [],
+            "topics": [{"_cls": "Topic", "summary": "", "messages": t} for t in done],
+            "current": {"_cls": "Topic", "summary": "", "messages": current},
+        }
+    )
+
+
+def setup(tmp_path, monkeypatch, ctxid: str = "chat") -> str:
+    monkeypatch.setattr(persist_chat, "CHATS_FOLDER", str(tmp_path))
+    snapshot = {
+        "id": ctxid,
+        "name": "test",
+        "journal_seq": 1,
+        "agents": [{"number": 0, "data": {}, "history": history([message("hello")])}],
+        "streaming_agent": 0,
+        "log": {"guid": "g", "logs": [{"no": 0, "type": "user", "content": "hello"}], "progress": "", "progress_no": 0},
+    }
+    path = persist_chat._get_chat_file_path(ctxid)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    return ctxid
+
+
+def append(ctxid: str, *entries: dict, suffix: str = ""):
+    with open(persist_chat._get_journal_file_path(ctxid) + suffix, "a", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+def entry(seq: int, agents: list[dict], logs: list[dict] = [], agent_count: int = 1) -> dict:
+    return {
+        "seq": seq,
+        "name": "test",
+        "agent_count": agent_count,
+        "agents": agents,
+        "log": {"logs": logs, "progress": "", "progress_no": 0},
+    }
+
+
+def messages(data: dict, index: int = 0) -> list[list[str]]:
+    hist = json.loads(data["agents"][index]["history"])
+    return [[m["content"] for m in t["messages"]] for t in hist["topics"] + [hist["current"]]]
+
+
+def test_replay_appends_messages_and_topics(tmp_path, monkeypatch):
+    ctxid = setup(tmp_path, monkeypatch)
+    append(
+        ctxid,
+        entry(2, [{"index": 0, "number": 0, "topics": [[message("hi", ai=True)]]}]),
+        entry(3, [{"index": 0, "number": 0, "topics": [[], [message("next")]]}],
+              logs=[{"no": 1, "type": "agent", "content": "hi"}]),
+    )
+
+    data = persist_chat._read_chat_data(ctxid)
+    assert data["journal_seq"] == 3
+    assert messages(data) == [["hello", "hi"], ["next"]]
+    assert [item["no"] for item in data["log"]["logs"]] == [0, 1]
+
+
+def test_replay_skips_folded_and_torn_entries(tmp_path, monkeypatch):
+    ctxid = setup(tmp_path, monkeypatch)
+    append(ctxid, entry(1, [{"index": 0, "number": 0, "topics": [[message("folded")]]}]))
+    append(ctxid, entry(2, [{"index": 0, "number": 0, "topics": [[message("kept")]]}]))
+    with open(persist_chat._get_journal_file_path(ctxid), "a", encoding="utf-8") as f:
+        f.write('{"seq": 3, "agents": [')  # crash while appending
+
+    assert messages(persist_chat._read_chat_data(ctxid)) == [["hello", "kept"]]
+
+
+def test_replay_whole_history_and_subordinates(tmp_path, monkeypatch):
+    ctxid = setup(tmp_path, monkeypatch)
+    append(
+        ctxid,
+        entry(2, [
+            {"index": 0, "number": 0, "history": history([message("compressed")])},
+            {"index": 1, "number": 1, "data": "{}", "history": history([message("sub")])},
+        ], agent_count=2),
+        entry(3, [], agent_count=1),  # subordinate gone
+    )
+
+    data = persist_chat._read_chat_data(ctxid)
+    assert len(data["agents"]) == 1
+    assert messages(data) == [["compressed"]]
+
+
+def test_compaction_folds_journal(tmp_path, monkeypatch):
+    ctxid = setup(tmp_path, monkeypatch)
+    append(ctxid, entry(2, [{"index": 0, "number": 0, "topics": [[message("a")]]}]))
+    expected = persist_chat._read_chat_data(ctxid)
+
+    state = persist_chat._JournalState()
+    state.seq = 2
+    state.compacting = True
+    persist_chat._compact_journal(ctxid, state)
+
+    journal = persist_chat._get_journal_file_path(ctxid)
+    assert not os.path.exists(journal)
+    assert not os.path.exists(journal + persist_chat.JOURNAL_COMPACTING_SUFFIX)
+    assert not state.compacting
+    with open(persist_chat._get_chat_file_path(ctxid), encoding="utf-8") as f:
+        assert json.load(f) == expected
+
+    # entries written during compaction go to the fresh journal and still replay
+    append(ctxid, entry(3, [{"index": 0, "number": 0, "topics": [[message("b")]]}]))
+    assert messages(persist_chat._read_chat_data(ctxid)) == [["hello", "a", "b"]]
+
+
+def test_compaction_after_snapshot_is_dropped(tmp_path, monkeypatch):
+    ctxid = setup(tmp_path, monkeypatch)
+    append(ctxid, entry(2, [{"index": 0, "number": 0, "topics": [[message("a")]]}]))
+    state = persist_chat._JournalState()
+    state.generation = 1
+
+    original = persist_chat._read_chat_data
+
+    def read_and_snapshot(*args, **kwargs):
+        data = original(*args, **kwargs)
+        state.generation += 1  # full snapshot written while folding
+        return data
+
+    monkeypatch.setattr(persist_chat, "_read_chat_data", read_and_snapshot)
+    persist_chat._compact_journal(ctxid, state)
+
+    with open(persist_chat._get_chat_file_path(ctxid), encoding="utf-8") as f:
+        assert json.load(f)["journal_seq"] == 1
+
+
+def test_removed_chat_is_not_written_back(tmp_path, monkeypatch):
+    ctxid = setup(tmp_path, monkeypatch)
+    append(ctxid, entry(2, [{"index": 0, "number": 0, "topics": [[message("a")]]}]))
+    state = persist_chat._get_journal_state(ctxid)
+    state.compacting = True
+
+    original = persist_chat._read_chat_data
+
+    def read_and_remove(*args, **kwargs):
+        data = original(*args, **kwargs)
+        persist_chat.remove_chat(ctxid)  # chat deleted while folding
+        return data
+
+    monkeypatch.setattr(persist_chat, "_read_chat_data", read_and_remove)
+    persist_chat._compact_journal(ctxid, state)
+
+    assert not os.path.exists(persist_chat.get_chat_folder_path(ctxid))
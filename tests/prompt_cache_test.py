@@ -0,0 +1,47 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+
+
+def cached_indexes(messages: list[dict]) -> list[int]:
+    return [
+        i
+        for i, message in enumerate(messages)
+        if isinstance(message["content"], list)
+        and any("cache_control" in part for part in message["content"])
+    ]
+
+
+def test_breakpoints_follow_the_growing_history():
+    messages = [{"role": "system", "content": "system prompt"}, {"role": "user", "content": "task"}]
+    for iteration in range(5):
+        marked = models._apply_cache_breakpoints(messages)
+        expected = [0] if len(messages) <= 2 else [0, len(messages) - 2]
+        assert cached_indexes(marked) == expected, f"iteration {iteration}"
+        assert marked[0]["content"][-1]["text"] == "system prompt"
+        assert cached_indexes(messages) == []  # input messages are not modified
+
+        # next loop iteration: agent response and tool result are appended
+        messages = messages + [
+            {"role": "assistant", "content": f"response {iteration}"},
+            {"role": "user", "content": [{"type": "text", "text": f"result {iteration}"}]},
+        ]
+
+
+def test_breakpoints_skip_empty_content_and_missing_system():
+    messages = [
+        {"role": "user", "content": "task"},
+        {"role": "assistant", "content": ""},
+        {"role": "user", "content": "result"},
+    ]
+    assert cached_indexes(models._apply_cache_breakpoints(messages)) == []
+
+
+def test_cache_usage_is_counted():
+    models.prompt_cache_stats.pop("test/model", None)
+    models._log_cache_usage("test/model", 0, 1200)
+    message = models._log_cache_usage("test/model", 1200, 0)
+    stats = models.prompt_cache_stats["test/model"]
+    assert (stats.hits, stats.misses, stats.read_tokens, stats.write_tokens) == (1, 1, 1200, 1200)
+    assert message.startswith("Prompt cache hit for test/model")
@@ -1,31 +1,124 @@
-
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-import models
+import asyncio
+
+from python.helpers import rate_limiter
+from python.helpers.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self, start: float = 1_000_000.0):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+
+def test_sustained_adds_expire(monkeypatch):
+    # adds every 50ms for 3 minutes, only the last minute may count
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "time", clock.time)
+    limiter = RateLimiter(seconds=60, output=100000)
+    for _ in range(3 * 60 * 20):
+        clock.now += 0.05
+        limiter.add(output=10)
+
+    total = asyncio.run(limiter.get_total("output"))
+    assert 12000 <= total <= 12000 + 10 * 3  # at most the partial slots at the window edge
+    assert len(limiter.values["output"]) <= rate_limiter.BUCKETS_PER_TIMEFRAME + 1
+
+
+def test_bucket_never_expires_early(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "time", clock.time)
+    limiter = RateLimiter(seconds=60, requests=1)
+    limiter.add(requests=1)
+    clock.now += 59.99
+    assert asyncio.run(limiter.get_total("requests")) == 1
+    clock.now += 0.2
+    assert asyncio.run(limiter.get_total("requests")) == 0
+
+
+def test_acquire_in_order():
+    async def run():
+        limiter = RateLimiter(seconds=1, requests=2)
+        order = []
+
+        async def request(i: int):
+            await limiter.acquire(requests=1)
+            order.append(i)
+
+        await asyncio.gather(*(request(i) for i in range(5)))
+        return order
 
-provider = "openai"
-name = "gpt-4.1-mini"
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
 
-model = models.get_chat_model(
-    provider=provider,
-    name=name,
-    model_config=models.ModelConfig(
-        type=models.ModelType.CHAT,
+
+def test_shared_limiter(tmp_path):
+    db = str(tmp_path / "limits.db")
+
+    async def run():
+        first = rate_limiter.SharedRateLimiter(db, "p\\m", seconds=60, requests=2)
+        second = rate_limiter.SharedRateLimiter(db, "p\\m", seconds=60, requests=2)
+        await first.acquire(requests=1)
+        await second.acquire(requests=1)
+        # third request would exceed the shared limit, the callback reports it
+        seen = []
+
+        async def callback(msg, key, total, limit):
+            seen.append((key, total, limit))
+            return True
+
+        await first.acquire(callback, requests=1)
+        return seen, await first.get_total("requests")
+
+    seen, total = asyncio.run(run())
+    assert seen == [("requests", 3, 2)]
+    assert total == 3
+
+
+def test_shared_limiter_flushes_pending(tmp_path):
+    db = str(tmp_path / "limits.db")
+
+    async def run():
+        first = rate_limiter.SharedRateLimiter(db, "p\\m", seconds=60, output=1000)
+        second = rate_limiter.SharedRateLimiter(db, "p\\m", seconds=60, output=1000)
+        await first.acquire(output=1)
+        first.add(output=10)  # batched locally
+        await asyncio.sleep(rate_limiter.SHARED_FLUSH_INTERVAL * 2)
+        return await second.get_total("output")
+
+    assert asyncio.run(run()) == 11
+
+
+def run_model_example():
+    import models
+
+    provider = "openai"
+    name = "gpt-4.1-mini"
+
+    model = models.get_chat_model(
         provider=provider,
         name=name,
-        limit_requests = 5,
-        limit_input = 15000,
-        limit_output = 1000,
-    )
-    )
+        model_config=models.ModelConfig(
+            type=models.ModelType.CHAT,
+            provider=provider,
+            name=name,
+            limit_requests = 5,
+            limit_input = 15000,
+            limit_output = 1000,
+        )
+        )
 
-async def run():
-    response, reasoning = await model.unified_call(
-        user_message="Tell me a joke"
-    )
-    print("Response: ", response)
-    print("Reasoning: ", reasoning)
+    async def run():
+        response, reasoning = await model.unified_call(
+            user_message="Tell me a joke"
+        )
+        print("Response: ", response)
+        print("Reasoning: ", reasoning)
 
+    asyncio.run(run())
 
-import asyncio
-asyncio.run(run())
\ No newline at end of file
+
+if __name__ == "__main__":
+    run_model_example()
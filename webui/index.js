@@ -333,7 +333,6 @@ let lastLogGuid = "";
 let lastSpokenNo = 0;
 
 async function poll() {
-  let updated = false;
   try {
     // Get timezone from navigator
     const timezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
@@ -352,16 +351,32 @@ async function poll() {
       return false;
     }
 
+    return await handlePollResponse(response);
+  } catch (error) {
+    console.error("Error:", error);
+    setConnectionStatus(false);
+  }
+
+  return false;
+}
+
+// applies a state update from /poll or the /poll_stream event stream
+async function handlePollResponse(response) {
+  let updated = false;
+  try {
     if (!context) setContext(response.context);
-    if (response.context != context) return; //skip late polls after context change
+    if (response.context != context) return false; //skip late polls after context change
 
-    // if the chat has been reset, restart this poll as it may have been called with incorrect log_from
+    // if the chat has been reset, clear it
     if (lastLogGuid != response.log_guid) {
       chatHistory.innerHTML = "";
       lastLogVersion = 0;
       lastLogGuid = response.log_guid;
-      await poll();
-      return;
+      // restart the poll as it may have been called with incorrect log_from
+      if (response.log_from) {
+        await poll();
+        return false;
+      }
     }
 
     if (lastLogVersion != response.log_version) {
@@ -753,6 +768,7 @@ export const newContext = function () {
 export const setContext = function (id) {
   if (id == context) return;
   context = id;
+  closeEventStream();
   // Always reset the log tracking variables when switching contexts
   // This ensures we get fresh data from the backend
   lastLogGuid = "";
@@ -1065,6 +1081,73 @@ chatInput.addEventListener("input", adjustTextareaHeight);
 
 // setInterval(poll, 250);
 
+// server push of poll updates, /poll is used as a fallback when the stream is not available
+let eventStream = null;
+let eventStreamContext = null;
+let eventStreamErrors = 0;
+let eventStreamRetryAt = 0;
+const streamContexts = new Map();
+const streamTasks = new Map();
+
+function openEventStream() {
+  if (!globalThis.EventSource || !context) return;
+  if (eventStream && eventStreamContext == context) return;
+  if (Date.now() < eventStreamRetryAt) return;
+  closeEventStream();
+
+  const params = new URLSearchParams({
+    context: context,
+    log_from: lastLogVersion,
+    notifications_from: notificationStore.lastNotificationVersion || 0,
+    timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
+  });
+  const source = new EventSource("/poll_stream?" + params.toString());
+  eventStream = source;
+  eventStreamContext = context;
+  streamContexts.clear();
+  streamTasks.clear();
+
+  source.onmessage = async (event) => {
+    if (source !== eventStream) return;
+    eventStreamErrors = 0;
+    const response = JSON.parse(event.data);
+    mergeStreamList(streamContexts, response.contexts_updated, response.contexts_removed);
+    mergeStreamList(streamTasks, response.tasks_updated, response.tasks_removed);
+    response.contexts = [...streamContexts.values()];
+    response.tasks = [...streamTasks.values()];
+    try {
+      await handlePollResponse(response);
+    } catch (error) {
+      console.error("Error:", error);
+    }
+  };
+
+  source.onerror = () => {
+    if (source !== eventStream) return;
+    // do not let EventSource reconnect with a stale log_from, /poll takes over and reopens the stream later
+    closeEventStream();
+    eventStreamErrors++;
+    eventStreamRetryAt =
+      Date.now() + Math.min(60000, 1000 * 2 ** eventStreamErrors);
+  };
+}
+
+function closeEventStream() {
+  if (eventStream) eventStream.close();
+  eventStream = null;
+  eventStreamContext = null;
+}
+
+function mergeStreamList(items, updated, removed) {
+  for (const id of removed || []) items.delete(id);
+  for (const item of updated || []) items.set(item.id, item);
+}
+
+document.addEventListener("visibilitychange", () => {
+  // free the server connection while the tab is hidden, polling continues
+  if (document.visibilityState === "hidden") closeEventStream();
+});
+
 async function startPolling() {
   const shortInterval = 25;
   const longInterval = 250;
@@ -1075,10 +1158,15 @@ async function startPolling() {
     let nextInterval = longInterval;
 
     try {
-      const result = await poll();
-      if (result) shortIntervalCount = shortIntervalPeriod; // Reset the counter when the result is true
-      if (shortIntervalCount > 0) shortIntervalCount--; // Decrease the counter on each call
-      nextInterval = shortIntervalCount > 0 ? shortInterval : longInterval;
+      // skip polling while the event stream pushes updates for this context
+      if (!eventStream || eventStreamContext != context) {
+        const result = await poll();
+        if (result) shortIntervalCount = shortIntervalPeriod; // Reset the counter when the result is true
+        if (shortIntervalCount > 0) shortIntervalCount--; // Decrease the counter on each call
+        nextInterval = shortIntervalCount > 0 ? shortInterval : longInterval;
+
+        if (document.visibilityState === "visible") openEventStream();
+      }
     } catch (error) {
       console.error("Error:", error);
     }